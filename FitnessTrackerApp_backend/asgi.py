@@ -2,6 +2,7 @@
 ASGI config for FitnessTrackerApp_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Live workout events (/api/live/) are streamed only when served through it.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
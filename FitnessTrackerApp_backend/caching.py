@@ -0,0 +1,35 @@
+"""
+Whether the default cache is shared between processes.
+
+Throttle buckets, read-your-writes pins and shard placements are kept in
+the default cache and only hold if every process serving the app sees
+the same entries. Django's in-memory backends keep a copy per process:
+with several workers a throttle admits its rate once per worker, and a
+write pins reads to the primary only in the worker that served it.
+"""
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PER_PROCESS_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(alias='default'):
+    """True when the cache is seen by every process, e.g. Redis or memcached"""
+    return not isinstance(caches[alias], PER_PROCESS_BACKENDS)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared():
+        return []
+    return [checks.Warning(
+        "The default cache is kept per process.",
+        hint=(
+            "Throttle limits and read-your-writes pinning only hold within "
+            "one process. Set CACHE_BACKEND and CACHE_LOCATION to a shared "
+            "cache such as Redis or memcached when running several."
+        ),
+        id='fitness.W001',
+    )]
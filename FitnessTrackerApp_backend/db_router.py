@@ -0,0 +1,197 @@
+import contextvars
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+# Seconds a user reads from the primary after a write. Replicas further
+# behind than REPLICA_MAX_LAG are skipped, so this only has to cover the
+# lag of the replicas still in use.
+PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+# Replicas lagging by more seconds than this are not read from
+MAX_LAG = getattr(settings, 'REPLICA_MAX_LAG', 5)
+
+# Seconds between lag checks of each replica, per process
+LAG_CHECK_INTERVAL = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 10)
+
+# alias -> (monotonic time of the check, lag in seconds or None)
+_lag_checks = {}
+
+
+class Route:
+    """Where reads go for the current request, and why"""
+
+    def __init__(self, alias, reason, lag=None):
+        self.alias = alias
+        self.reason = reason
+        self.lag = lag
+
+    def __str__(self):
+        value = f"{self.alias}; reason={self.reason}"
+        if self.lag is not None:
+            value += f"; lag={self.lag:.3f}"
+        return value
+
+
+# Route of the request being served; None outside requests, where
+# management commands and tasks always read from the primary
+_route = contextvars.ContextVar('db_route', default=None)
+
+
+def replica_lag(alias):
+    """
+    Return how many seconds the replica is behind the primary.
+
+    None when unknown: the backend cannot tell, or the alias is not a
+    standby. An unreachable replica counts as infinitely behind.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            # A standby that has replayed everything it received is caught
+            # up, however old its last transaction is
+            cursor.execute(
+                "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )
+            lag = cursor.fetchone()[0]
+    except DatabaseError:
+        logger.exception("Could not check the lag of replica %s", alias)
+        return float('inf')
+    return None if lag is None else float(lag)
+
+
+def cached_lag(alias):
+    """Lag of a replica, rechecked at most every LAG_CHECK_INTERVAL seconds"""
+    now = time.monotonic()
+    checked = _lag_checks.get(alias)
+    if checked is None or now - checked[0] >= LAG_CHECK_INTERVAL:
+        checked = (now, replica_lag(alias))
+        _lag_checks[alias] = checked
+        if checked[1] is not None:
+            logger.info("Replica %s lag %.3fs", alias, checked[1])
+    return checked[1]
+
+
+def choose_replica():
+    """Return (alias, lag) of the least lagging usable replica, or (None, None)"""
+    best = None
+    for alias in getattr(settings, 'DATABASE_REPLICAS', []):
+        lag = cached_lag(alias)
+        if lag is not None and lag > MAX_LAG:
+            logger.warning("Replica %s is %.1fs behind, not reading from it", alias, lag)
+            continue
+        if best is None or (lag or 0) < (best[1] or 0):
+            best = (alias, lag)
+    return best or (None, None)
+
+
+def _pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary for the next PIN_SECONDS.
+
+    The pin is kept in the default cache, so it only reaches requests
+    served by other processes when that cache is shared between them.
+    """
+    cache.set(_pin_key(user_id), 1, PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+def request_user_id(request):
+    """
+    Return the id of the user making the request without a database query.
+
+    Bearer tokens are validated but the user is not loaded; a session
+    user is used when no token is sent.
+    """
+    parts = request.META.get(jwt_settings.AUTH_HEADER_NAME, '').split()
+    if len(parts) == 2 and parts[0] in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            return AccessToken(parts[1]).get(jwt_settings.USER_ID_CLAIM)
+        except TokenError:
+            return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+def route_request(request, user_id):
+    """Decide where the reads of a request go"""
+    if request.method not in SAFE_METHODS:
+        return Route(PRIMARY, 'unsafe-method')
+    if user_id is not None and is_pinned(user_id):
+        return Route(PRIMARY, 'recent-write')
+    alias, lag = choose_replica()
+    if alias is None:
+        return Route(PRIMARY, 'no-replica')
+    return Route(alias, 'safe-method', lag)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a replica while a safe request is being served.
+
+    Writes always go to the primary, and once a request writes, the rest
+    of its reads follow to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        route = _route.get()
+        return PRIMARY if route is None else route.alias
+
+    def db_for_write(self, model, **hints):
+        route = _route.get()
+        if route is not None and route.alias != PRIMARY:
+            route.alias, route.reason, route.lag = PRIMARY, 'wrote', None
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Route safe requests to replicas and pin writers to the primary.
+
+    The route is reported in the X-Database-Route response header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user_id = request_user_id(request)
+        route = route_request(request, user_id)
+        token = _route.set(route)
+        try:
+            response = self.get_response(request)
+        finally:
+            _route.reset(token)
+
+        if request.method not in SAFE_METHODS and user_id is not None and response.status_code < 400:
+            pin_to_primary(user_id)
+        logger.debug("%s %s read from %s", request.method, request.path, route)
+        response['X-Database-Route'] = str(route)
+        return response
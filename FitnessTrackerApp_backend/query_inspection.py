@@ -0,0 +1,140 @@
+"""
+Detection of repeated queries and per-endpoint query budgets.
+
+With QUERY_INSPECTION set to 'log' or 'raise', every query of a request
+is counted by shape: its SQL with parameters left as placeholders and
+IN lists collapsed. A shape run QUERY_REPEAT_THRESHOLD times in one
+request is the signature of an N+1 and is reported with the project
+frames that issued it. Requests running more queries than their
+endpoint's entry in the QUERY_BUDGETS_FILE are reported too.
+"""
+import json
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+# Transaction control repeats by design, and test cases turn it into
+# savepoints; not counting it keeps budgets the same in tests and servers
+IGNORED_PREFIXES = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+
+
+class RepeatedQueryError(Exception):
+    """The same query shape ran too often within one request"""
+
+
+class QueryBudgetExceeded(Exception):
+    """A request ran more queries than its endpoint's budget"""
+
+
+def query_shape(sql):
+    return IN_LIST.sub('(...)', sql)
+
+
+def project_stack():
+    """Frames of project code on the current stack, innermost last"""
+    base = str(settings.BASE_DIR)
+    return [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(base)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+
+
+def _describe(alias, shape, count, stack):
+    frames = ''.join(traceback.format_list(stack)) or '  (no project frames)\n'
+    return f"{count} queries of the same shape on {alias}:\n  {shape}\nissued from:\n{frames}"
+
+
+class QueryRecorder:
+    """Execute wrapper counting a request's queries by shape"""
+
+    def __init__(self, threshold, mode):
+        self.threshold = threshold
+        self.mode = mode
+        self.count = 0
+        self.shapes = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(IGNORED_PREFIXES):
+            self.count += 1
+            key = (context['connection'].alias, query_shape(sql))
+            self.shapes[key] += 1
+            if self.shapes[key] == self.threshold:
+                stack = project_stack()
+                if self.mode == 'raise':
+                    raise RepeatedQueryError(_describe(*key, self.threshold, stack))
+                self.stacks[key] = stack
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def installed(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+    def repeated(self):
+        """(alias, shape, count, stack) of every shape over the threshold"""
+        return [
+            (alias, shape, self.shapes[alias, shape], stack)
+            for (alias, shape), stack in self.stacks.items()
+        ]
+
+
+def load_budgets(path=None):
+    """Budgets by endpoint ('METHOD url-name') from the budget file"""
+    path = path or getattr(settings, 'QUERY_BUDGETS_FILE', None)
+    if not path:
+        return {}
+    with open(path) as file:
+        return json.load(file)['budgets']
+
+
+def endpoint_name(request):
+    match = request.resolver_match
+    return f"{request.method} {match.view_name}" if match else None
+
+
+class QueryInspectionMiddleware:
+    """
+    Report N+1 queries and blown query budgets, in dev and test only.
+
+    The request's query count is returned in the X-Query-Count header.
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_INSPECTION', None)
+        if not self.mode:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 3)
+        self.budgets = load_budgets()
+
+    def __call__(self, request):
+        recorder = QueryRecorder(self.threshold, self.mode)
+        with recorder.installed():
+            response = self.get_response(request)
+
+        response['X-Query-Count'] = str(recorder.count)
+        endpoint = endpoint_name(request)
+        for repeat in recorder.repeated():
+            logger.warning("Possible N+1 in %s: %s", endpoint, _describe(*repeat))
+        budget = self.budgets.get(endpoint)
+        if budget is not None and recorder.count > budget:
+            message = f"{endpoint} ran {recorder.count} queries, over its budget of {budget}"
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -51,17 +51,21 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
+    'django_filters',
     'authentication',
     'workouts',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'FitnessTrackerApp_backend.query_inspection.QueryInspectionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'FitnessTrackerApp_backend.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,6 +77,23 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Token bucket rates as '<burst>/<refill period>', keyed '<scope>.<kind>'
+    'DEFAULT_THROTTLE_RATES': {
+        'login.ip': '10/min',
+        'login.account': '5/min',
+        'login.endpoint': '1200/min',
+        'register.ip': '5/hour',
+        'register.endpoint': '300/min',
+        'summary.ip': '120/min',
+        'summary.user': '30/min',
+        'summary.endpoint': '6000/min',
+        'dashboard.ip': '120/min',
+        'dashboard.user': '30/min',
+        'dashboard.endpoint': '6000/min',
+    },
+    # Reverse proxies in front of the app. Client addresses are taken from
+    # the X-Forwarded-For entry the nearest proxy added, or REMOTE_ADDR at 0
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '0')),
 }
 
 from datetime import timedelta
@@ -125,6 +146,68 @@ DATABASES = {
     }
 }
 
+# Read replicas: comma-separated hosts sharing the primary's credentials.
+# Safe requests read from them unless the user wrote in the last
+# REPLICA_PIN_SECONDS; replicas more than REPLICA_MAX_LAG seconds
+# behind are skipped.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+# Workout shards: comma-separated hosts sharing the primary's credentials.
+# The default database is always a shard, holding every user not moved
+# or placed elsewhere.
+WORKOUT_SHARDS = ['default']
+for index, host in enumerate(filter(None, os.getenv('DB_SHARD_HOSTS', '').split(',')), start=1):
+    alias = f'shard_{index}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip())
+    WORKOUT_SHARDS.append(alias)
+
+DATABASE_ROUTERS = [
+    'workouts.sharding.ShardRouter',
+    'FitnessTrackerApp_backend.db_router.ReplicaRouter',
+]
+
+REPLICA_PIN_SECONDS = 10
+REPLICA_MAX_LAG = 5
+
+# Publish/subscribe of live workout events. The default reaches clients
+# connected to the same process only; run one ASGI process or plug in a
+# broker sharing events between processes.
+LIVE_EVENTS_BROKER = 'workouts.live.Broker'
+
+# Report N+1 queries and requests over their query budget: 'log' or
+# 'raise'. Off in production unless set in the environment.
+QUERY_INSPECTION = os.getenv('QUERY_INSPECTION') or ('log' if DEBUG else None)
+QUERY_REPEAT_THRESHOLD = 3
+QUERY_BUDGETS_FILE = BASE_DIR / 'query_budgets.json'
+
+# The default cache holds throttle buckets, read-your-writes pins and
+# shard placements, which every process serving the app must share. Set
+# CACHE_BACKEND and CACHE_LOCATION to a shared cache, e.g.
+# django.core.cache.backends.redis.RedisCache and redis://host:6379/0,
+# when running more than one process; the in-memory default only keeps
+# those guarantees within a single process.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    # Serialized workout fragments, per process: their keys follow the
+    # row's updated_at, so they need no invalidation between processes.
+    # Django's default of 300 entries is fewer than one long list.
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'workout-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Seconds a serialized workout stays cached
+WORKOUT_FRAGMENT_TIMEOUT = 60 * 60 * 24 * 7
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,7 +220,7 @@ AUTH_PASSWORD_VALIDATORS = [
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'authentication.password_validation.BreachedPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
@@ -145,6 +228,11 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Bloom filter of breached passwords built with build_password_filter;
+# unset uses the bundled filter of Django's common password list
+BREACHED_PASSWORDS_FILE = os.getenv('BREACHED_PASSWORDS_FILE')
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
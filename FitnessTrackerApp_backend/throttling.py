@@ -0,0 +1,176 @@
+import hashlib
+import time
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+# Bucket state outlives any refill period; an idle bucket is caught up
+# on its next use, so expiry only matters for abandoned keys.
+BUCKET_TIMEOUT = 60 * 60 * 24
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse '<capacity>/<period>' (e.g. '10/min') into (capacity, seconds)"""
+    if rate is None:
+        return None
+    capacity, period = rate.split('/')
+    return int(capacity), PERIODS[period[0]]
+
+
+class TokenBucket:
+    """
+    Token bucket kept in the shared cache as a single integer.
+
+    The value is the bucket's theoretical arrival time in milliseconds
+    (GCRA, which behaves exactly like a token bucket), so taking a token
+    is one atomic ``incr`` and refusing it one ``decr``. No read-modify-
+    write cycle is needed on backends with atomic incr (Redis, Memcached).
+
+    With a per-process cache each worker keeps its own buckets and the
+    real limit is the rate times the number of workers; see
+    ``caching.is_shared``.
+    """
+
+    def __init__(self, key, capacity, period, cache=None):
+        self.key = key
+        self.capacity = capacity
+        # Milliseconds needed to refill one token
+        self.interval = max(int(period * 1000 / capacity), 1)
+        self.cache = cache or default_cache
+
+    def consume(self):
+        """Take a token; return 0 if allowed, else seconds until one is free"""
+        now = int(time.time() * 1000)
+        if self.cache.add(self.key, now + self.interval, BUCKET_TIMEOUT):
+            return 0
+
+        try:
+            tat = self.cache.incr(self.key, self.interval)
+        except ValueError:
+            # Expired between add and incr; start a fresh bucket
+            self.cache.set(self.key, now + self.interval, BUCKET_TIMEOUT)
+            return 0
+
+        if tat - self.interval < now:
+            # The bucket refilled completely while idle. A racing client
+            # may overwrite this, which at worst admits one extra request.
+            self.cache.set(self.key, now + self.interval, BUCKET_TIMEOUT)
+            return 0
+
+        limit = self.capacity * self.interval
+        if tat - now <= limit:
+            return 0
+        self.cache.decr(self.key, self.interval)
+        return (tat - limit - now) / 1000
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class for token bucket throttles.
+
+    The rate comes from ``DEFAULT_THROTTLE_RATES`` under
+    '<view.throttle_scope>.<kind>'; without a rate the throttle is off.
+    """
+    kind = None
+    cache = default_cache
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_rate(self, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if not scope:
+            return None
+        return api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}.{self.kind}")
+
+    def get_bucket_id(self, request, view):
+        """Return what the bucket is keyed on, or None to skip"""
+        raise NotImplementedError('.get_bucket_id() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = parse_rate(self.get_rate(view))
+        if rate is None:
+            return True
+        bucket_id = self.get_bucket_id(request, view)
+        if bucket_id is None:
+            return True
+
+        key = f"throttle:{view.throttle_scope}:{self.kind}:{bucket_id}"
+        self.wait_time = TokenBucket(key, *rate, cache=self.cache).consume()
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    One bucket per client address.
+
+    X-Forwarded-For is only read when NUM_PROXIES says how many entries
+    trusted proxies appended; otherwise a client could name a fresh
+    address on every request and never run out of tokens.
+    """
+    kind = 'ip'
+
+    def get_bucket_id(self, request, view):
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return self.get_ident(request)
+
+
+class EndpointTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket shared by every client of the endpoint"""
+    kind = 'endpoint'
+
+    def get_bucket_id(self, request, view):
+        return 'all'
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per authenticated user"""
+    kind = 'user'
+
+    def get_bucket_id(self, request, view):
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
+
+
+class AccountTokenBucketThrottle(TokenBucketThrottle):
+    """One bucket per targeted account, keyed on the submitted email"""
+    kind = 'account'
+
+    def get_bucket_id(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+
+
+class PreAuthenticationThrottleMixin:
+    """
+    Check throttles before authentication runs.
+
+    DRF checks throttles after authentication and permissions, so a
+    rejected request would still pay for JWT decoding and the user
+    lookup. These run first, narrowest bucket first.
+    """
+    pre_auth_throttle_classes = [
+        IPTokenBucketThrottle, EndpointTokenBucketThrottle
+    ]
+
+    def get_pre_auth_throttles(self):
+        return [throttle() for throttle in self.pre_auth_throttle_classes]
+
+    def initial(self, request, *args, **kwargs):
+        # Stop at the first refusal so a client rejected by its own
+        # bucket does not drain the shared endpoint bucket
+        for throttle in self.get_pre_auth_throttles():
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
+        super().initial(request, *args, **kwargs)
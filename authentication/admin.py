@@ -1,7 +1,43 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from FitnessTrackerApp_backend.paginators import EstimatedCountPaginator
 from .models import User
 
 
-# Use Django's built-in UserAdmin to get password hashing and permissions UI
-admin.site.register(User, BaseUserAdmin)
+# Build on Django's UserAdmin to keep password hashing and permissions UI
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    list_display = ['email', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined']
+    list_filter = ['is_staff', 'is_superuser', 'is_active', 'is_email_verified']
+    # Ordered by the primary key so pages are read in index order
+    ordering = ['-id']
+    # Also used by the workout admin's user autocomplete
+    search_fields = ['email']
+    search_help_text = "User id, or the start of an email address (case-sensitive)."
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    fieldsets = BaseUserAdmin.fieldsets + (
+        ('Profile', {
+            'fields': (
+                'phone_number', 'date_of_birth', 'height', 'weight',
+                'gender', 'fitness_goal', 'is_email_verified',
+                'leaderboard_opt_in',
+            )
+        }),
+    )
+    add_fieldsets = (
+        (None, {
+            'classes': ('wide',),
+            'fields': ('email', 'username', 'password1', 'password2'),
+        }),
+    )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Route each search to the primary key or the email index"""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        return queryset.filter(email__startswith=term), False
@@ -0,0 +1,68 @@
+import gzip
+import re
+from pathlib import Path
+
+import django.contrib.auth
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.password_validation import (
+    DEFAULT_FALSE_POSITIVE_RATE, DEFAULT_FILTER, digest, write_filter
+)
+
+DJANGO_COMMON_PASSWORDS = Path(django.contrib.auth.__file__).parent / 'common-passwords.txt.gz'
+
+# A line of a SHA-1 breach dump, optionally with its occurrence count
+SHA1_LINE = re.compile(r'^([0-9A-Fa-f]{40})(?::(\d+))?$')
+
+
+def _lines(path):
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the Bloom filter read by BreachedPasswordValidator from "
+        "password lists: plain passwords one per line, or SHA-1 dumps "
+        "with 'HASH' or 'HASH:COUNT' lines. Files may be gzipped. "
+        "Defaults to Django's common password list."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('sources', nargs='*')
+        parser.add_argument('--output', default=str(DEFAULT_FILTER))
+        parser.add_argument(
+            '--false-positive-rate', type=float, default=DEFAULT_FALSE_POSITIVE_RATE,
+            help="Share of safe passwords wrongly rejected"
+        )
+        parser.add_argument(
+            '--min-count', type=int, default=1,
+            help="Skip SHA-1 dump entries seen fewer times than this"
+        )
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or [DJANGO_COMMON_PASSWORDS]
+        rate = options['false_positive_rate']
+        if not 0 < rate < 1:
+            raise CommandError("--false-positive-rate must be between 0 and 1")
+
+        def digests():
+            for source in sources:
+                for line in _lines(source):
+                    match = SHA1_LINE.match(line)
+                    if match is None:
+                        yield digest(line)
+                    elif int(match.group(2) or 1) >= options['min_count']:
+                        yield bytes.fromhex(match.group(1))
+
+        # A first pass sizes the filter, so lists are never held in memory
+        count = sum(1 for _ in digests())
+        bits, hashes, added = write_filter(options['output'], digests(), count, rate)
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {added} passwords to {options['output']} "
+            f"({bits // 8} bytes, {hashes} hashes)"
+        ))
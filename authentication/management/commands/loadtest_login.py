@@ -0,0 +1,120 @@
+import itertools
+import statistics
+import threading
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from authentication.views import UserLoginView
+
+User = get_user_model()
+
+PASSWORD = 'LoadTest-Passw0rd!'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the login endpoint while an abusive client floods it, "
+        "and report latency of well-behaved logins with and without "
+        "throttling. Creates temporary users and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--good-clients', type=int, default=4)
+        parser.add_argument(
+            '--good-interval', type=float, default=0.5,
+            help="Seconds between logins of each well-behaved client"
+        )
+        parser.add_argument('--abusive-clients', type=int, default=8)
+        parser.add_argument('--accounts', type=int, default=50)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        hashed = make_password(PASSWORD)
+        emails = [f"loadtest-{run_id}-{index}@example.invalid" for index in range(options['accounts'])]
+        User.objects.bulk_create([
+            User(email=email, username=email, password=hashed) for email in emails
+        ])
+        original = UserLoginView.pre_auth_throttle_classes
+        try:
+            for run, throttled in enumerate([False, True]):
+                UserLoginView.pre_auth_throttle_classes = original if throttled else []
+                label = 'throttled' if throttled else 'unthrottled'
+                self._report(label, self._run(run, run_id, emails, options))
+        finally:
+            UserLoginView.pre_auth_throttle_classes = original
+            User.objects.filter(email__in=emails).delete()
+
+    def _run(self, run, run_id, emails, options):
+        view = UserLoginView.as_view()
+        factory = APIRequestFactory()
+        deadline = time.monotonic() + options['duration']
+        accounts = itertools.cycle(enumerate(emails))
+        lock = threading.Lock()
+        results = {'good': [], 'good_errors': 0, 'abusive': {}}
+
+        def login(email, password, ip):
+            request = factory.post(
+                '/api/auth/login/', {'email': email, 'password': password},
+                format='json', REMOTE_ADDR=ip
+            )
+            return view(request).status_code
+
+        def good_client():
+            while time.monotonic() < deadline:
+                with lock:
+                    index, email = next(accounts)
+                started = time.perf_counter()
+                code = login(email, PASSWORD, f"10.{run}.{index // 250}.{index % 250 + 1}")
+                elapsed = time.perf_counter() - started
+                with lock:
+                    results['good'].append(elapsed)
+                    if code != 200:
+                        results['good_errors'] += 1
+                time.sleep(max(options['good_interval'] - elapsed, 0))
+            connection.close()
+
+        def abusive_client(number):
+            attempt = 0
+            while time.monotonic() < deadline:
+                attempt += 1
+                code = login(
+                    f"victim-{run_id}-{number}-{attempt}@example.invalid",
+                    'not-the-password', f"203.0.{run}.7"
+                )
+                with lock:
+                    results['abusive'][code] = results['abusive'].get(code, 0) + 1
+            connection.close()
+
+        threads = [threading.Thread(target=good_client) for _ in range(options['good_clients'])]
+        threads += [
+            threading.Thread(target=abusive_client, args=(number,))
+            for number in range(options['abusive_clients'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _report(self, label, results):
+        samples = sorted(results['good'])
+        if not samples:
+            self.stdout.write(f"{label}: no well-behaved requests completed")
+            return
+        p50 = statistics.median(samples) * 1000
+        p99 = samples[max(int(len(samples) * 0.99) - 1, 0)] * 1000
+        abusive = ', '.join(
+            f"{code}: {count}" for code, count in sorted(results['abusive'].items())
+        )
+        self.stdout.write(
+            f"{label:>11}: good logins {len(samples)} "
+            f"(errors {results['good_errors']}) p50 {p50:.1f}ms p99 {p99:.1f}ms | "
+            f"abusive responses {abusive}"
+        )
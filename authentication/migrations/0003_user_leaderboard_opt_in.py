@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='leaderboard_opt_in',
+            field=models.BooleanField(default=False, help_text='Show this user on public leaderboards'),
+        ),
+    ]
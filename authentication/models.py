@@ -53,6 +53,7 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_email_verified = models.BooleanField(default=False)
+    leaderboard_opt_in = models.BooleanField(default=False, help_text="Show this user on public leaderboards")
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
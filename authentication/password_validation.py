@@ -0,0 +1,141 @@
+"""
+Rejection of breached and common passwords using a Bloom filter file.
+
+The filter is memory-mapped read-only, so every worker process on a
+host shares the same page-cache copy instead of loading a password
+list of its own. Build filters with ``manage.py build_password_filter``.
+
+File layout: a 32-byte header (magic, bit count, hash count, entry
+count) followed by the bit array. Entries are SHA-1 digests of
+passwords, as in breached-password dumps; bit positions come from the
+digest by double hashing.
+"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext as _
+
+MAGIC = b'PWBLOOM1'
+HEADER = struct.Struct('<8sQBQ')
+DATA_OFFSET = 32
+
+# Built from Django's list of 20,000 common passwords
+DEFAULT_FILTER = Path(__file__).resolve().parent / 'data' / 'common-passwords.bloom'
+
+# Error rate of the bundled filter, and of rebuilt ones unless chosen
+DEFAULT_FALSE_POSITIVE_RATE = 1e-6
+
+_filters = {}
+_filters_lock = threading.Lock()
+
+
+def digest(password):
+    return hashlib.sha1(password.encode()).digest()
+
+
+def _positions(password_digest, bits, hashes):
+    first, second = struct.unpack_from('<QQ', password_digest)
+    # An odd step visits distinct positions for every hash
+    second |= 1
+    return [(first + index * second) % bits for index in range(hashes)]
+
+
+def filter_size(count, false_positive_rate):
+    """Return (bits, hashes) for count entries at the given error rate"""
+    bits = math.ceil(-max(count, 1) * math.log(false_positive_rate) / math.log(2) ** 2)
+    bits += -bits % 8
+    hashes = max(1, round(bits / max(count, 1) * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """A read-only memory-mapped Bloom filter file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.bits, self.hashes, self.count = HEADER.unpack_from(self.data)
+        if magic != MAGIC or len(self.data) < DATA_OFFSET + self.bits // 8:
+            raise ValueError(f"{path} is not a password filter")
+
+    def contains_digest(self, password_digest):
+        # Positions are generated as probed: most misses stop at the first
+        first, second = struct.unpack_from('<QQ', password_digest)
+        second |= 1
+        data, bits = self.data, self.bits
+        for index in range(self.hashes):
+            position = (first + index * second) % bits
+            if not data[DATA_OFFSET + (position >> 3)] >> (position & 7) & 1:
+                return False
+        return True
+
+    def __contains__(self, password):
+        return self.contains_digest(digest(password))
+
+
+def open_filter(path):
+    """The filter at path, mapped once per process"""
+    path = os.fspath(path)
+    bloom = _filters.get(path)
+    if bloom is None:
+        with _filters_lock:
+            bloom = _filters.get(path)
+            if bloom is None:
+                bloom = _filters[path] = BloomFilter(path)
+    return bloom
+
+
+def write_filter(path, digests, count, false_positive_rate):
+    """
+    Write a filter holding an iterable of SHA-1 digests.
+
+    ``count`` sizes the filter. The file is written next to its target
+    and renamed over it, so processes still mapping an old filter keep
+    reading it unchanged.
+    """
+    bits, hashes = filter_size(count, false_positive_rate)
+    array = bytearray(bits // 8)
+    added = 0
+    for password_digest in digests:
+        for position in _positions(password_digest, bits, hashes):
+            array[position >> 3] |= 1 << (position & 7)
+        added += 1
+
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, bits, hashes, added).ljust(DATA_OFFSET, b'\0'))
+        file.write(array)
+    os.replace(temporary, path)
+    return bits, hashes, added
+
+
+class BreachedPasswordValidator:
+    """
+    Validate that the password is not in a breached-password filter.
+
+    Drop-in replacement for Django's CommonPasswordValidator, checking
+    the password as typed and in lowercase. The filter is the file named
+    by ``path`` or the BREACHED_PASSWORDS_FILE setting, or by default
+    one built from Django's common password list.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'BREACHED_PASSWORDS_FILE', None) or DEFAULT_FILTER
+
+    def validate(self, password, user=None):
+        bloom = open_filter(self.path)
+        if password in bloom or password.lower() in bloom:
+            raise ValidationError(
+                _("This password is too common."),
+                code="password_too_common",
+            )
+
+    def get_help_text(self):
+        return _("Your password can’t be a commonly used password.")
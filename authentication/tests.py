@@ -89,3 +89,195 @@ class AuthenticationNoDBTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertIn("error", response.data)
 
+
+class LoginThrottleNoDBTests(TestCase):
+    rates = {'login.ip': '3/min', 'login.account': '2/min', 'login.endpoint': '100/min'}
+
+    def setUp(self):
+        from django.core.cache import cache
+        from django.test import override_settings
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        settings_override = override_settings(REST_FRAMEWORK={
+            'DEFAULT_AUTHENTICATION_CLASSES': (
+                'rest_framework_simplejwt.authentication.JWTAuthentication',
+            ),
+            'DEFAULT_THROTTLE_RATES': self.rates,
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.factory = APIRequestFactory()
+        self.login_view = UserLoginView.as_view()
+
+    def _login(self, email, ip='10.0.0.1', **extra):
+        payload = {"email": email, "password": "WrongPass123!"}
+        request = self.factory.post("/api/auth/login/", payload, format="json", REMOTE_ADDR=ip, **extra)
+        return self.login_view(request)
+
+    @patch("authentication.views.authenticate", return_value=None)
+    def test_account_bucket_rejects_before_hashing(self, mock_authenticate):
+        self.assertEqual(self._login("a@example.com").status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._login("a@example.com").status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self._login("A@example.com")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(mock_authenticate.call_count, 2)
+
+    @patch("authentication.views.authenticate", return_value=None)
+    def test_ip_bucket_is_per_client(self, mock_authenticate):
+        for index in range(3):
+            self._login(f"user{index}@example.com")
+        self.assertEqual(self._login("user9@example.com").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            self._login("user9@example.com", ip="10.0.0.2").status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+
+    @patch("authentication.views.authenticate", return_value=None)
+    def test_spoofed_forwarded_for_shares_the_ip_bucket(self, mock_authenticate):
+        for index in range(3):
+            self._login(f"user{index}@example.com", HTTP_X_FORWARDED_FOR=f"203.0.113.{index}")
+        response = self._login("user9@example.com", HTTP_X_FORWARDED_FOR="203.0.113.9")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @patch("authentication.views.authenticate", return_value=None)
+    def test_proxied_clients_get_their_own_bucket(self, mock_authenticate):
+        from django.conf import settings
+        from django.test import override_settings
+
+        with override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)):
+            for index in range(3):
+                self._login(f"user{index}@example.com", HTTP_X_FORWARDED_FOR="198.51.100.7, 203.0.113.1")
+            self.assertEqual(
+                self._login("user9@example.com", HTTP_X_FORWARDED_FOR="203.0.113.1").status_code,
+                status.HTTP_429_TOO_MANY_REQUESTS
+            )
+            self.assertEqual(
+                self._login("user9@example.com", HTTP_X_FORWARDED_FOR="203.0.113.2").status_code,
+                status.HTTP_401_UNAUTHORIZED
+            )
+
+
+class TokenBucketNoDBTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @patch("FitnessTrackerApp_backend.throttling.time.time")
+    def test_bucket_refills_over_time(self, mock_time):
+        from FitnessTrackerApp_backend.throttling import TokenBucket
+
+        mock_time.return_value = 1000.0
+        bucket = TokenBucket("test-bucket", capacity=2, period=60)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertAlmostEqual(bucket.consume(), 30.0)
+
+        mock_time.return_value = 1030.0
+        self.assertEqual(bucket.consume(), 0)
+        self.assertGreater(bucket.consume(), 0)
+
+        # A long idle period refills to capacity, not beyond
+        mock_time.return_value = 5000.0
+        self.assertEqual(bucket.consume(), 0)
+        self.assertEqual(bucket.consume(), 0)
+        self.assertGreater(bucket.consume(), 0)
+
+
+class SharedCacheNoDBTests(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        # A file cache is shared by every process on the host
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location, True)
+
+    def test_processes_sharing_a_cache_share_buckets(self):
+        from django.core.cache.backends.filebased import FileBasedCache
+        from FitnessTrackerApp_backend.throttling import TokenBucket
+
+        # Each worker has its own connection to the same cache
+        first, second = (FileBasedCache(self.location, {}) for _ in range(2))
+        self.assertEqual(TokenBucket('shared', 1, 60, cache=first).consume(), 0)
+        self.assertGreater(TokenBucket('shared', 1, 60, cache=second).consume(), 0)
+
+    def test_deploy_check_warns_about_a_per_process_cache(self):
+        from django.conf import settings
+        from django.test import override_settings
+        from FitnessTrackerApp_backend.caching import check_shared_cache
+
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['fitness.W001'])
+        with override_settings(CACHES=dict(settings.CACHES, default={
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.location,
+        })):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class BreachedPasswordValidatorTests(TestCase):
+    def test_bundled_filter_rejects_common_passwords(self):
+        from django.core.exceptions import ValidationError
+        from authentication.password_validation import BreachedPasswordValidator
+
+        validator = BreachedPasswordValidator()
+        for password in ('password', 'Password', 'qwerty123'):
+            with self.assertRaises(ValidationError):
+                validator.validate(password)
+        validator.validate('correct-horse-battery-staple-42')
+
+    def test_build_command_reads_plain_and_sha1_lists(self):
+        import hashlib
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from authentication.password_validation import _filters, open_filter
+
+        with tempfile.TemporaryDirectory() as directory:
+            plain = os.path.join(directory, 'plain.txt')
+            dump = os.path.join(directory, 'dump.txt')
+            output = os.path.join(directory, 'breached.bloom')
+            with open(plain, 'w') as file:
+                file.write('hunter2\nletmein\n')
+            with open(dump, 'w') as file:
+                file.write(f"{hashlib.sha1(b'Summer2024!').hexdigest().upper()}:12\n")
+                file.write(f"{hashlib.sha1(b'rarely-seen').hexdigest().upper()}:1\n")
+
+            call_command('build_password_filter', plain, dump, output=output, min_count=2, stdout=StringIO())
+
+            bloom = open_filter(output)
+            self.assertIn('hunter2', bloom)
+            self.assertIn('Summer2024!', bloom)
+            self.assertNotIn('rarely-seen', bloom)
+            self.assertEqual(bloom.count, 3)
+            # Mapped once per process
+            self.assertIs(open_filter(output), bloom)
+            _filters.pop(output).data.close()
+
+    def test_rebuilding_without_options_keeps_the_bundled_error_rate(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+        from authentication.password_validation import DEFAULT_FILTER, BloomFilter
+
+        bundled = BloomFilter(DEFAULT_FILTER)
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'common.bloom')
+            call_command('build_password_filter', output=output, stdout=StringIO())
+            rebuilt = BloomFilter(output)
+            self.assertEqual(
+                (rebuilt.bits, rebuilt.hashes, rebuilt.count),
+                (bundled.bits, bundled.hashes, bundled.count)
+            )
+            rebuilt.data.close()
+        bundled.data.close()
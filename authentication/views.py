@@ -4,6 +4,12 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, get_user_model
+from FitnessTrackerApp_backend.throttling import (
+    AccountTokenBucketThrottle,
+    EndpointTokenBucketThrottle,
+    IPTokenBucketThrottle,
+    PreAuthenticationThrottleMixin
+)
 from .serializers import (
     UserLoginSerializer,
     UserProfileSerializer,
@@ -12,9 +18,16 @@ from .serializers import (
 
 User = get_user_model()
 
-class UserLoginView(APIView):
+class UserLoginView(PreAuthenticationThrottleMixin, APIView):
     permission_classes = (AllowAny,)
     serializer_class = UserLoginSerializer
+    # Rejected before the password hash is computed
+    throttle_scope = 'login'
+    pre_auth_throttle_classes = [
+        IPTokenBucketThrottle,
+        AccountTokenBucketThrottle,
+        EndpointTokenBucketThrottle
+    ]
 
     def post(self, request):
         serializer = self.serializer_class(data=request.data)
@@ -62,10 +75,11 @@ class UserLogoutView(APIView):
                 'error': 'Invalid token'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class UserRegistrationView(generics.CreateAPIView):
+class UserRegistrationView(PreAuthenticationThrottleMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = UserRegistrationSerializer
+    throttle_scope = 'register'
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
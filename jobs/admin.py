@@ -0,0 +1,30 @@
+from django.contrib import admin
+from django.utils import timezone
+from FitnessTrackerApp_backend.paginators import EstimatedCountPaginator
+from .models import Task, TaskMetric
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'queue', 'status', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['name']
+    readonly_fields = ['created_at', 'locked_at', 'locked_by', 'last_error']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['requeue']
+
+    @admin.action(description="Requeue selected tasks")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, last_error=''
+        )
+        self.message_user(request, f"{updated} tasks requeued.")
+
+
+@admin.register(TaskMetric)
+class TaskMetricAdmin(admin.ModelAdmin):
+    list_display = [
+        'name', 'succeeded', 'retried', 'failed',
+        'average_seconds', 'max_seconds', 'last_run_at'
+    ]
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete or archive expired rows under the declared retention "
+        "policies, in small batches that are safe to run under live traffic"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'policies', nargs='*',
+            help="Policies to apply; defaults to all"
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help="Rows per batch; defaults to each policy's own"
+        )
+        parser.add_argument(
+            '--pause', type=float,
+            help="Seconds to sleep between batches; defaults to each policy's own"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Count the expired rows without touching them"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            policies = [retention.get_policy(name) for name in options['policies']]
+        except retention.UnknownPolicy as error:
+            raise CommandError(f"Unknown retention policy: {error}")
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options['pause'] is not None and options['pause'] < 0:
+            raise CommandError("--pause must not be negative")
+
+        for policy in policies or retention.policies():
+            action = 'archived' if policy.archive is not None else 'deleted'
+            if options['dry_run']:
+                self.stdout.write(f"{policy.name}: {policy.count()} rows would be {action}")
+                continue
+            run = policy.apply(batch_size=options['batch_size'], pause=options['pause'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{policy.name}: {action} {run['rows']} rows in {run['batches']} "
+                f"batches, {run['seconds']:.2f}s "
+                f"({run['rows'] / max(run['seconds'], 1e-9):.0f} rows/s)"
+            ))
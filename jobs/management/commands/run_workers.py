@@ -0,0 +1,95 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.process import run_worker_process
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Run background task workers against the database queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help="Number of worker threads or processes"
+        )
+        parser.add_argument(
+            '--mode', choices=['thread', 'process'], default='thread',
+            help="Run workers as threads of this process or as processes"
+        )
+        parser.add_argument(
+            '--queue', action='append', dest='queues',
+            help="Queue to consume (repeatable, default: default)"
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Run every due task once and exit"
+        )
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or ['default']
+
+        if options['once']:
+            ran = Worker(queues=queues).run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} tasks"))
+            return
+
+        if options['mode'] == 'process':
+            self._run_processes(queues, options)
+        else:
+            self._run_threads(queues, options)
+
+    def _run_threads(self, queues, options):
+        workers = [
+            Worker(queues=queues, poll_interval=options['poll_interval'])
+            for _ in range(options['workers'])
+        ]
+        threads = [
+            threading.Thread(target=worker.run_forever, name=f"worker-{index}")
+            for index, worker in enumerate(workers)
+        ]
+
+        def stop(*args):
+            for worker in workers:
+                worker.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {len(threads)} worker threads on {', '.join(queues)}")
+        # Join with a timeout so signals are still delivered to this thread
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+
+    def _run_processes(self, queues, options):
+        # Children open their own connections
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(
+                target=run_worker_process,
+                args=(queues, options['poll_interval']),
+                name=f"worker-{index}"
+            )
+            for index in range(options['workers'])
+        ]
+
+        def stop(*args):
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} worker processes on {', '.join(queues)}")
+        for process in processes:
+            process.join()
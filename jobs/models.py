@@ -0,0 +1,61 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """A unit of background work waiting for, or done by, a worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='queued'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(help_text="Earliest time the task may run")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'job_tasks'
+        indexes = [
+            # Workers claim the oldest due task of a queue
+            models.Index(fields=['queue', 'status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class TaskMetric(models.Model):
+    """Running totals of executions for one task name"""
+    name = models.CharField(max_length=200, primary_key=True)
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    retried = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    max_seconds = models.FloatField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'job_task_metrics'
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def average_seconds(self):
+        runs = self.succeeded + self.failed + self.retried
+        return self.total_seconds / runs if runs else 0
@@ -0,0 +1,54 @@
+import signal
+
+
+def run_worker_process(queues, poll_interval):
+    """
+    Entry point of a worker process started with the spawn method.
+
+    Lives outside the worker module so the child can import it before
+    Django is set up.
+    """
+    import django
+    django.setup()
+
+    from .worker import Worker
+
+    worker = Worker(queues=queues, poll_interval=poll_interval)
+    signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+    signal.signal(signal.SIGINT, lambda *args: worker.stop())
+    worker.run_forever()
+
+
+def setup_django():
+    """Initializer of spawned pool processes, which start without Django"""
+    import django
+    django.setup()
+
+
+def pool_results(function, calls, processes):
+    """
+    Yield function(*arguments) for each argument tuple, as calls finish.
+
+    Calls are spread over spawned processes that open their own database
+    connections; with one process they run here, in order.
+    """
+    if processes == 1:
+        for arguments in calls:
+            yield function(*arguments)
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    from django.db import connections
+
+    # Children open their own connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=setup_django,
+    ) as pool:
+        futures = [pool.submit(function, *arguments) for arguments in calls]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Task
+
+_registry = {}
+
+
+class UnknownTask(LookupError):
+    """Raised when a queued task name has no registered function"""
+
+
+class TaskFunction:
+    """A registered function that can run inline or be queued"""
+
+    def __init__(self, func, name, queue, max_attempts):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, delay=None, **kwargs):
+        """Queue a call; arguments must be JSON serializable"""
+        run_at = timezone.now()
+        if delay:
+            run_at += timedelta(seconds=delay)
+        return Task.objects.create(
+            name=self.name,
+            queue=self.queue,
+            args=list(args),
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_at=run_at
+        )
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=5):
+    """Register a function as a background task"""
+    def register(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        wrapped = TaskFunction(func, task_name, queue, max_attempts)
+        _registry[task_name] = wrapped
+        return wrapped
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(name)
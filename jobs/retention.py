@@ -0,0 +1,145 @@
+"""
+Retention policies: expiry of rows nothing else cleans up.
+
+Each app declares its policies in a ``retention.py`` module with
+``policy()``. A policy names a model, the date or datetime field rows
+expire by and how old they must be; expired rows are deleted, or
+archived by updating fields so they leave the policy's filters.
+
+Rows are handled in small batches in primary key order, each batch in
+its own short transaction followed by a pause, so a run never holds
+locks or grows the write-ahead log for long and can go on while the
+site serves traffic. The write repeats the expiry conditions, so rows
+changed since they were selected are left alone.
+"""
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import router, transaction
+from django.utils import timezone
+
+_policies = {}
+
+
+class UnknownPolicy(LookupError):
+    """Raised for a policy name no app declared"""
+
+
+class Policy:
+    """
+    Expiry of one model's rows.
+
+    Rows whose ``field`` is older than ``age`` (a timedelta) and that
+    match ``filters`` are expired. Without ``archive`` they are deleted;
+    otherwise they are updated with the ``archive`` values, which must
+    take them out of ``filters``. ``aliases`` returns the databases to
+    clean, by default the model's write database.
+    """
+
+    def __init__(self, name, model, field, age, filters=None, archive=None,
+                 aliases=None, batch_size=1000, pause=0.1):
+        self.name = name
+        self.model = model
+        self.field = field
+        self.age = age
+        self.filters = filters or {}
+        self.archive = archive
+        self.aliases = aliases
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+    def databases(self):
+        if self.aliases is not None:
+            return list(self.aliases())
+        return [router.db_for_write(self.get_model())]
+
+    def cutoff(self, now=None):
+        cutoff = (now or timezone.now()) - self.age
+        if self.get_model()._meta.get_field(self.field).get_internal_type() == 'DateField':
+            return cutoff.date()
+        return cutoff
+
+    def expired(self, alias, now=None):
+        return self.get_model()._default_manager.using(alias).filter(
+            **self.filters, **{f'{self.field}__lt': self.cutoff(now)}
+        )
+
+    def count(self, now=None):
+        return sum(self.expired(alias, now).count() for alias in self.databases())
+
+    def apply(self, batch_size=None, pause=None, now=None):
+        """
+        Delete or archive the expired rows batch by batch.
+
+        Returns the rows handled, the number of batches and the seconds
+        taken, pauses included.
+        """
+        batch_size = batch_size or self.batch_size
+        pause = self.pause if pause is None else pause
+        label = self.get_model()._meta.label
+        rows = batches = 0
+        started = time.monotonic()
+        for alias in self.databases():
+            expired = self.expired(alias, now)
+            last_pk = None
+            while True:
+                batch = expired.order_by('pk')
+                if last_pk is not None:
+                    batch = batch.filter(pk__gt=last_pk)
+                pks = list(batch.values_list('pk', flat=True)[:batch_size])
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                with transaction.atomic(using=alias):
+                    current = expired.filter(pk__in=pks)
+                    if self.archive is None:
+                        rows += current.delete()[1].get(label, 0)
+                    else:
+                        rows += current.update(**self.archive)
+                batches += 1
+                if len(pks) < batch_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+        return {'rows': rows, 'batches': batches, 'seconds': time.monotonic() - started}
+
+
+def policy(name, model, field, age, **options):
+    """Declare a retention policy; see Policy for the options"""
+    declared = Policy(name, model, field, age, **options)
+    _policies[name] = declared
+    return declared
+
+
+def get_policy(name):
+    try:
+        return _policies[name]
+    except KeyError:
+        raise UnknownPolicy(name)
+
+
+def policies():
+    return [_policies[name] for name in sorted(_policies)]
+
+
+# Tables of the jobs app and of the Django and simplejwt apps it runs beside
+
+policy(
+    'expired_sessions', 'sessions.Session', 'expire_date', timedelta(0),
+)
+
+policy(
+    'finished_tasks', 'jobs.Task', 'finished_at', timedelta(days=30),
+    filters={'status__in': ['succeeded', 'failed']},
+)
+
+if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+    # Blacklist entries go with their tokens
+    policy(
+        'expired_refresh_tokens', 'token_blacklist.OutstandingToken', 'expires_at',
+        timedelta(0),
+    )
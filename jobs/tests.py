@@ -0,0 +1,145 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase
+
+from .models import Task, TaskMetric
+from .registry import task
+from .worker import Worker
+
+calls = []
+
+
+@task(name='jobs.tests.record', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+@task(name='jobs.tests.outlast_lock', max_attempts=2)
+def outlast_lock(seconds):
+    time.sleep(seconds)
+    calls.append(Worker(name='other').claim())
+
+
+class WorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker()
+
+    def test_enqueued_task_runs_once_and_records_metrics(self):
+        record.enqueue(3)
+
+        self.assertEqual(self.worker.run_pending(), 1)
+        self.assertEqual(self.worker.run_pending(), 0)
+        self.assertEqual(calls, [3])
+        self.assertEqual(Task.objects.get().status, 'succeeded')
+        self.assertEqual(TaskMetric.objects.get(name='jobs.tests.record').succeeded, 1)
+
+    def test_failures_back_off_then_fail(self):
+        explode.enqueue()
+
+        self.assertEqual(self.worker.run_pending(), 1)
+        failed = Task.objects.get()
+        self.assertEqual(failed.status, 'queued')
+        self.assertGreater(failed.run_at, failed.created_at)
+        self.assertIn('boom', failed.last_error)
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(self.worker.run_pending(), 0)
+        Task.objects.update(run_at=failed.created_at)
+        self.worker.run_pending()
+
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, 'failed')
+        self.assertEqual(failed.attempts, 2)
+        metric = TaskMetric.objects.get(name='jobs.tests.explode')
+        self.assertEqual((metric.retried, metric.failed), (1, 1))
+
+    def test_claimed_task_is_not_claimed_twice(self):
+        record.enqueue(1)
+        other = Worker(name='other')
+
+        claimed = self.worker.claim()
+        self.assertIsNotNone(claimed)
+        self.assertEqual(claimed.locked_by, self.worker.name)
+        self.assertIsNone(other.claim())
+
+    @patch('jobs.worker.VISIBILITY_TIMEOUT', -1)
+    def test_stale_running_task_is_reclaimed(self):
+        record.enqueue(1)
+        self.worker.claim()
+
+        reclaimed = Worker(name='other').claim()
+        self.assertEqual(reclaimed.locked_by, 'other')
+        self.assertEqual(reclaimed.attempts, 2)
+
+
+class WorkerHeartbeatTests(TransactionTestCase):
+    # The heartbeat writes from its own thread and connection
+    def setUp(self):
+        calls.clear()
+
+    @patch('jobs.worker.HEARTBEAT_INTERVAL', 0.05)
+    @patch('jobs.worker.VISIBILITY_TIMEOUT', 0.3)
+    def test_long_running_task_is_not_reclaimed(self):
+        outlast_lock.enqueue(0.6)
+
+        self.assertEqual(Worker().run_pending(), 1)
+        self.assertEqual(calls, [None])
+        finished = Task.objects.get()
+        self.assertEqual((finished.status, finished.attempts), ('succeeded', 1))
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        from django.contrib.sessions.models import Session
+        from django.utils import timezone
+
+        now = timezone.now()
+        for index in range(5):
+            Task.objects.create(
+                name='old', status='succeeded', run_at=now,
+                finished_at=now - timedelta(days=40 + index)
+            )
+        Task.objects.create(name='recent', status='failed', run_at=now, finished_at=now)
+        Task.objects.create(name='waiting', run_at=now - timedelta(days=60))
+        Session.objects.create(
+            session_key='expired', session_data='', expire_date=now - timedelta(seconds=1)
+        )
+        Session.objects.create(
+            session_key='current', session_data='', expire_date=now + timedelta(days=1)
+        )
+
+    def _call(self, *args, **options):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('apply_retention', *args, pause=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_expired_rows_are_deleted_in_batches(self):
+        from django.contrib.sessions.models import Session
+
+        output = self._call('finished_tasks', 'expired_sessions', batch_size=2)
+        self.assertIn('finished_tasks: deleted 5 rows in 3 batches', output)
+        self.assertIn('expired_sessions: deleted 1 rows in 1 batches', output)
+        self.assertEqual(
+            sorted(Task.objects.values_list('name', flat=True)), ['recent', 'waiting']
+        )
+        self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['current'])
+
+    def test_dry_run_only_counts(self):
+        from django.core.management import CommandError
+
+        self.assertIn('finished_tasks: 5 rows would be deleted', self._call(dry_run=True))
+        self.assertEqual(Task.objects.count(), 7)
+        with self.assertRaises(CommandError):
+            self._call('everything')
+
@@ -0,0 +1,210 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Task, TaskMetric
+from .registry import UnknownTask, get_task
+
+logger = logging.getLogger(__name__)
+
+# Seconds without a heartbeat after which a running task is assumed to
+# belong to a dead worker
+VISIBILITY_TIMEOUT = getattr(settings, 'JOBS_VISIBILITY_TIMEOUT', 300)
+
+# Seconds between refreshes of a running task's lock
+HEARTBEAT_INTERVAL = getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', VISIBILITY_TIMEOUT / 5)
+
+# First retry delay in seconds; doubled on every further attempt
+RETRY_BACKOFF = getattr(settings, 'JOBS_RETRY_BACKOFF', 5)
+
+# Upper bound on a single retry delay
+RETRY_BACKOFF_MAX = getattr(settings, 'JOBS_RETRY_BACKOFF_MAX', 3600)
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter for the given attempt number"""
+    delay = min(RETRY_BACKOFF * 2 ** (attempts - 1), RETRY_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class Heartbeat:
+    """
+    Refreshes the lock of a running task from a background thread.
+
+    Tasks may run far longer than VISIBILITY_TIMEOUT; as long as the
+    worker is alive, the lock stays fresh and no other worker claims the
+    task. Only the worker holding the lock refreshes it.
+    """
+
+    def __init__(self, task, worker_name):
+        self.task_id = task.pk
+        self.worker_name = worker_name
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name=f"heartbeat-{task.pk}", daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopping.set()
+        self.thread.join()
+
+    def beat(self):
+        return Task.objects.filter(
+            pk=self.task_id, status='running', locked_by=self.worker_name
+        ).update(locked_at=timezone.now())
+
+    def run(self):
+        try:
+            while not self.stopping.wait(HEARTBEAT_INTERVAL):
+                try:
+                    self.beat()
+                except Exception:
+                    logger.exception("Heartbeat of task #%s failed", self.task_id)
+        finally:
+            # The thread's own connections
+            connections.close_all()
+
+
+class Worker:
+    """Claims due tasks from the database and runs them one at a time"""
+
+    def __init__(self, queues=('default',), name=None, poll_interval=1.0):
+        self.queues = list(queues)
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.poll_interval = poll_interval
+        self.stopping = threading.Event()
+
+    def claim(self):
+        """Lock and mark the next due task as running, or return None"""
+        now = timezone.now()
+        due = Task.objects.filter(queue__in=self.queues).filter(
+            Q(status='queued', run_at__lte=now) |
+            Q(status='running', locked_at__lt=now - timedelta(seconds=VISIBILITY_TIMEOUT))
+        ).order_by('run_at', 'pk')
+
+        with transaction.atomic():
+            if connection.features.has_select_for_update_skip_locked:
+                # Concurrent workers skip rows another worker is claiming
+                due = due.select_for_update(skip_locked=True)
+            candidate = due.only('pk', 'status', 'locked_at').first()
+            if candidate is None:
+                return None
+            # Conditional update keeps the claim safe without row locks
+            claimed = Task.objects.filter(
+                pk=candidate.pk,
+                status=candidate.status,
+                locked_at=candidate.locked_at
+            ).update(
+                status='running',
+                locked_at=now,
+                locked_by=self.name,
+                attempts=F('attempts') + 1
+            )
+        if not claimed:
+            return None
+        return Task.objects.get(pk=candidate.pk)
+
+    def execute(self, task):
+        """Run a claimed task and record its outcome"""
+        started = time.monotonic()
+        try:
+            func = get_task(task.name)
+            with Heartbeat(task, self.name):
+                func(*task.args, **task.kwargs)
+        except Exception as exc:
+            elapsed = time.monotonic() - started
+            error = traceback.format_exc()
+            retry = not isinstance(exc, UnknownTask) and task.attempts < task.max_attempts
+            if retry:
+                Task.objects.filter(pk=task.pk).update(
+                    status='queued',
+                    run_at=timezone.now() + timedelta(seconds=retry_delay(task.attempts)),
+                    locked_at=None,
+                    locked_by='',
+                    last_error=error
+                )
+                outcome = 'retried'
+            else:
+                Task.objects.filter(pk=task.pk).update(
+                    status='failed',
+                    finished_at=timezone.now(),
+                    last_error=error
+                )
+                outcome = 'failed'
+            logger.warning("Task %s #%s %s: %s", task.name, task.pk, outcome, exc)
+        else:
+            elapsed = time.monotonic() - started
+            Task.objects.filter(pk=task.pk).update(
+                status='succeeded',
+                finished_at=timezone.now(),
+                last_error=''
+            )
+            outcome = 'succeeded'
+        record_metric(task.name, outcome, elapsed)
+        return outcome
+
+    def run_pending(self, limit=None):
+        """Run due tasks until none are left; return how many ran"""
+        ran = 0
+        while limit is None or ran < limit:
+            task = self.claim()
+            if task is None:
+                break
+            self.execute(task)
+            ran += 1
+        return ran
+
+    def run_forever(self):
+        """Poll for tasks until stop() is called"""
+        logger.info("Worker %s started on %s", self.name, ', '.join(self.queues))
+        while not self.stopping.is_set():
+            close_old_connections()
+            try:
+                ran = self.run_pending(limit=100)
+            except Exception:
+                logger.exception("Worker %s failed to claim a task", self.name)
+                ran = 0
+            if not ran:
+                self.stopping.wait(self.poll_interval)
+        close_old_connections()
+        logger.info("Worker %s stopped", self.name)
+
+    def stop(self):
+        self.stopping.set()
+
+
+def record_metric(name, outcome, seconds):
+    """Add one execution to the per-task totals"""
+    now = timezone.now()
+    changes = {
+        outcome: F(outcome) + 1,
+        'total_seconds': F('total_seconds') + seconds,
+        'max_seconds': Greatest('max_seconds', seconds),
+        'last_run_at': now,
+    }
+    if TaskMetric.objects.filter(name=name).update(**changes):
+        return
+    metric, created = TaskMetric.objects.get_or_create(
+        name=name,
+        defaults={
+            outcome: 1, 'total_seconds': seconds,
+            'max_seconds': seconds, 'last_run_at': now,
+        }
+    )
+    if not created:
+        TaskMetric.objects.filter(name=name).update(**changes)
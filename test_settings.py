@@ -5,8 +5,21 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
-    }
+    },
+    # Read replica, serving the primary's test database as a real
+    # replica would serve its data
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'TEST': {'MIRROR': 'default'},
+    },
+    # Second workout shard, enabled by tests overriding WORKOUT_SHARDS
+    'shard_2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    },
 }
+DATABASE_REPLICAS = ['replica']
 
 # Disable password hashing for faster tests
 PASSWORD_HASHERS = [
@@ -16,6 +29,9 @@ PASSWORD_HASHERS = [
 # Use a simpler password hasher for tests
 AUTH_PASSWORD_VALIDATORS = []
 
+# Fail requests running N+1 queries or over their query budget
+QUERY_INSPECTION = 'raise'
+
 # Disable logging during tests
 import logging
 logging.disable(logging.CRITICAL)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class WorkoutsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workouts'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Registers the deploy check for a cache shared between processes
+        from FitnessTrackerApp_backend import caching  # noqa: F401
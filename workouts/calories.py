@@ -0,0 +1,153 @@
+"""
+Calorie estimates from MET (metabolic equivalent) values.
+
+kcal = MET x 3.5 x weight in kg / 200 x minutes, with METs taken from
+the Compendium of Physical Activities per workout type and intensity.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Case, DecimalField, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Workout
+
+INTENSITIES = ['low', 'medium', 'high']
+
+# METs at low, medium and high intensity
+MET_TABLE = {
+    'running': (7.0, 9.8, 11.8),
+    'cycling': (4.0, 6.8, 10.0),
+    'swimming': (6.0, 8.3, 10.0),
+    'walking': (2.8, 3.5, 5.0),
+    'gym': (3.5, 5.0, 6.0),
+    'yoga': (2.0, 2.5, 4.0),
+    'pilates': (2.8, 3.0, 3.8),
+    'hiit': (6.0, 8.0, 10.0),
+    'cardio': (5.0, 7.0, 9.0),
+    'strength': (3.5, 5.0, 6.0),
+    'sports': (4.0, 6.0, 8.0),
+    'other': (3.0, 4.5, 6.0),
+}
+
+WORKOUT_TYPES = [choice for choice, _ in Workout.WORKOUT_TYPES]
+
+# Rows indexed by [type code][intensity code], codes as in the lists above
+MET_ROWS = [MET_TABLE[workout_type] for workout_type in WORKOUT_TYPES]
+
+# Used when the user has not entered a weight
+DEFAULT_WEIGHT_KG = 70
+
+# Largest value calories_burned can hold
+MAX_CALORIES = 9999.99
+
+KCAL_PER_MET_KG_MINUTE = 3.5 / 200
+
+MET_ARRAY = np.array(MET_ROWS)
+
+
+def estimate(workout_type, intensity, duration, weight=None):
+    """Return estimated calories as a Decimal, or None without a duration"""
+    if not duration or duration <= 0:
+        return None
+    mets = MET_TABLE.get(workout_type, MET_TABLE['other'])
+    met = mets[INTENSITIES.index(intensity) if intensity in INTENSITIES else 1]
+    kcal = met * KCAL_PER_MET_KG_MINUTE * float(weight or DEFAULT_WEIGHT_KG) * duration
+    return Decimal(str(min(round(kcal, 2), MAX_CALORIES))).quantize(Decimal('0.01'))
+
+
+def fill_missing(workout, weight=None):
+    """Set calories_burned from an estimate if it is empty; return if it did"""
+    if workout.calories_burned is not None:
+        return False
+    value = estimate(workout.workout_type, workout.intensity, workout.duration, weight)
+    if value is None:
+        return False
+    workout.calories_burned = value
+    return True
+
+
+def estimate_batch(type_codes, intensity_codes, durations, weights):
+    """Estimate calories for parallel sequences of codes, minutes and kg"""
+    kcal = (
+        MET_ARRAY[np.asarray(type_codes), np.asarray(intensity_codes)]
+        * KCAL_PER_MET_KG_MINUTE
+        * np.asarray(weights, dtype=float)
+        * np.asarray(durations, dtype=float)
+    )
+    return np.minimum(np.round(kcal, 2), MAX_CALORIES).tolist()
+
+
+def _code(field, values, default):
+    """Map a choice column to its index in values, computed by the database"""
+    return Case(
+        *(When(**{field: value}, then=Value(index)) for index, value in enumerate(values)),
+        default=Value(default),
+        output_field=IntegerField()
+    )
+
+
+def missing_rows(alias):
+    """Workouts on a shard without calories but with a duration"""
+    return Workout._base_manager.using(alias).filter(
+        calories_burned__isnull=True, duration__gt=0
+    ).order_by('pk')
+
+
+def backfill(alias, batch_size=10000):
+    """
+    Fill missing calories on one shard in chunks.
+
+    The database turns types and intensities into table indexes, the
+    chunk is estimated in one vectorized call and written back with one
+    statement. Yields (rows written, ids of users with completed rows)
+    per chunk.
+    """
+    rows = missing_rows(alias).annotate(
+        type_code=_code('workout_type', WORKOUT_TYPES, WORKOUT_TYPES.index('other')),
+        intensity_code=_code('intensity', INTENSITIES, 1),
+        weight_kg=Coalesce(
+            'user__weight', Value(Decimal(DEFAULT_WEIGHT_KG)),
+            output_field=DecimalField()
+        ),
+    )
+    last_pk = 0
+    while True:
+        chunk = list(rows.filter(pk__gt=last_pk).values_list(
+            'pk', 'user_id', 'status', 'type_code', 'intensity_code',
+            'duration', 'weight_kg'
+        )[:batch_size])
+        if not chunk:
+            return
+        pks, user_ids, statuses, type_codes, intensity_codes, durations, weights = zip(*chunk)
+        values = estimate_batch(type_codes, intensity_codes, durations, weights)
+        _write(alias, pks, values)
+        last_pk = pks[-1]
+        yield len(pks), {
+            user_id for user_id, state in zip(user_ids, statuses)
+            if state == 'completed'
+        }
+
+
+def _write(alias, pks, values):
+    """Store calories for many rows at once, keeping values set meanwhile"""
+    connection = connections[alias]
+    now = timezone.now()
+    with transaction.atomic(using=alias), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "UPDATE workouts SET calories_burned = v.calories, updated_at = %s "
+                "FROM unnest(%s::bigint[], %s::numeric[]) AS v(id, calories) "
+                "WHERE workouts.id = v.id AND workouts.calories_burned IS NULL",
+                [now, list(pks), values]
+            )
+        else:
+            # One prepared statement run per row is far cheaper here than
+            # bulk_update's CASE over the whole chunk
+            cursor.executemany(
+                "UPDATE workouts SET calories_burned = %s, updated_at = %s "
+                "WHERE id = %s AND calories_burned IS NULL",
+                [(Decimal(str(value)), now, pk) for pk, value in zip(pks, values)]
+            )
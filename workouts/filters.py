@@ -0,0 +1,74 @@
+"""
+Query parameter filtering of workout lists.
+
+Validated parameters are combined into one filter() call whose lookups
+follow the column order of the composite (user, ..., workout_date)
+indexes: equality on the leading columns, then the date range, then the
+unindexed ranges. The same parameters always give the same SQL.
+"""
+import operator
+
+from django.db.models import Q
+from django_filters import rest_framework as filters
+from django_filters.constants import EMPTY_VALUES
+
+from .models import Workout
+
+# Python equivalents of the lookups, for rows that are not in the database
+LOOKUP_TESTS = {
+    'exact': operator.eq,
+    'in': lambda value, choices: value in choices,
+    'gte': operator.ge,
+    'lte': operator.le,
+}
+
+
+class ChoiceInFilter(filters.BaseInFilter, filters.ChoiceFilter):
+    """Comma-separated list of choices"""
+
+
+class WorkoutFilter(filters.FilterSet):
+    # Declared in index column order
+    workout_type = filters.ChoiceFilter(choices=Workout.WORKOUT_TYPES)
+    workout_type__in = ChoiceInFilter(
+        field_name='workout_type', lookup_expr='in', choices=Workout.WORKOUT_TYPES
+    )
+    status = filters.ChoiceFilter(choices=Workout.STATUS_CHOICES)
+    status__in = ChoiceInFilter(
+        field_name='status', lookup_expr='in', choices=Workout.STATUS_CHOICES
+    )
+    start_date = filters.DateFilter(field_name='workout_date', lookup_expr='gte')
+    end_date = filters.DateFilter(field_name='workout_date', lookup_expr='lte')
+    intensity = filters.ChoiceFilter(choices=Workout._meta.get_field('intensity').choices)
+    duration__gte = filters.NumberFilter(field_name='duration', lookup_expr='gte', min_value=0)
+    duration__lte = filters.NumberFilter(field_name='duration', lookup_expr='lte', min_value=0)
+    distance__gte = filters.NumberFilter(field_name='distance', lookup_expr='gte', min_value=0)
+    distance__lte = filters.NumberFilter(field_name='distance', lookup_expr='lte', min_value=0)
+    calories__gte = filters.NumberFilter(field_name='calories_burned', lookup_expr='gte', min_value=0)
+    calories__lte = filters.NumberFilter(field_name='calories_burned', lookup_expr='lte', min_value=0)
+
+    class Meta:
+        model = Workout
+        fields = []
+
+    def lookups(self):
+        """(field, lookup, value) of the given parameters, in index order"""
+        return [
+            (self.filters[name].field_name, self.filters[name].lookup_expr, value)
+            for name, value in self.form.cleaned_data.items()
+            if value not in EMPTY_VALUES
+        ]
+
+    def filter_queryset(self, queryset):
+        # Q(**kwargs) would sort the lookups by name
+        return queryset.filter(Q(*[
+            (f"{field}__{lookup}", value) for field, lookup, value in self.lookups()
+        ]))
+
+    def matches(self, workout):
+        """Whether an unsaved workout, such as a virtual occurrence, passes"""
+        for field, lookup, value in self.lookups():
+            current = getattr(workout, field)
+            if current is None or not LOOKUP_TESTS[lookup](current, value):
+                return False
+        return True
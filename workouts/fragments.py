@@ -0,0 +1,54 @@
+"""
+Serialized workouts cached one fragment per row.
+
+A fragment is a workout's serializer output keyed by its id and
+``updated_at``. Saves and the app's set-based updates move
+``updated_at``, so a changed row gets a new key and its old fragment
+simply expires. Lists fetch all their fragments with one get_many and
+serialize only the misses, stored back with one set_many.
+
+Virtual recurrence occurrences have no row and are never cached. The
+owner's email and the recurrence are filled in from the row when a
+fragment is read: emails change on another table, and deleting a rule
+clears ``recurrence`` with an UPDATE that leaves ``updated_at`` alone.
+
+Fragments are kept in the 'fragments' cache, so a long list cannot
+evict throttle buckets, replica pins or shard placements from the
+default cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+# Bump when WorkoutSerializer output changes, orphaning older fragments
+VERSION = 1
+
+# Seconds a fragment is kept; unchanged workouts are re-cached on read
+CACHE_TIMEOUT = getattr(settings, 'WORKOUT_FRAGMENT_TIMEOUT', 60 * 60 * 24 * 7)
+
+CACHE_ALIAS = 'fragments'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def is_cacheable(workout):
+    if workout.pk is None or workout.updated_at is None:
+        return False
+    return not getattr(workout, 'virtual_id', None)
+
+
+def cache_key(workout):
+    return f"workout-fragment:{VERSION}:{workout.pk}:{workout.updated_at.isoformat()}"
+
+
+def get_many(workouts):
+    """Cached fragments of the workouts, by cache key"""
+    keys = [cache_key(workout) for workout in workouts if is_cacheable(workout)]
+    return get_cache().get_many(keys) if keys else {}
+
+
+def set_many(fragments):
+    """Store fragments given by cache key"""
+    if fragments:
+        get_cache().set_many(fragments, CACHE_TIMEOUT)
@@ -0,0 +1,176 @@
+"""
+Goal progress kept as per-period counters.
+
+Every change to a completed workout adds its difference to the
+counters of the owner's matching goals, in the transaction that writes
+the workout: goal rows live on the user's shard next to the workouts.
+Reading progress is then one counter per goal, whatever the history.
+Counters are filled from existing workouts when a goal is created or
+its definition changes.
+"""
+from calendar import monthrange
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Now, TruncMonth, TruncWeek
+
+from . import sharding
+from .leaderboards import period_start
+from .models import Goal, GoalProgress, Workout
+
+# Workout field summed by each metric; workouts are counted
+METRIC_FIELDS = {
+    'workouts': None,
+    'distance': 'distance',
+    'duration': 'duration',
+    'calories': 'calories_burned',
+}
+
+# Changing these recounts a goal's progress
+DEFINITION_FIELDS = ['metric', 'period', 'workout_type', 'start_date', 'end_date']
+
+
+def period_bounds(goal, day):
+    """First and last day of the goal's period containing day"""
+    if goal.period == 'custom':
+        return goal.start_date, goal.end_date
+    start = max(period_start(goal.period, day), goal.start_date)
+    if goal.period == 'week':
+        end = period_start('week', day) + timedelta(days=6)
+    else:
+        end = day.replace(day=monthrange(day.year, day.month)[1])
+    if goal.end_date is not None:
+        end = min(end, goal.end_date)
+    return start, end
+
+
+def counts(goal, values):
+    """Whether a workout snapshot counts towards the goal"""
+    if not values or values['status'] != 'completed' or not values['workout_date']:
+        return False
+    if values.get('is_template'):
+        return False
+    if goal.workout_type and values['workout_type'] != goal.workout_type:
+        return False
+    if values['workout_date'] < goal.start_date:
+        return False
+    return goal.end_date is None or values['workout_date'] <= goal.end_date
+
+
+def amount(metric, values):
+    field = METRIC_FIELDS[metric]
+    if field is None:
+        return Decimal(1)
+    return Decimal(str(values[field] or 0))
+
+
+def record_change(previous, current):
+    """
+    Move a changed workout's contribution between goal counters.
+
+    Call inside the transaction writing the workout, on its shard.
+    """
+    if previous == current:
+        return
+    goals = {}
+    deltas = {}
+    for values, sign in ((previous, -1), (current, 1)):
+        if not values or values['status'] != 'completed':
+            continue
+        user_id = values['user_id']
+        if user_id not in goals:
+            goals[user_id] = list(Goal.objects.for_user(user_id))
+        for goal in goals[user_id]:
+            if counts(goal, values):
+                key = (goal, period_bounds(goal, values['workout_date'])[0])
+                deltas[key] = deltas.get(key, 0) + sign * amount(goal.metric, values)
+    for (goal, start), delta in deltas.items():
+        if delta:
+            _apply_delta(goal, start, delta)
+
+
+def _apply_delta(goal, start, delta):
+    progress = GoalProgress.objects.for_user(goal.user_id)
+    # updated_at is set by hand as update() skips auto_now; shard moves
+    # catch up on the counters changed since they started
+    change = {'value': F('value') + delta, 'updated_at': Now()}
+    if progress.filter(goal=goal, period_start=start).update(**change):
+        return
+    try:
+        with transaction.atomic(using=sharding.shard_for(goal.user_id)):
+            progress.create(goal=goal, period_start=start, value=delta)
+    except IntegrityError:
+        # Another writer created the counter first
+        progress.filter(goal=goal, period_start=start).update(**change)
+
+
+def recount(goal):
+    """Rebuild a goal's counters from the user's completed workouts"""
+    workouts = Workout.objects.for_user(goal.user_id).filter(
+        status='completed', is_template=False, workout_date__gte=goal.start_date
+    )
+    if goal.end_date is not None:
+        workouts = workouts.filter(workout_date__lte=goal.end_date)
+    if goal.workout_type:
+        workouts = workouts.filter(workout_type=goal.workout_type)
+
+    field = METRIC_FIELDS[goal.metric]
+    total = Count('id') if field is None else Sum(field)
+    if goal.period == 'custom':
+        rows = [(goal.start_date, workouts.aggregate(total=total)['total'])]
+    else:
+        trunc = TruncWeek if goal.period == 'week' else TruncMonth
+        rows = workouts.annotate(bucket=trunc('workout_date')).values_list(
+            'bucket'
+        ).annotate(total=total).order_by()
+        # The first period of a goal starting mid-period begins on its start
+        rows = [(max(bucket, goal.start_date), value) for bucket, value in rows]
+
+    counters = [
+        GoalProgress(goal=goal, period_start=start, value=value)
+        for start, value in rows if value
+    ]
+    for counter in counters:
+        sharding.assign_id(counter)
+    with transaction.atomic(using=sharding.shard_for(goal.user_id)):
+        GoalProgress.objects.for_user(goal.user_id).filter(goal=goal).delete()
+        GoalProgress.objects.for_user(goal.user_id).bulk_create(counters)
+
+
+def recount_users(user_ids):
+    """Rebuild every goal of the users, after changes that skip signals"""
+    for user_id in user_ids:
+        for goal in Goal.objects.for_user(user_id):
+            recount(goal)
+
+
+def progress(goals, today):
+    """
+    Current period, value and completion of each goal.
+
+    One query for all the goals' counters.
+    """
+    bounds = {goal.pk: period_bounds(goal, today) for goal in goals}
+    values = {}
+    if goals:
+        rows = GoalProgress.objects.for_user(goals[0].user_id).filter(
+            goal__in=goals,
+            period_start__in={start for start, _ in bounds.values()}
+        ).values_list('goal_id', 'period_start', 'value')
+        values = {(goal_id, start): value for goal_id, start, value in rows}
+
+    results = []
+    for goal in goals:
+        start, end = bounds[goal.pk]
+        value = values.get((goal.pk, start), Decimal(0))
+        results.append({
+            'goal': goal,
+            'period_start': start,
+            'period_end': end,
+            'value': value,
+            'percent': round(min(value / goal.target * 100, 100), 1),
+            'achieved': value >= goal.target,
+        })
+    return results
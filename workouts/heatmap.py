@@ -0,0 +1,103 @@
+from array import array
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Workout
+
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+# Day values are packed as (count << LEVEL_BITS) | level
+LEVEL_BITS = 3
+
+# Minutes of completed training per extra intensity level (max level 4)
+MINUTES_PER_LEVEL = 30
+
+
+def cache_key(user_id, year):
+    return f"heatmap:{user_id}:{year}"
+
+
+def days_in_year(year):
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def build(user_id, year):
+    """Return (counts, minutes) arrays for a year from one GROUP BY"""
+    size = days_in_year(year)
+    counts = array('H', bytes(2 * size))
+    minutes = array('I', bytes(4 * size))
+    rows = Workout.objects.for_user(user_id).filter(
+        status='completed',
+        is_template=False,
+        workout_date__gte=date(year, 1, 1),
+        workout_date__lt=date(year + 1, 1, 1)
+    ).values('workout_date').annotate(
+        total=Count('id'), duration=Sum('duration')
+    ).order_by()
+    for row in rows:
+        index = row['workout_date'].timetuple().tm_yday - 1
+        counts[index] = row['total']
+        minutes[index] = row['duration'] or 0
+    return counts, minutes
+
+
+def load(user_id, year):
+    """Return the cached (counts, minutes) arrays, building them on a miss"""
+    key = cache_key(user_id, year)
+    cached = cache.get(key)
+    if cached is not None:
+        return _decode(cached)
+
+    counts, minutes = build(user_id, year)
+    cache.set(key, (counts.tobytes(), minutes.tobytes()), CACHE_TIMEOUT)
+    return counts, minutes
+
+
+def _decode(cached):
+    counts, minutes = array('H'), array('I')
+    counts.frombytes(cached[0])
+    minutes.frombytes(cached[1])
+    return counts, minutes
+
+
+def level(count, minutes):
+    """Map a day's workouts and minutes to an intensity level from 0 to 4"""
+    if not count:
+        return 0
+    return 1 + min(3, minutes // MINUTES_PER_LEVEL)
+
+
+def encode(counts, minutes):
+    """Pack each day into a single integer"""
+    return [
+        (count << LEVEL_BITS) | level(count, minutes[index])
+        for index, count in enumerate(counts)
+    ]
+
+
+def _contribution(values):
+    if not values or values.get('status') != 'completed' or values.get('is_template'):
+        return None
+    if not values.get('workout_date') or not values.get('user_id'):
+        return None
+    return values['user_id'], values['workout_date'], int(values.get('duration') or 0)
+
+
+def record_change(old, new, using):
+    """
+    Drop the cached years a change touches once it commits.
+
+    Rolled back writes leave the cache alone, and concurrent writers
+    cannot overwrite each other's patches; the next read rebuilds.
+    """
+    before, after = _contribution(old), _contribution(new)
+    if before == after:
+        return
+    keys = {
+        cache_key(user_id, day.year)
+        for user_id, day, _ in filter(None, (before, after))
+    }
+    transaction.on_commit(lambda: cache.delete_many(list(keys)), using=using)
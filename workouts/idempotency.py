@@ -0,0 +1,135 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from jobs.retention import get_policy
+
+from .models import IdempotencyKey
+from .sharding import shard_for
+
+HEADER = 'Idempotency-Key'
+
+# Seconds a stored response is replayed for
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24)
+
+# Seconds after which an unfinished key is assumed abandoned
+LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+# Seconds a duplicate waits for the first request before giving up
+WAIT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 5)
+
+POLL_INTERVAL = 0.1
+
+
+def fingerprint(request):
+    """Hash what makes two requests the same: method, path and body"""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f"{request.method} {request.path}\n{body}".encode()
+    ).hexdigest()
+
+
+def claim(user, key, digest):
+    """Insert the row for a key; return it, or None if the key is taken"""
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                fingerprint=digest,
+                expires_at=timezone.now() + timedelta(seconds=KEY_TTL)
+            )
+    except IntegrityError:
+        return None
+
+
+def _is_stale(record, now):
+    if record.expires_at <= now:
+        return True
+    return not record.is_complete and record.created_at < now - timedelta(seconds=LOCK_TIMEOUT)
+
+
+def _error(message, code, **headers):
+    return Response({'error': message}, status=code, headers=headers)
+
+
+def run(request, handler):
+    """Run handler once per (user, key) and replay its response afterwards"""
+    key = request.headers.get(HEADER)
+    if key is None:
+        return handler()
+    if not key or len(key) > 255:
+        return _error(
+            f"{HEADER} must be between 1 and 255 characters",
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    digest = fingerprint(request)
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while True:
+        # Look before inserting so a replay costs a single query
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is None:
+            record = claim(request.user, key, digest)
+            if record is not None:
+                break
+            continue
+        if _is_stale(record, timezone.now()):
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            continue
+        if record.fingerprint != digest:
+            return _error(
+                f"{HEADER} was already used for a different request",
+                status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if record.is_complete:
+            return Response(
+                record.response_body,
+                status=record.response_status,
+                headers={'Idempotent-Replayed': 'true'}
+            )
+        if time.monotonic() >= deadline:
+            return _error(
+                "A request with this key is still in progress",
+                status.HTTP_409_CONFLICT,
+                **{'Retry-After': '1'}
+            )
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        # The response is stored with the changes it reports, so a
+        # crash in between leaves neither and the key can be retried
+        with transaction.atomic(), transaction.atomic(using=shard_for(request.user.pk)):
+            response = handler()
+            if response.status_code < 500:
+                IdempotencyKey.objects.filter(pk=record.pk).update(
+                    response_status=response.status_code,
+                    response_body=response.data
+                )
+    except Exception:
+        record.delete()
+        raise
+    if response.status_code >= 500:
+        record.delete()
+    return response
+
+
+def idempotent(view_method):
+    """Replay the first response of a view method for a repeated key"""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        return run(request, lambda: view_method(self, request, *args, **kwargs))
+    return wrapper
+
+
+def prune_expired(batch_size=1000, pause=None):
+    """Delete expired keys in batches; return how many were deleted"""
+    return get_policy('idempotency_keys').apply(batch_size=batch_size, pause=pause)['rows']
@@ -0,0 +1,340 @@
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from . import sharding
+from .models import LeaderboardBucket, LeaderboardScore, Workout
+
+User = get_user_model()
+
+PERIODS = ['week', 'month']
+
+METRICS = LeaderboardScore.METRICS
+
+# Bucket boundaries grow geometrically (64 per doubling, ~1% wide) and
+# are rounded to the score precision so Python and SQL agree on them.
+BUCKET_BOUNDS = sorted({
+    Decimal(2 ** (step / 64)).quantize(Decimal('0.01'))
+    for step in range(-64 * 7, 64 * 34)
+} - {Decimal('0.00')})
+
+
+def period_start(period, day):
+    """Return the first day of the week (Monday) or month containing day"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def bucket_of(score):
+    """Return the bucket index of a score, None for non-positive scores"""
+    if not score or score <= 0:
+        return None
+    return max(bisect_right(BUCKET_BOUNDS, Decimal(score)) - 1, 0)
+
+
+def bucket_upper(bucket):
+    """Return the exclusive upper score bound of a bucket, if any"""
+    if bucket + 1 < len(BUCKET_BOUNDS):
+        return BUCKET_BOUNDS[bucket + 1]
+    return None
+
+
+def contributions(values):
+    """
+    Return the score contributions of a workout snapshot.
+
+    Maps (user_id, period, period_start, workout_type) to a
+    [distance, duration, calories] list. Only completed workouts score,
+    recurrence templates never.
+    """
+    if not values or values.get('status') != 'completed' or values.get('is_template'):
+        return {}
+    if not values.get('workout_date') or not values.get('user_id'):
+        return {}
+    metrics = [
+        Decimal(str(values.get('distance') or 0)),
+        int(values.get('duration') or 0),
+        Decimal(str(values.get('calories_burned') or 0)),
+    ]
+    return {
+        (
+            values['user_id'], period,
+            period_start(period, values['workout_date']),
+            values['workout_type'],
+        ): metrics
+        for period in PERIODS
+    }
+
+
+def is_opted_in(workout):
+    """Return True if the workout's owner takes part in leaderboards"""
+    if Workout.user.is_cached(workout):
+        return workout.user.leaderboard_opt_in
+    return User.objects.filter(
+        pk=workout.user_id, leaderboard_opt_in=True
+    ).exists()
+
+
+def record_change(workout, old, new):
+    """Apply the difference between two workout snapshots to the scores"""
+    deltas = defaultdict(lambda: [Decimal(0), 0, Decimal(0)])
+    for key, metrics in contributions(old).items():
+        for index, value in enumerate(metrics):
+            deltas[key][index] -= value
+    for key, metrics in contributions(new).items():
+        for index, value in enumerate(metrics):
+            deltas[key][index] += value
+
+    changed = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not changed or not is_opted_in(workout):
+        return
+    for key, delta in changed.items():
+        _apply_delta(key, delta)
+
+
+def _apply_delta(key, delta):
+    user_id, period, start, workout_type = key
+    board_key = {
+        'period': period, 'period_start': start, 'workout_type': workout_type
+    }
+    with transaction.atomic():
+        entry = LeaderboardScore.objects.select_for_update().filter(
+            user_id=user_id, **board_key
+        ).first()
+        if entry is None:
+            try:
+                with transaction.atomic():
+                    entry = LeaderboardScore.objects.create(user_id=user_id, **board_key)
+            except IntegrityError:
+                # Another writer created the row first
+                entry = LeaderboardScore.objects.select_for_update().get(
+                    user_id=user_id, **board_key
+                )
+
+        for metric, change in zip(METRICS, delta):
+            old = getattr(entry, metric)
+            new = old + change
+            setattr(entry, metric, new)
+            _move_bucket(board_key, metric, bucket_of(old), bucket_of(new))
+        entry.save(update_fields=METRICS)
+
+
+def _move_bucket(board_key, metric, old_bucket, new_bucket):
+    if old_bucket == new_bucket:
+        return
+    if old_bucket is not None:
+        LeaderboardBucket.objects.filter(
+            metric=metric, bucket=old_bucket, **board_key
+        ).update(count=F('count') - 1)
+    if new_bucket is not None:
+        bucket = LeaderboardBucket.objects.filter(
+            metric=metric, bucket=new_bucket, **board_key
+        )
+        if bucket.update(count=F('count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                LeaderboardBucket.objects.create(
+                    metric=metric, bucket=new_bucket, count=1, **board_key
+                )
+        except IntegrityError:
+            bucket.update(count=F('count') + 1)
+
+
+def aggregate(workouts, batch_size=5000):
+    """
+    Score rows the workouts add up to, from one GROUP BY per period.
+
+    Yields ((user_id, period, period_start, workout_type), scores) with
+    scores in METRICS order, counting what contributions() counts.
+    """
+    workouts = workouts.filter(
+        status='completed', is_template=False, user__leaderboard_opt_in=True
+    )
+    truncs = {'week': TruncWeek('workout_date'), 'month': TruncMonth('workout_date')}
+    for period, trunc in truncs.items():
+        for shard_workouts in sharding.fan_out(workouts):
+            rows = shard_workouts.annotate(bucket=trunc).values_list(
+                'user_id', 'bucket', 'workout_type'
+            ).annotate(
+                Sum('distance'), Sum('duration'), Sum('calories_burned')
+            ).order_by()
+            for user_id, start, workout_type, distance, duration, calories in rows.iterator(
+                chunk_size=batch_size
+            ):
+                yield (user_id, period, start, workout_type), (
+                    distance or Decimal(0), duration or 0, calories or Decimal(0)
+                )
+
+
+def rebuild(user_ids=None, since=None, batch_size=5000):
+    """
+    Recompute score rows and bucket counts from completed workouts.
+
+    Uses one GROUP BY per period instead of replaying workouts. With
+    ``since`` only periods overlapping that date onwards are rebuilt.
+    Returns the number of score rows written.
+    """
+    scores = LeaderboardScore.objects.all()
+    workouts = Workout.objects.all()
+    if user_ids is not None:
+        scores = scores.filter(user_id__in=user_ids)
+        workouts = workouts.filter(user_id__in=user_ids)
+    if since is not None:
+        # Align to a boundary that starts both a week and a month
+        since = period_start('month', period_start('week', since))
+        scores = scores.filter(period_start__gte=since)
+        workouts = workouts.filter(workout_date__gte=since)
+
+    written = 0
+    with transaction.atomic():
+        removed = _bucket_counts(
+            scores.values_list('period', 'period_start', 'workout_type', *METRICS),
+            batch_size
+        )
+        scores.delete()
+
+        added = Counter()
+        batch = []
+        for (user_id, period, start, workout_type), totals in aggregate(workouts, batch_size):
+            batch.append(LeaderboardScore(
+                user_id=user_id, period=period, period_start=start,
+                workout_type=workout_type, **dict(zip(METRICS, totals))
+            ))
+            if len(batch) >= batch_size:
+                written += _write_scores(batch, added)
+                batch = []
+        if batch:
+            written += _write_scores(batch, added)
+
+        if user_ids is None:
+            # Every row of the touched boards was rewritten
+            boards = {key[:3] for key in removed} | {key[:3] for key in added}
+            for board_key in boards:
+                LeaderboardBucket.objects.filter(
+                    period=board_key[0], period_start=board_key[1],
+                    workout_type=board_key[2]
+                ).delete()
+            _store_buckets(added, batch_size)
+        else:
+            added.subtract(removed)
+            for key, change in added.items():
+                if change:
+                    _adjust_bucket(key, change)
+    return written
+
+
+def _write_scores(batch, counts):
+    LeaderboardScore.objects.bulk_create(batch)
+    counts.update(_bucket_counts(
+        (
+            (entry.period, entry.period_start, entry.workout_type,
+             *(getattr(entry, metric) for metric in METRICS))
+            for entry in batch
+        ),
+        None
+    ))
+    return len(batch)
+
+
+def _bucket_counts(rows, batch_size):
+    """Count (period, period_start, workout_type, metric, bucket) keys"""
+    if batch_size is not None:
+        rows = rows.iterator(chunk_size=batch_size)
+    counts = Counter()
+    for period, start, workout_type, *scores in rows:
+        for metric, score in zip(METRICS, scores):
+            bucket = bucket_of(score)
+            if bucket is not None:
+                counts[period, start, workout_type, metric, bucket] += 1
+    return counts
+
+
+def _store_buckets(counts, batch_size):
+    LeaderboardBucket.objects.bulk_create(
+        [
+            LeaderboardBucket(
+                period=period, period_start=start, workout_type=workout_type,
+                metric=metric, bucket=bucket, count=count
+            )
+            for (period, start, workout_type, metric, bucket), count in counts.items()
+            if count
+        ],
+        batch_size=batch_size
+    )
+
+
+def _adjust_bucket(key, change):
+    period, start, workout_type, metric, bucket = key
+    entry = LeaderboardBucket.objects.filter(
+        period=period, period_start=start, workout_type=workout_type,
+        metric=metric, bucket=bucket
+    )
+    if not entry.update(count=F('count') + change):
+        LeaderboardBucket.objects.create(
+            period=period, period_start=start, workout_type=workout_type,
+            metric=metric, bucket=bucket, count=change
+        )
+
+
+def rebuild_buckets(period, start, workout_type, batch_size=5000):
+    """Recount the bucket histogram of one board from its score rows"""
+    board_key = {
+        'period': period, 'period_start': start, 'workout_type': workout_type
+    }
+    rows = LeaderboardScore.objects.filter(**board_key).values_list(
+        'period', 'period_start', 'workout_type', *METRICS
+    )
+    counts = _bucket_counts(rows, batch_size)
+    LeaderboardBucket.objects.filter(**board_key).delete()
+    _store_buckets(counts, batch_size)
+
+
+def board(period, start, workout_type):
+    """Return the score rows of one leaderboard"""
+    return LeaderboardScore.objects.filter(
+        period=period, period_start=start, workout_type=workout_type
+    )
+
+
+def top(period, start, workout_type, metric, limit=10):
+    """Return the top ``limit`` rows, read in index order"""
+    return list(
+        board(period, start, workout_type).filter(
+            **{f'{metric}__gt': 0}
+        ).order_by(f'-{metric}', 'user_id')[:limit]
+    )
+
+
+def rank(user, period, start, workout_type, metric):
+    """
+    Return (rank, score) of a user, or (None, None) if unranked.
+
+    Users in higher buckets are summed from the bucket histogram; only
+    the user's own bucket is scanned on the descending metric index.
+    """
+    entries = board(period, start, workout_type)
+    score = entries.filter(user_id=user.pk).values_list(metric, flat=True).first()
+    bucket = bucket_of(score)
+    if bucket is None:
+        return None, None
+
+    above = LeaderboardBucket.objects.filter(
+        period=period, period_start=start, workout_type=workout_type,
+        metric=metric, bucket__gt=bucket
+    ).aggregate(total=Sum('count'))['total'] or 0
+
+    # Two range scans on the index; an OR would defeat it
+    higher = entries.filter(**{f'{metric}__gt': score})
+    upper = bucket_upper(bucket)
+    if upper is not None:
+        higher = higher.filter(**{f'{metric}__lt': upper})
+    tied = entries.filter(**{metric: score, 'user_id__lt': user.pk})
+    return above + higher.count() + tied.count() + 1, score
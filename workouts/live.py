@@ -0,0 +1,248 @@
+"""
+Live workout events pushed to subscribers over server-sent events.
+
+Saving a workout publishes an event on the channels of its user and of
+the workout itself once the transaction commits. Each connected client
+is an asyncio queue registered with the broker, so an idle subscriber
+costs a suspended coroutine rather than a request every few seconds.
+
+The default broker only reaches subscribers in the same process. With
+several server processes, LIVE_EVENTS_BROKER names a Broker subclass
+whose ``publish`` goes through a shared bus and calls ``deliver`` in
+every process.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from FitnessTrackerApp_backend.db_router import request_user_id
+from .models import Workout
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber; a client further behind is disconnected
+# and catches up by reloading when its EventSource reconnects
+QUEUE_SIZE = 100
+
+# Seconds between comments that keep idle connections open through proxies
+HEARTBEAT = getattr(settings, 'LIVE_EVENTS_HEARTBEAT', 15)
+
+# Milliseconds clients wait before reconnecting
+RETRY = 3000
+
+# Workout fields sent with every event
+EVENT_FIELDS = [
+    'id', 'title', 'workout_type', 'status', 'duration', 'distance',
+    'calories_burned', 'workout_date', 'started_at', 'completed_at', 'updated_at',
+]
+
+# Event type by the status a workout changed to
+STATUS_EVENTS = {'in_progress': 'start', 'completed': 'complete', 'skipped': 'skip'}
+
+_event_ids = itertools.count(1)
+
+
+class Subscription:
+    """Queue of events for one connected client"""
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class Broker:
+    """In-process publish/subscribe of events by channel name"""
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        """Register a subscription; call from the event loop serving it"""
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, event):
+        """Send an event to the channel's subscribers; callable from any thread"""
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        """Hand an event to the subscribers of a channel in this process"""
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The loop serving the client has shut down
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._channels.values()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'LIVE_EVENTS_BROKER', 'workouts.live.Broker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def workout_channel(workout_id):
+    return f"workout:{workout_id}"
+
+
+def event_type(previous, current):
+    """Name of the event for a change between two snapshots"""
+    if current is None:
+        return 'delete'
+    if previous is None:
+        return 'create'
+    if previous['status'] != current['status'] and current['status'] in STATUS_EVENTS:
+        return STATUS_EVENTS[current['status']]
+    return 'update'
+
+
+def workout_changed(instance, previous, current, using):
+    """Publish the change to a workout once its transaction commits"""
+    event = {
+        'type': event_type(previous, current),
+        'workout': {field: getattr(instance, field) for field in EVENT_FIELDS},
+    }
+    channels = [user_channel(instance.user_id), workout_channel(instance.pk)]
+
+    def publish():
+        event['id'] = next(_event_ids)
+        broker = get_broker()
+        for channel in channels:
+            broker.publish(channel, event)
+
+    transaction.on_commit(publish, using=using)
+
+
+def _format(event):
+    data = json.dumps(event, cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def _stream(channels):
+    broker = get_broker()
+    subscription = broker.subscribe(channels)
+    try:
+        yield f"retry: {RETRY}\n\n"
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _format(event)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def _token_user_id(request):
+    """User id from ?token= (EventSource cannot send headers) or the header"""
+    token = request.GET.get('token')
+    if token is None:
+        return request_user_id(request)
+    try:
+        return AccessToken(token).get(jwt_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _subscribe_channels(user_id, workout_id):
+    """
+    Channels the user may follow, None if the user is unknown, or [] if
+    the workout is not theirs.
+
+    Database connections are closed afterwards: a stream holds its
+    request open for as long as the client listens.
+    """
+    try:
+        if not get_user_model().objects.filter(pk=user_id, is_active=True).exists():
+            return None
+        if workout_id is None:
+            return [user_channel(user_id)]
+        if not workout_id.isdigit() or not Workout.objects.for_user(user_id).filter(pk=workout_id).exists():
+            return []
+        return [workout_channel(int(workout_id))]
+    finally:
+        connections.close_all()
+
+
+async def live_events(request):
+    """
+    Stream events for the user's workouts, or one workout with ?workout=.
+
+    Authenticated with an access token as ?token= or a Bearer header.
+    Only served by the ASGI application.
+    """
+    if not isinstance(request, ASGIRequest):
+        return _error("Live events are only served by the ASGI application", 501)
+    user_id = _token_user_id(request)
+    channels = None
+    if user_id is not None:
+        channels = await sync_to_async(_subscribe_channels)(user_id, request.GET.get('workout'))
+    if channels is None:
+        return _error("Authentication credentials were not provided or are invalid", 401)
+    if not channels:
+        return _error("Workout not found", 404)
+
+    response = StreamingHttpResponse(_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from workouts import calories, sharding
+from workouts.tasks import refresh_derived_data
+
+
+class Command(BaseCommand):
+    help = "Estimate calories_burned for workouts that have a duration but no calories"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument(
+            '--shard', action='append', dest='shards',
+            help="Only backfill this shard alias (repeatable)"
+        )
+
+    def handle(self, *args, **options):
+        shards = options['shards'] or sharding.shard_aliases()
+        unknown = set(shards) - set(sharding.shard_aliases())
+        if unknown:
+            raise CommandError(f"Unknown shards: {', '.join(sorted(unknown))}")
+
+        started = time.monotonic()
+        total = 0
+        for alias in shards:
+            for written, user_ids in calories.backfill(alias, options['batch_size']):
+                total += written
+                # Bulk writes skip the signals that keep leaderboards current
+                if user_ids:
+                    refresh_derived_data.enqueue(sorted(user_ids), [])
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{alias}: {total} rows ({total / max(elapsed, 1e-9):.0f} rows/s)"
+                )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Estimated calories for {total} workouts in {elapsed:.2f}s"
+        ))
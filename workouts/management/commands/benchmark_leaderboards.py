@@ -0,0 +1,106 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from workouts import leaderboards
+from workouts.models import LeaderboardScore
+
+
+class Rollback(Exception):
+    """Raised to discard the synthetic benchmark rows"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark leaderboard top-N and rank lookups against a synthetic "
+        "board. Rows are inserted in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=500)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        users = options['users']
+        start = leaderboards.period_start('week', timezone.now().date())
+        board = {'period': 'week', 'period_start': start, 'workout_type': 'running'}
+
+        try:
+            with transaction.atomic():
+                self._populate(users, board, options['batch_size'])
+                self._measure(users, board, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _populate(self, users, board, batch_size):
+        started = time.monotonic()
+        rng = random.Random(42)
+        batch = []
+        # Synthetic user ids; foreign keys are deferred and rolled back
+        for user_id in range(1, users + 1):
+            batch.append(LeaderboardScore(
+                user_id=user_id,
+                distance=Decimal(rng.randint(1, 50000)) / 100,
+                duration=rng.randint(1, 3000),
+                calories=Decimal(rng.randint(1, 500000)) / 100,
+                **board
+            ))
+            if len(batch) >= batch_size:
+                LeaderboardScore.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            LeaderboardScore.objects.bulk_create(batch)
+        leaderboards.rebuild_buckets(
+            board['period'], board['period_start'], board['workout_type']
+        )
+        self.stdout.write(
+            f"Inserted {users} rows in {time.monotonic() - started:.1f}s"
+        )
+
+    def _measure(self, users, board, options):
+        rng = random.Random(7)
+        for metric in LeaderboardScore.METRICS:
+            top_times = []
+            rank_times = []
+            for _ in range(options['lookups']):
+                t0 = time.perf_counter()
+                leaderboards.top(
+                    board['period'], board['period_start'],
+                    board['workout_type'], metric, options['limit']
+                )
+                top_times.append(time.perf_counter() - t0)
+
+                user = _UserRef(rng.randint(1, users))
+                t0 = time.perf_counter()
+                leaderboards.rank(
+                    user, board['period'], board['period_start'],
+                    board['workout_type'], metric
+                )
+                rank_times.append(time.perf_counter() - t0)
+
+            self.stdout.write(
+                f"{metric:>9}: top-{options['limit']} {_report(top_times)} | "
+                f"rank {_report(rank_times)}"
+            )
+
+
+class _UserRef:
+    """Stand-in user exposing only the primary key"""
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+def _report(samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+    return f"p50 {p50:.2f}ms p99 {p99:.2f}ms"
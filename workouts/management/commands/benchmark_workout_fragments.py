@@ -0,0 +1,110 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from workouts import fragments
+from workouts.models import Workout
+from workouts.serializers import WorkoutSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark serializing a large workout list with and without the "
+        "fragment cache. Uses unsaved synthetic workouts and the configured "
+        "fragments cache; their fragments are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workouts', type=int, default=2000, help="List size")
+        parser.add_argument('--rounds', type=int, default=20)
+        parser.add_argument(
+            '--change-rate', type=float, default=0.02,
+            help="Share of the workouts edited before each round"
+        )
+
+    def handle(self, *args, **options):
+        if options['workouts'] < 1 or options['rounds'] < 1:
+            raise CommandError("--workouts and --rounds must be positive")
+        if not 0 <= options['change_rate'] <= 1:
+            raise CommandError("--change-rate must be between 0 and 1")
+
+        workouts = self._workouts(options['workouts'])
+        keys = set()
+        try:
+            self._measure(workouts, options, keys)
+        finally:
+            fragments.get_cache().delete_many(list(keys))
+
+    def _workouts(self, count):
+        rng = random.Random(42)
+        owner = get_user_model()(pk=-1, email='benchmark@example.com')
+        stamp = timezone.now()
+        types = [code for code, _ in Workout.WORKOUT_TYPES]
+        workouts = []
+        # Negative ids never match a real row's fragments
+        for index in range(count):
+            workout = Workout(
+                pk=-(index + 1), user=owner, title=f"Workout {index}",
+                workout_type=rng.choice(types), status='completed',
+                duration=rng.randint(10, 180),
+                distance=Decimal(rng.randint(100, 5000)) / 100,
+                calories_burned=Decimal(rng.randint(5000, 150000)) / 100,
+                workout_date=date(2024, 1, 1) + timedelta(days=index % 365),
+                created_at=stamp, updated_at=stamp,
+            )
+            workouts.append(workout)
+        return workouts
+
+    def _measure(self, workouts, options, keys):
+        rng = random.Random(7)
+        serializer = WorkoutSerializer()
+        changed = max(int(len(workouts) * options['change_rate']), 0)
+        plain_times, cached_times = [], []
+        hits = lookups = 0
+
+        for round_number in range(options['rounds'] + 1):
+            if round_number:
+                # An edit moves updated_at, as a save would
+                for workout in rng.sample(workouts, changed):
+                    workout.updated_at += timedelta(microseconds=1)
+
+            t0 = time.perf_counter()
+            [serializer.to_fresh_representation(workout) for workout in workouts]
+            plain = time.perf_counter() - t0
+
+            found = len(fragments.get_many(workouts))
+            t0 = time.perf_counter()
+            WorkoutSerializer(workouts, many=True).data
+            cached = time.perf_counter() - t0
+            keys.update(fragments.cache_key(workout) for workout in workouts)
+
+            if not round_number:
+                self.stdout.write(
+                    f"cold: {len(workouts)} workouts, plain {plain * 1000:.1f}ms, "
+                    f"cached {cached * 1000:.1f}ms (all misses)"
+                )
+                continue
+            plain_times.append(plain)
+            cached_times.append(cached)
+            hits += found
+            lookups += len(workouts)
+
+        self.stdout.write(f"plain:  {_report(plain_times)}")
+        self.stdout.write(f"cached: {_report(cached_times)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"hit rate {hits / lookups:.1%} over {options['rounds']} rounds, "
+            f"median speedup {statistics.median(plain_times) / statistics.median(cached_times):.1f}x"
+        ))
+
+
+def _report(samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)] * 1000
+    return f"p50 {p50:.1f}ms p95 {p95:.1f}ms"
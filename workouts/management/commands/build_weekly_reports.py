@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from jobs.process import pool_results
+from workouts import weekly_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute weekly reports of all active users, by ranges of user "
+        "ids spread over a process pool. Run early on Mondays."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week',
+            help="Any day (YYYY-MM-DD) of the week to report; defaults to last week"
+        )
+        parser.add_argument('--chunk-size', type=int, default=weekly_reports.CHUNK_SIZE)
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help="Pool size; 1 builds in this process"
+        )
+
+    def handle(self, *args, **options):
+        if options['week']:
+            day = parse_date(options['week'])
+            if day is None:
+                raise CommandError("--week must be a date in YYYY-MM-DD format")
+            week = weekly_reports.week_start(day)
+        else:
+            week = weekly_reports.last_finished_week()
+        if week >= weekly_reports.week_start(timezone.now().date()):
+            raise CommandError("Only finished weeks can be reported")
+        if options['chunk_size'] < 1 or options['processes'] < 1:
+            raise CommandError("--chunk-size and --processes must be positive")
+
+        started = time.monotonic()
+        ranges = weekly_reports.user_id_ranges(options['chunk_size'])
+        written = 0
+        results = pool_results(
+            weekly_reports.build_range,
+            [(week, *bounds) for bounds in ranges],
+            options['processes'],
+        )
+        for done, count in enumerate(results, 1):
+            written += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{done}/{len(ranges)} ranges, {written} reports")
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} reports for the week of {week} in {elapsed:.2f}s"
+        ))
+
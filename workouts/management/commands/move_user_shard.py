@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from FitnessTrackerApp_backend import caching
+from workouts import sharding
+
+
+class Command(BaseCommand):
+    help = (
+        "Move a user's workouts to another shard. The user keeps reading "
+        "throughout; writes are refused only during the final catch-up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', type=int)
+        parser.add_argument('shard', help="Database alias of the target shard")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--grace', type=float, default=2.0,
+            help="Seconds to let in-flight writes finish before the catch-up"
+        )
+
+    def handle(self, *args, **options):
+        if not caching.is_shared():
+            raise CommandError(
+                "The default cache is kept per process, so web processes would "
+                "not see the move. Set CACHE_BACKEND and CACHE_LOCATION to a "
+                "shared cache such as Redis or memcached."
+            )
+        if options['shard'] not in sharding.shard_aliases():
+            raise CommandError(
+                f"Unknown shard {options['shard']!r}; "
+                f"choose from {', '.join(sharding.shard_aliases())}"
+            )
+
+        source = sharding.shard_for(options['user_id'])
+        started = time.monotonic()
+        copied = sharding.move_user(
+            options['user_id'], options['shard'],
+            batch_size=options['batch_size'],
+            grace=options['grace']
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved user {options['user_id']} from {source} to {options['shard']}: "
+            f"{copied} rows copied in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from workouts import leaderboards
+
+
+class Command(BaseCommand):
+    help = "Recompute leaderboard score tables from completed workouts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help="Only rebuild periods from this date (YYYY-MM-DD) onwards"
+        )
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help="Only rebuild scores of this user id (repeatable)"
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        started = time.monotonic()
+        written = leaderboards.rebuild(
+            user_ids=options['user_ids'],
+            since=since,
+            batch_size=options['batch_size']
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} leaderboard rows in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,115 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.process import pool_results
+from workouts import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute statistics derived from workouts, by ranges of user ids "
+        "spread over a process pool. Run after changing how a statistic "
+        "is derived."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'stats', nargs='*',
+            help=f"Statistics to rebuild, of {', '.join(sorted(rebuild.STATS))}; defaults to all"
+        )
+        parser.add_argument('--chunk-size', type=int, default=rebuild.CHUNK_SIZE)
+        parser.add_argument('--batch-size', type=int, default=rebuild.BATCH_SIZE)
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help="Pool size; 1 rebuilds in this process"
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help="Skip the ranges an interrupted run already finished"
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Compare recomputed rows with the stored ones; writes nothing"
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options['stats']) - set(rebuild.STATS)
+        if unknown:
+            raise CommandError(f"Unknown statistics: {', '.join(sorted(unknown))}")
+        for name in ('chunk_size', 'batch_size', 'processes'):
+            if options[name] < 1:
+                raise CommandError("--chunk-size, --batch-size and --processes must be positive")
+        if options['verify'] and options['resume']:
+            raise CommandError("--verify does not write checkpoints to resume from")
+
+        differences = 0
+        for name in options['stats'] or sorted(rebuild.STATS):
+            differences += self._run(name, options)
+        if differences:
+            raise CommandError(f"{differences} stored rows differ from the recomputed ones")
+
+    def _run(self, name, options):
+        chunk_size, batch_size = options['chunk_size'], options['batch_size']
+        verify = options['verify']
+        ranges = rebuild.user_ranges(chunk_size)
+        if verify:
+            pending = ranges
+        else:
+            try:
+                pending = rebuild.pending_ranges(name, ranges, chunk_size, options['resume'])
+            except ValueError as error:
+                raise CommandError(f"{error}; resume with the same --chunk-size")
+        if len(pending) < len(ranges):
+            self.stdout.write(f"{name}: resuming, {len(ranges) - len(pending)} ranges already done")
+
+        started = time.monotonic()
+        rows = differences = 0
+        results = pool_results(
+            rebuild.rebuild_range,
+            [(name, *bounds, verify, batch_size) for bounds in pending],
+            options['processes'],
+        )
+        for done, result in enumerate(results, 1):
+            rows += result['rows']
+            if verify:
+                differences += self._report(name, result)
+            else:
+                rebuild.checkpoint(name, result, chunk_size)
+            if options['verbosity'] > 1:
+                elapsed = max(time.monotonic() - started, 0.001)
+                self.stdout.write(
+                    f"{name}: {done}/{len(pending)} ranges, {rows} rows, "
+                    f"{rows / elapsed:.0f} rows/s"
+                )
+
+        finished = rebuild.STATS[name].finish(verify, batch_size)
+        if finished is not None:
+            differences += self._report(name, finished)
+        if not verify:
+            rebuild.clear_checkpoints(name)
+
+        elapsed = max(time.monotonic() - started, 0.001)
+        users = sum(last - first + 1 for first, last in pending)
+        self.stdout.write(self.style.SUCCESS(
+            f"{name}: {'checked' if verify else 'wrote'} {rows} rows for "
+            f"{len(pending)} ranges in {elapsed:.2f}s "
+            f"({rows / elapsed:.0f} rows/s, {users / elapsed:.0f} user ids/s)"
+        ))
+        return differences
+
+    def _report(self, name, result):
+        count = result['missing'] + result['extra'] + result['changed']
+        if count:
+            where = (
+                f"users {result['first_id']}-{result['last_id']}"
+                if 'first_id' in result else "totals"
+            )
+            self.stdout.write(self.style.WARNING(
+                f"{name} {where}: {result['missing']} missing, "
+                f"{result['extra']} extra, {result['changed']} changed"
+            ))
+            for example in result['examples']:
+                self.stdout.write(f"  {example}")
+        return count
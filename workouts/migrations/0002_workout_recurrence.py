@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 04:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workout',
+            name='is_template',
+            field=models.BooleanField(default=False, help_text='Template of a recurrence rule; hidden from workout lists'),
+        ),
+        migrations.CreateModel(
+            name='WorkoutRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday_mask', models.PositiveSmallIntegerField(help_text='Bitmask of weekdays, Monday is bit 0')),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Repeat every N weeks')),
+                ('until', models.DateField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, help_text='Maximum number of occurrences', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('template', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence_rule', to='workouts.workout')),
+            ],
+            options={
+                'db_table': 'workout_recurrences',
+            },
+        ),
+        migrations.AddField(
+            model_name='workout',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, help_text='Rule this workout was materialized from', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='workouts.workoutrecurrence'),
+        ),
+        migrations.AddConstraint(
+            model_name='workout',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'workout_date'), name='workouts_unique_occurrence'),
+        ),
+    ]
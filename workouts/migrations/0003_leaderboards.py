@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0002_workout_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('workout_type', models.CharField(choices=[('running', 'Running'), ('cycling', 'Cycling'), ('swimming', 'Swimming'), ('walking', 'Walking'), ('gym', 'Gym Workout'), ('yoga', 'Yoga'), ('pilates', 'Pilates'), ('hiit', 'HIIT'), ('cardio', 'Cardio'), ('strength', 'Strength Training'), ('sports', 'Sports'), ('other', 'Other')], max_length=20)),
+                ('metric', models.CharField(max_length=10)),
+                ('bucket', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'leaderboard_buckets',
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'workout_type', 'metric', 'bucket'), name='leaderboard_unique_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('period_start', models.DateField()),
+                ('workout_type', models.CharField(choices=[('running', 'Running'), ('cycling', 'Cycling'), ('swimming', 'Swimming'), ('walking', 'Walking'), ('gym', 'Gym Workout'), ('yoga', 'Yoga'), ('pilates', 'Pilates'), ('hiit', 'HIIT'), ('cardio', 'Cardio'), ('strength', 'Strength Training'), ('sports', 'Sports'), ('other', 'Other')], max_length=20)),
+                ('distance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('duration', models.IntegerField(default=0, help_text='Duration in minutes')),
+                ('calories', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'leaderboard_scores',
+                'indexes': [models.Index(fields=['period', 'period_start', 'workout_type', '-distance', 'user'], name='leaderboard_distance_idx'), models.Index(fields=['period', 'period_start', 'workout_type', '-duration', 'user'], name='leaderboard_duration_idx'), models.Index(fields=['period', 'period_start', 'workout_type', '-calories', 'user'], name='leaderboard_calories_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'workout_type', 'user'), name='leaderboard_unique_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:12
+
+from django.db import migrations, models
+
+from workouts.operations import AlterFieldIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('workouts', '0003_leaderboards'),
+    ]
+
+    operations = [
+        AlterFieldIndexConcurrently(
+            model_name='workout',
+            name='title',
+            field=models.CharField(db_index=True, max_length=200),
+        ),
+    ]
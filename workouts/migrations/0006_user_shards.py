@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0003_user_leaderboard_opt_in'),
+        ('workouts', '0005_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardSequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'workout_shard_sequences',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='workout_shard', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('alias', models.CharField(max_length=100)),
+                ('moving', models.BooleanField(default=False, help_text='Writes are refused while the user is moved between shards')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'workout_user_shards',
+            },
+        ),
+    ]
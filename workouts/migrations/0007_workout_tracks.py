@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0006_user_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutTrack',
+            fields=[
+                ('workout', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='track', serialize=False, to='workouts.workout')),
+                ('source_format', models.CharField(choices=[('gpx', 'GPX'), ('tcx', 'TCX')], max_length=3)),
+                ('point_count', models.PositiveIntegerField()),
+                ('points', models.BinaryField(help_text='Compressed deltas, see workouts.tracks')),
+                ('polyline', models.TextField(help_text='Simplified track as an encoded polyline')),
+                ('distance', models.FloatField(help_text='Distance in meters')),
+                ('elevation_gain', models.FloatField(blank=True, help_text='Ascent in meters', null=True)),
+                ('elapsed', models.PositiveIntegerField(blank=True, help_text='Seconds from the first to the last point', null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('splits', models.JSONField(default=list, help_text='Seconds taken for each full kilometer')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'workout_tracks',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0007_workout_tracks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutStream',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('heart_rate', 'Heart rate'), ('cadence', 'Cadence'), ('power', 'Power')], max_length=20)),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Seconds between samples')),
+                ('sample_count', models.PositiveIntegerField()),
+                ('minimum', models.PositiveIntegerField(blank=True, null=True)),
+                ('maximum', models.PositiveIntegerField(blank=True, null=True)),
+                ('average', models.FloatField(blank=True, null=True)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('workout', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='streams', to='workouts.workout')),
+            ],
+            options={
+                'db_table': 'workout_streams',
+                'constraints': [models.UniqueConstraint(fields=('workout', 'channel'), name='workout_streams_unique_channel')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+from workouts.operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ('workouts', '0008_workout_streams'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(fields=['user', 'workout_type', 'workout_date'], name='workouts_user_type_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='workout',
+            index=models.Index(fields=['user', 'status', 'workout_date'], name='workouts_user_status_date_idx'),
+        ),
+        # Covered by the status index, dropped once that exists
+        RemoveIndexConcurrently(
+            model_name='workout',
+            name='workouts_user_id_bee678_idx',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0009_workout_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeeklyReport',
+            fields=[
+                ('pk', models.CompositePrimaryKey('user_id', 'week_start', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('week_start', models.DateField(help_text='Monday of the reported week')),
+                ('data', models.TextField(help_text='Report as compact JSON')),
+                ('generated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_reports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'weekly_reports',
+            },
+        ),
+    ]
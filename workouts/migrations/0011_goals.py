@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0010_weekly_reports'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Goal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=50)),
+                ('metric', models.CharField(choices=[('workouts', 'Workouts'), ('distance', 'Distance (km)'), ('duration', 'Duration (minutes)'), ('calories', 'Calories')], max_length=10)),
+                ('period', models.CharField(choices=[('week', 'Week'), ('month', 'Month'), ('custom', 'Custom')], max_length=6)),
+                ('workout_type', models.CharField(blank=True, choices=[('running', 'Running'), ('cycling', 'Cycling'), ('swimming', 'Swimming'), ('walking', 'Walking'), ('gym', 'Gym Workout'), ('yoga', 'Yoga'), ('pilates', 'Pilates'), ('hiit', 'HIIT'), ('cardio', 'Cardio'), ('strength', 'Strength Training'), ('sports', 'Sports'), ('other', 'Other')], help_text='Only count workouts of this type', max_length=20, null=True)),
+                ('target', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('start_date', models.DateField(help_text='First day counted')),
+                ('end_date', models.DateField(blank=True, help_text='Last day counted; required for custom periods', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='goals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'workout_goals',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GoalProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('goal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='workouts.goal')),
+            ],
+            options={
+                'db_table': 'workout_goal_progress',
+                'constraints': [models.UniqueConstraint(fields=('goal', 'period_start'), name='goal_progress_unique_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workouts', '0011_goals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RebuildCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stat', models.CharField(max_length=50)),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('chunk_size', models.IntegerField()),
+                ('rows', models.IntegerField(help_text='Rows written for the range')),
+                ('completed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'stat_rebuild_checkpoints',
+                'constraints': [models.UniqueConstraint(fields=('stat', 'first_id'), name='rebuild_checkpoint_unique_range')],
+            },
+        ),
+    ]
@@ -1,5 +1,42 @@
-from django.db import models
+import secrets
+
+from django.db import models, router, transaction
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class ShardedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        if self._db is not None or self._hints:
+            return super().create(**kwargs)
+        # Let the router place the row from the instance itself
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True)
+        return obj
+
+
+class ShardedManager(models.Manager.from_queryset(ShardedQuerySet)):
+    """Manager of a model whose rows live on their user's shard"""
+
+    # Lookup from the model to the owning user's id
+    user_lookup = 'user_id'
+
+    def for_user(self, user):
+        """Rows of one user, read from and written to the user's shard"""
+        user_id = getattr(user, 'pk', user)
+        return self.db_manager(hints={'user_id': user_id}).filter(
+            **{self.user_lookup: user_id}
+        )
+
+
+class RecurrenceManager(ShardedManager):
+    user_lookup = 'template__user_id'
+
+
+class AttachmentManager(ShardedManager):
+    """Manager of models attached to a workout"""
+    user_lookup = 'workout__user_id'
 
 
 class Workout(models.Model):
@@ -35,7 +72,8 @@ class Workout(models.Model):
         choices=WORKOUT_TYPES,
         default='other'
     )
-    title = models.CharField(max_length=200)
+    # Indexed for prefix search in the admin
+    title = models.CharField(max_length=200, db_index=True)
     description = models.TextField(blank=True, null=True)
     duration = models.IntegerField(
         help_text="Duration in minutes",
@@ -76,18 +114,81 @@ class Workout(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    is_template = models.BooleanField(
+        default=False,
+        help_text="Template of a recurrence rule; hidden from workout lists"
+    )
+    recurrence = models.ForeignKey(
+        'WorkoutRecurrence',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        help_text="Rule this workout was materialized from"
+    )
+
+    objects = ShardedManager()
 
     class Meta:
         db_table = 'workouts'
         ordering = ['-workout_date', '-created_at']
         indexes = [
             models.Index(fields=['user', 'workout_date']),
-            models.Index(fields=['user', 'status']),
+            # Equality filters lead, the date range and ordering follow
+            models.Index(
+                fields=['user', 'workout_type', 'workout_date'],
+                name='workouts_user_type_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'status', 'workout_date'],
+                name='workouts_user_status_date_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recurrence', 'workout_date'],
+                name='workouts_unique_occurrence'
+            ),
         ]
 
+    # Fields snapshotted on load so write hooks can compute deltas
+    TRACKED_FIELDS = [
+        'user_id', 'workout_type', 'status', 'workout_date',
+        'duration', 'calories_burned', 'distance', 'intensity', 'title',
+        'is_template',
+    ]
+
     def __str__(self):
         return f"{self.title} - {self.workout_date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance.snapshot()
+        return instance
+
+    def save(self, *args, **kwargs):
+        from . import sharding
+
+        sharding.assign_id(self)
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        # Counters updated by post_save receivers commit with the row
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+        # post_save receivers have seen the old snapshot; refresh it
+        self._loaded_values = self.snapshot()
+
+    def snapshot(self):
+        """Return the current values of the tracked fields"""
+        return {
+            field: self.__dict__.get(field) for field in self.TRACKED_FIELDS
+        }
+
+    @property
+    def previous_values(self):
+        """Tracked field values as last loaded or saved, None if new"""
+        return getattr(self, '_loaded_values', None)
+
     @property
     def duration_display(self):
         """Return formatted duration"""
@@ -100,6 +201,506 @@ class Workout(models.Model):
         return "N/A"
 
 
-from django.db import models
+class WorkoutRecurrence(models.Model):
+    """
+    Weekly recurrence rule attached to a template workout.
+
+    Occurrences are not stored; they are expanded on read and only
+    materialized into a real Workout row once started, completed,
+    skipped or edited.
+    """
+    template = models.OneToOneField(
+        Workout,
+        on_delete=models.CASCADE,
+        related_name='recurrence_rule'
+    )
+    weekday_mask = models.PositiveSmallIntegerField(
+        help_text="Bitmask of weekdays, Monday is bit 0"
+    )
+    interval = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="Repeat every N weeks"
+    )
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Maximum number of occurrences"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecurrenceManager()
+
+    class Meta:
+        db_table = 'workout_recurrences'
+
+    def __str__(self):
+        return f"Recurrence of {self.template}"
+
+    def save(self, *args, **kwargs):
+        from . import sharding
+
+        sharding.assign_id(self)
+        super().save(*args, **kwargs)
+
+    @property
+    def weekdays(self):
+        """Return the weekdays (0 = Monday) this rule repeats on"""
+        return [day for day in range(7) if self.weekday_mask & (1 << day)]
+
+
+class WorkoutTrack(models.Model):
+    """
+    GPS track recorded during a workout.
+
+    The full track is kept as compressed binary deltas; a simplified
+    copy is stored as an encoded polyline for drawing maps, together
+    with the figures computed from the full track.
+    """
+    FORMAT_CHOICES = [
+        ('gpx', 'GPX'),
+        ('tcx', 'TCX'),
+    ]
+
+    workout = models.OneToOneField(
+        Workout,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='track'
+    )
+    source_format = models.CharField(max_length=3, choices=FORMAT_CHOICES)
+    point_count = models.PositiveIntegerField()
+    points = models.BinaryField(help_text="Compressed deltas, see workouts.tracks")
+    polyline = models.TextField(help_text="Simplified track as an encoded polyline")
+    distance = models.FloatField(help_text="Distance in meters")
+    elevation_gain = models.FloatField(null=True, blank=True, help_text="Ascent in meters")
+    elapsed = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Seconds from the first to the last point"
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    splits = models.JSONField(default=list, help_text="Seconds taken for each full kilometer")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AttachmentManager()
+
+    class Meta:
+        db_table = 'workout_tracks'
+
+    def __str__(self):
+        return f"Track of {self.workout_id}"
+
+
+class WorkoutStream(models.Model):
+    """
+    One channel of per-second samples recorded during a workout.
+
+    Samples are packed into compressed blocks, see workouts.streams;
+    the summary columns let lists show them without decoding.
+    """
+    CHANNEL_CHOICES = [
+        ('heart_rate', 'Heart rate'),
+        ('cadence', 'Cadence'),
+        ('power', 'Power'),
+    ]
+
+    workout = models.ForeignKey(
+        Workout,
+        on_delete=models.CASCADE,
+        related_name='streams'
+    )
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1, help_text="Seconds between samples")
+    sample_count = models.PositiveIntegerField()
+    minimum = models.PositiveIntegerField(null=True, blank=True)
+    maximum = models.PositiveIntegerField(null=True, blank=True)
+    average = models.FloatField(null=True, blank=True)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AttachmentManager()
+
+    class Meta:
+        db_table = 'workout_streams'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workout', 'channel'], name='workout_streams_unique_channel'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} of {self.workout_id}"
+
+    def save(self, *args, **kwargs):
+        from . import sharding
+
+        sharding.assign_id(self)
+        super().save(*args, **kwargs)
+
+
+class Goal(models.Model):
+    """
+    Measurable target replacing the free-text User.fitness_goal.
+
+    Counts one metric of completed workouts, optionally of one workout
+    type, per week, per month or over a custom date range. Progress is
+    kept per period in GoalProgress as workouts change.
+    """
+    METRIC_CHOICES = [
+        ('workouts', 'Workouts'),
+        ('distance', 'Distance (km)'),
+        ('duration', 'Duration (minutes)'),
+        ('calories', 'Calories'),
+    ]
+
+    PERIOD_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+        ('custom', 'Custom'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='goals'
+    )
+    title = models.CharField(max_length=50)
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    period = models.CharField(max_length=6, choices=PERIOD_CHOICES)
+    workout_type = models.CharField(
+        max_length=20,
+        choices=Workout.WORKOUT_TYPES,
+        null=True,
+        blank=True,
+        help_text="Only count workouts of this type"
+    )
+    target = models.DecimalField(max_digits=10, decimal_places=2)
+    start_date = models.DateField(help_text="First day counted")
+    end_date = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Last day counted; required for custom periods"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        db_table = 'workout_goals'
+        ordering = ['created_at']
+
+    def __str__(self):
+        return self.title
+
+    def save(self, *args, **kwargs):
+        from . import sharding
+
+        sharding.assign_id(self)
+        super().save(*args, **kwargs)
+
+
+class GoalProgressManager(ShardedManager):
+    user_lookup = 'goal__user_id'
+
+
+class GoalProgress(models.Model):
+    """Running total of a goal's metric in one period"""
+    goal = models.ForeignKey(
+        Goal,
+        on_delete=models.CASCADE,
+        related_name='progress'
+    )
+    period_start = models.DateField()
+    value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = GoalProgressManager()
+
+    class Meta:
+        db_table = 'workout_goal_progress'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['goal', 'period_start'], name='goal_progress_unique_period'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.goal_id} {self.period_start}: {self.value}"
+
+    def save(self, *args, **kwargs):
+        from . import sharding
+
+        sharding.assign_id(self)
+        super().save(*args, **kwargs)
+
 
-# Create your models here.
+def new_join_code():
+    return secrets.token_urlsafe(9)
+
+
+class Team(models.Model):
+    """
+    Athletes followed by a coach.
+
+    Athletes join with the team's code, shared by the coach, which lets
+    the coach see their workout totals in the team summary.
+    """
+    MAX_ATHLETES = 500
+
+    coach = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='coached_teams'
+    )
+    name = models.CharField(max_length=100)
+    join_code = models.CharField(max_length=12, unique=True, default=new_join_code)
+    athletes = models.ManyToManyField(
+        settings.AUTH_USER_MODEL,
+        through='TeamMembership',
+        related_name='teams'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'teams'
+        ordering = ['created_at']
+
+    def __str__(self):
+        return self.name
+
+
+class TeamMembership(models.Model):
+    """An athlete's place in a team"""
+    team = models.ForeignKey(
+        Team,
+        on_delete=models.CASCADE,
+        related_name='memberships'
+    )
+    athlete = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='team_memberships'
+    )
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'team_memberships'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['team', 'athlete'], name='team_unique_athlete'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete_id} in {self.team_id}"
+
+
+class LeaderboardScore(models.Model):
+    """
+    Per-period score of one opted-in user for one workout type.
+
+    Rows are maintained incrementally as completed workouts change and
+    are read through the descending per-metric indexes.
+    """
+    PERIOD_CHOICES = [
+        ('week', 'Week'),
+        ('month', 'Month'),
+    ]
+
+    METRICS = ['distance', 'duration', 'calories']
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_scores'
+    )
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    workout_type = models.CharField(max_length=20, choices=Workout.WORKOUT_TYPES)
+    distance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    duration = models.IntegerField(default=0, help_text="Duration in minutes")
+    calories = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'leaderboard_scores'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'period_start', 'workout_type', 'user'],
+                name='leaderboard_unique_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['period', 'period_start', 'workout_type', '-distance', 'user'],
+                name='leaderboard_distance_idx'
+            ),
+            models.Index(
+                fields=['period', 'period_start', 'workout_type', '-duration', 'user'],
+                name='leaderboard_duration_idx'
+            ),
+            models.Index(
+                fields=['period', 'period_start', 'workout_type', '-calories', 'user'],
+                name='leaderboard_calories_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.period_start} {self.workout_type}"
+
+
+class LeaderboardBucket(models.Model):
+    """
+    Number of users whose score on a board falls into one score bucket.
+
+    Lets a rank be computed from a handful of bucket counts plus a scan
+    of a single bucket instead of counting every row ahead.
+    """
+    period = models.CharField(max_length=5, choices=LeaderboardScore.PERIOD_CHOICES)
+    period_start = models.DateField()
+    workout_type = models.CharField(max_length=20, choices=Workout.WORKOUT_TYPES)
+    metric = models.CharField(max_length=10)
+    bucket = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'leaderboard_buckets'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period', 'period_start', 'workout_type', 'metric', 'bucket'],
+                name='leaderboard_unique_bucket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.period_start} {self.workout_type} {self.metric} #{self.bucket}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a request sent with an Idempotency-Key header.
+
+    The row doubles as the lock for the key: it is inserted before the
+    request runs and completed with the response afterwards, so a
+    concurrent duplicate finds it unfinished and waits.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(
+        max_length=64, help_text="Hash of the method, path and body"
+    )
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'idempotency_keys'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'], name='idempotency_unique_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+    @property
+    def is_complete(self):
+        return self.response_status is not None
+
+
+class UserShard(models.Model):
+    """
+    Shard database alias holding a user's workouts.
+
+    Users without a row live on the default database, where all data
+    was kept before sharding.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='workout_shard'
+    )
+    alias = models.CharField(max_length=100)
+    moving = models.BooleanField(
+        default=False,
+        help_text="Writes are refused while the user is moved between shards"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'workout_user_shards'
+
+    def __str__(self):
+        return f"{self.user_id} on {self.alias}"
+
+
+class ShardSequence(models.Model):
+    """Next free primary key of a sharded table, shared by all shards"""
+    name = models.CharField(max_length=100, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'workout_shard_sequences'
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class WeeklyReport(models.Model):
+    """
+    Precomputed recap of one user's week, stored as compact JSON.
+
+    Written in bulk by ``manage.py build_weekly_reports`` and read by
+    primary key, so Monday's rush of recaps costs one lookup each.
+    """
+    pk = models.CompositePrimaryKey('user_id', 'week_start')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='weekly_reports'
+    )
+    week_start = models.DateField(help_text="Monday of the reported week")
+    data = models.TextField(help_text="Report as compact JSON")
+    generated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'weekly_reports'
+
+    def __str__(self):
+        return f"{self.user_id} {self.week_start}"
+
+
+class RebuildCheckpoint(models.Model):
+    """
+    User id range finished by a ``manage.py rebuild_stats`` run.
+
+    Lets an interrupted rebuild resume with the ranges still to do.
+    Removed once every range of the run is done.
+    """
+    stat = models.CharField(max_length=50)
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    rows = models.IntegerField(help_text="Rows written for the range")
+    completed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'stat_rebuild_checkpoints'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['stat', 'first_id'], name='rebuild_checkpoint_unique_range'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.stat} {self.first_id}-{self.last_id}"
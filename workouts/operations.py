@@ -0,0 +1,70 @@
+"""
+Migration operations that build indexes without blocking writes.
+
+A plain CREATE INDEX holds a lock that blocks every write to the table
+until the build finishes, which on the workouts table means minutes of
+failed saves. On PostgreSQL these operations build and drop indexes
+CONCURRENTLY, so migrations using them must set ``atomic = False``;
+other backends run the plain operation.
+"""
+from django.contrib.postgres import operations as postgres_operations
+from django.db.migrations import operations
+
+
+def _concurrently(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AlterFieldIndexConcurrently(postgres_operations.NotInTransactionMixin, operations.AlterField):
+    """AlterField turning on db_index, building the indexes concurrently"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            # The index and the LIKE index AlterField would create
+            for statement in schema_editor._field_indexes_sql(model, model._meta.get_field(self.name)):
+                statement.template = schema_editor.sql_create_index_concurrently
+                schema_editor.execute(statement)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not _concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            field = model._meta.get_field(self.name)
+            for name in schema_editor._constraint_names(
+                model, [field.column], index=True, unique=False, primary_key=False
+            ):
+                schema_editor.execute(schema_editor._delete_index_sql(model, name, concurrently=True))
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """AddIndex, concurrent on PostgreSQL"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return operations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return operations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class RemoveIndexConcurrently(postgres_operations.RemoveIndexConcurrently):
+    """RemoveIndex, concurrent on PostgreSQL"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return operations.RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return operations.RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
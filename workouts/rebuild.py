@@ -0,0 +1,269 @@
+"""
+Recomputation of statistics derived from workouts.
+
+Each statistic is rebuilt by ranges of user ids that are independent of
+each other, so ``manage.py rebuild_stats`` can spread them over a
+process pool. A range streams its workouts from every shard, computes
+the rows they should produce and replaces the stored rows in bulk; in
+verify mode it compares them with the stored rows instead and writes
+nothing. Work that spans ranges, such as the leaderboard bucket
+histograms, runs once all ranges are done.
+
+Finished ranges are checkpointed so an interrupted run can resume.
+"""
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Min
+
+from . import goals, leaderboards, sharding
+from .models import (
+    Goal, GoalProgress, LeaderboardBucket, LeaderboardScore, RebuildCheckpoint,
+    Workout,
+)
+
+CHUNK_SIZE = 1000
+
+BATCH_SIZE = 5000
+
+# Differences listed per range in verify mode
+EXAMPLES = 5
+
+
+def id_ranges(queryset, chunk_size=CHUNK_SIZE):
+    """Inclusive ranges of chunk_size ids covering the queryset's rows"""
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    return [
+        (first, min(first + chunk_size - 1, bounds['high']))
+        for first in range(bounds['low'], bounds['high'] + 1, chunk_size)
+    ]
+
+
+def diff(expected, stored):
+    """Counts and first examples of missing, extra and changed keys"""
+    missing = [key for key in expected if key not in stored]
+    extra = [key for key in stored if key not in expected]
+    changed = [
+        key for key in expected
+        if key in stored and expected[key] != stored[key]
+    ]
+    examples = (
+        [f"missing {key}: {expected[key]}" for key in missing[:EXAMPLES]]
+        + [f"extra {key}: {stored[key]}" for key in extra[:EXAMPLES]]
+        + [
+            f"changed {key}: {stored[key]} -> {expected[key]}"
+            for key in changed[:EXAMPLES]
+        ]
+    )
+    return {
+        'missing': len(missing),
+        'extra': len(extra),
+        'changed': len(changed),
+        'examples': examples,
+    }
+
+
+class Stat(ABC):
+    """
+    Derived rows rebuilt by user id range.
+
+    ``expected`` and ``stored`` map row keys to values. Rows whose
+    values are all zero count as absent: incremental updates may leave
+    them behind while a rebuild does not write them.
+    """
+    name = None
+
+    @abstractmethod
+    def expected(self, first_id, last_id, batch_size):
+        """Rows the range's workouts produce"""
+
+    @abstractmethod
+    def stored(self, first_id, last_id, batch_size):
+        """Rows of the range as currently stored"""
+
+    @abstractmethod
+    def write(self, first_id, last_id, rows, batch_size):
+        """Replace the stored rows of the range; returns the number written"""
+
+    def finish(self, verify, batch_size):
+        """Run once after every range; returns a diff in verify mode"""
+        return None
+
+
+class LeaderboardStat(Stat):
+    """Score rows per range, then every bucket histogram recounted"""
+    name = 'leaderboards'
+
+    def expected(self, first_id, last_id, batch_size):
+        workouts = Workout.objects.filter(user_id__gte=first_id, user_id__lte=last_id)
+        return {
+            key: scores
+            for key, scores in leaderboards.aggregate(workouts, batch_size)
+            if any(scores)
+        }
+
+    def stored(self, first_id, last_id, batch_size):
+        rows = LeaderboardScore.objects.filter(
+            user_id__gte=first_id, user_id__lte=last_id
+        ).values_list(
+            'user_id', 'period', 'period_start', 'workout_type',
+            *leaderboards.METRICS
+        ).iterator(chunk_size=batch_size)
+        return {tuple(row[:4]): tuple(row[4:]) for row in rows if any(row[4:])}
+
+    def write(self, first_id, last_id, rows, batch_size):
+        with transaction.atomic():
+            LeaderboardScore.objects.filter(
+                user_id__gte=first_id, user_id__lte=last_id
+            ).delete()
+            LeaderboardScore.objects.bulk_create(
+                [
+                    LeaderboardScore(
+                        user_id=user_id, period=period, period_start=start,
+                        workout_type=workout_type,
+                        **dict(zip(leaderboards.METRICS, scores))
+                    )
+                    for (user_id, period, start, workout_type), scores in rows.items()
+                ],
+                batch_size=batch_size
+            )
+        return len(rows)
+
+    def finish(self, verify, batch_size):
+        counts = leaderboards._bucket_counts(
+            LeaderboardScore.objects.values_list(
+                'period', 'period_start', 'workout_type', *leaderboards.METRICS
+            ),
+            batch_size
+        )
+        if verify:
+            stored = LeaderboardBucket.objects.exclude(count=0).values_list(
+                'period', 'period_start', 'workout_type', 'metric', 'bucket', 'count'
+            ).iterator(chunk_size=batch_size)
+            return diff(counts, {tuple(row[:5]): row[5] for row in stored})
+        with transaction.atomic():
+            LeaderboardBucket.objects.all().delete()
+            leaderboards._store_buckets(counts, batch_size)
+        return None
+
+
+class GoalStat(Stat):
+    """Goal progress counters, from one pass over the range's workouts"""
+    name = 'goals'
+
+    def expected(self, first_id, last_id, batch_size):
+        rows = defaultdict(Decimal)
+        for shard_goals in sharding.fan_out(
+            Goal.objects.filter(user_id__gte=first_id, user_id__lte=last_id)
+        ):
+            by_user = defaultdict(list)
+            for goal in shard_goals.iterator(chunk_size=batch_size):
+                by_user[goal.user_id].append(goal)
+            if not by_user:
+                continue
+            # Goals and their workouts share a shard
+            workouts = Workout.objects.using(shard_goals.db).filter(
+                user_id__in=list(by_user), status='completed', is_template=False
+            ).values(
+                'user_id', 'status', 'workout_type', 'workout_date',
+                'distance', 'duration', 'calories_burned',
+            ).order_by()
+            for values in workouts.iterator(chunk_size=batch_size):
+                for goal in by_user[values['user_id']]:
+                    if goals.counts(goal, values):
+                        start = goals.period_bounds(goal, values['workout_date'])[0]
+                        rows[goal.pk, start] += goals.amount(goal.metric, values)
+        return {key: value for key, value in rows.items() if value}
+
+    def stored(self, first_id, last_id, batch_size):
+        rows = {}
+        for progress in sharding.fan_out(GoalProgress.objects.filter(
+            goal__user_id__gte=first_id, goal__user_id__lte=last_id
+        ).exclude(value=0)):
+            rows.update(
+                ((goal_id, start), value) for goal_id, start, value in
+                progress.values_list('goal_id', 'period_start', 'value').iterator(
+                    chunk_size=batch_size
+                )
+            )
+        return rows
+
+    def write(self, first_id, last_id, rows, batch_size):
+        for alias in sharding.shard_aliases():
+            goal_ids = set(Goal.objects.using(alias).filter(
+                user_id__gte=first_id, user_id__lte=last_id
+            ).values_list('pk', flat=True))
+            counters = [
+                GoalProgress(goal_id=goal_id, period_start=start, value=value)
+                for (goal_id, start), value in rows.items() if goal_id in goal_ids
+            ]
+            for counter in counters:
+                sharding.assign_id(counter)
+            with transaction.atomic(using=alias):
+                GoalProgress.objects.using(alias).filter(goal_id__in=goal_ids).delete()
+                GoalProgress.objects.using(alias).bulk_create(counters, batch_size=batch_size)
+        return len(rows)
+
+
+STATS = {stat.name: stat for stat in [LeaderboardStat(), GoalStat()]}
+
+
+def rebuild_range(name, first_id, last_id, verify=False, batch_size=BATCH_SIZE):
+    """
+    Rebuild, or with verify compare, one statistic for a user id range.
+
+    Runs in pool processes; returns a picklable summary of the range.
+    """
+    started = time.monotonic()
+    stat = STATS[name]
+    rows = stat.expected(first_id, last_id, batch_size)
+    result = {'first_id': first_id, 'last_id': last_id, 'rows': len(rows)}
+    if verify:
+        result.update(diff(rows, stat.stored(first_id, last_id, batch_size)))
+    else:
+        stat.write(first_id, last_id, rows, batch_size)
+    result['seconds'] = time.monotonic() - started
+    return result
+
+
+def user_ranges(chunk_size=CHUNK_SIZE):
+    return id_ranges(get_user_model().objects.all(), chunk_size)
+
+
+def pending_ranges(name, ranges, chunk_size, resume):
+    """
+    Ranges left to rebuild.
+
+    Without resume the statistic's checkpoints are cleared and every
+    range is pending. Raises ValueError when resuming with another
+    chunk size, whose ranges would not line up.
+    """
+    checkpoints = RebuildCheckpoint.objects.filter(stat=name)
+    if not resume:
+        checkpoints.delete()
+        return list(ranges)
+    if checkpoints.exclude(chunk_size=chunk_size).exists():
+        raise ValueError(f"{name} checkpoints were made with another chunk size")
+    done = set(checkpoints.values_list('first_id', 'last_id'))
+    return [bounds for bounds in ranges if bounds not in done]
+
+
+def checkpoint(name, result, chunk_size):
+    RebuildCheckpoint.objects.update_or_create(
+        stat=name, first_id=result['first_id'],
+        defaults={
+            'last_id': result['last_id'],
+            'chunk_size': chunk_size,
+            'rows': result['rows'],
+        }
+    )
+
+
+def clear_checkpoints(name):
+    RebuildCheckpoint.objects.filter(stat=name).delete()
@@ -0,0 +1,154 @@
+import re
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+
+from . import sharding
+from .models import Workout, WorkoutRecurrence
+
+# Virtual occurrences are addressed as "r<rule id>-<YYYY-MM-DD>"
+VIRTUAL_ID_RE = re.compile(r'^r(?P<rule>\d+)-(?P<date>\d{4}-\d{2}-\d{2})$')
+
+# Upper bound on how far back an open-ended window is expanded
+MAX_WINDOW_DAYS = 366
+
+# How far past today a window without an end shows planned occurrences
+HORIZON_DAYS = 28
+
+# Template fields copied onto every occurrence
+COPIED_FIELDS = [
+    'workout_type', 'title', 'description', 'duration',
+    'calories_burned', 'distance', 'intensity', 'notes',
+]
+
+
+def virtual_id(rule_id, day):
+    """Return the identifier of a virtual occurrence"""
+    return f"r{rule_id}-{day.isoformat()}"
+
+
+def parse_virtual_id(value):
+    """Return (rule_id, date) for a virtual identifier, or None"""
+    match = VIRTUAL_ID_RE.match(str(value))
+    if not match:
+        return None
+    try:
+        day = date.fromisoformat(match.group('date'))
+    except ValueError:
+        return None
+    return int(match.group('rule')), day
+
+
+def occurrence_dates(rule, start, end):
+    """Yield the dates on which the rule occurs within [start, end]"""
+    if not rule.weekday_mask:
+        return
+    dtstart = rule.template.workout_date
+    last = end if rule.until is None else min(end, rule.until)
+    week = dtstart - timedelta(days=dtstart.weekday())
+    step = timedelta(weeks=rule.interval or 1)
+
+    # Without a count limit we can jump straight to the window
+    if rule.count is None and start > week:
+        periods = (start - week).days // 7 // (rule.interval or 1)
+        week += step * periods
+
+    seen = 0
+    while week <= last:
+        for weekday in range(7):
+            if not rule.weekday_mask & (1 << weekday):
+                continue
+            day = week + timedelta(days=weekday)
+            if day < dtstart:
+                continue
+            if day > last:
+                return
+            seen += 1
+            if rule.count is not None and seen > rule.count:
+                return
+            if day >= start:
+                yield day
+        week += step
+
+
+def occurs_on(rule, day):
+    """Return True if the rule has an occurrence on the given day"""
+    return any(True for _ in occurrence_dates(rule, day, day))
+
+
+def build_occurrence(rule, day):
+    """Return an unsaved Workout representing a virtual occurrence"""
+    template = rule.template
+    workout = Workout(
+        user_id=template.user_id,
+        workout_date=day,
+        status='planned',
+        recurrence=rule,
+        **{field: getattr(template, field) for field in COPIED_FIELDS}
+    )
+    workout.user = template.user
+    workout.virtual_id = virtual_id(rule.pk, day)
+    return workout
+
+
+def expand(user, start, end, workout_type=None, workout_status=None):
+    """
+    Return virtual occurrences of the user's rules within [start, end].
+
+    Dates that have already been materialized are left out, as the real
+    row is returned by the regular queryset instead.
+    """
+    if workout_status and workout_status != 'planned':
+        return []
+    if end < start:
+        return []
+
+    rules = WorkoutRecurrence.objects.for_user(user).select_related(
+        'template', 'template__user'
+    )
+    if workout_type:
+        rules = rules.filter(template__workout_type=workout_type)
+    rules = list(rules)
+    if not rules:
+        return []
+
+    materialized = set(
+        Workout.objects.for_user(user).filter(
+            recurrence__in=rules,
+            workout_date__gte=start,
+            workout_date__lte=end
+        ).values_list('recurrence_id', 'workout_date')
+    )
+
+    occurrences = []
+    for rule in rules:
+        for day in occurrence_dates(rule, start, end):
+            if (rule.pk, day) not in materialized:
+                occurrences.append(build_occurrence(rule, day))
+    return occurrences
+
+
+def materialize(rule, day, **overrides):
+    """Create (or fetch) the real Workout row for an occurrence"""
+    template = rule.template
+    defaults = {field: getattr(template, field) for field in COPIED_FIELDS}
+    defaults.update(user_id=template.user_id, status='planned')
+    defaults.update(overrides)
+    workouts = Workout.objects.for_user(template.user_id)
+    try:
+        with transaction.atomic(using=sharding.shard_for(template.user_id)):
+            workout, _ = workouts.get_or_create(
+                recurrence=rule, workout_date=day, defaults=defaults
+            )
+    except IntegrityError:
+        # A concurrent request materialized the same occurrence
+        workout = workouts.get(recurrence=rule, workout_date=day)
+    return workout
+
+
+def default_window(start, end, today):
+    """Resolve an optional (start, end) pair into a bounded window"""
+    if start is None:
+        start = (end or today) - timedelta(days=MAX_WINDOW_DAYS)
+    end = end or today + timedelta(days=HORIZON_DAYS)
+    return start, end
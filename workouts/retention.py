@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.db.models.functions import Now
+
+from jobs.retention import policy
+
+from . import sharding
+
+policy(
+    'idempotency_keys', 'workouts.IdempotencyKey', 'expires_at', timedelta(0),
+)
+
+# Planned workouts never started are kept as skipped rather than
+# deleted. Derived data only counts completed workouts or counts all
+# statuses alike, so the update needs no refresh.
+policy(
+    'stale_planned_workouts', 'workouts.Workout', 'workout_date', timedelta(days=90),
+    filters={'status': 'planned', 'is_template': False},
+    archive={'status': 'skipped', 'updated_at': Now()},
+    aliases=sharding.shard_aliases,
+)
@@ -1,6 +1,16 @@
+from django.db import models
 from rest_framework import serializers
-from .models import Workout
+from .models import Goal, Team, Workout, WorkoutRecurrence, WorkoutStream, WorkoutTrack
 from django.utils import timezone
+from . import fragments, leaderboards, streams
+
+
+class WorkoutListSerializer(serializers.ListSerializer):
+    """Serializes many workouts at once from cached fragments"""
+
+    def to_representation(self, data):
+        workouts = data.all() if isinstance(data, models.manager.BaseManager) else data
+        return self.child.represent_many(list(workouts))
 
 
 class WorkoutSerializer(serializers.ModelSerializer):
@@ -13,9 +23,44 @@ class WorkoutSerializer(serializers.ModelSerializer):
             'id', 'user', 'workout_type', 'title', 'description',
             'duration', 'duration_display', 'calories_burned', 'distance',
             'intensity', 'status', 'notes', 'workout_date',
-            'started_at', 'completed_at', 'created_at', 'updated_at'
+            'started_at', 'completed_at', 'created_at', 'updated_at',
+            'recurrence'
         ]
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'user', 'created_at', 'updated_at', 'recurrence'
+        ]
+        list_serializer_class = WorkoutListSerializer
+
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def to_fresh_representation(self, instance):
+        """Serialize without the fragment cache"""
+        data = super().to_representation(instance)
+        # Virtual recurrence occurrences have no row yet
+        virtual_id = getattr(instance, 'virtual_id', None)
+        if virtual_id:
+            data['id'] = virtual_id
+        return data
+
+    def represent_many(self, workouts):
+        """Representations from cached fragments, serializing only the misses"""
+        cached = fragments.get_many(workouts)
+        missed = {}
+        results = []
+        for workout in workouts:
+            if not fragments.is_cacheable(workout):
+                results.append(self.to_fresh_representation(workout))
+                continue
+            key = fragments.cache_key(workout)
+            data = cached.get(key)
+            if data is None:
+                data = missed[key] = self.to_fresh_representation(workout)
+            else:
+                data = dict(data, user=workout.user.email, recurrence=workout.recurrence_id)
+            results.append(data)
+        fragments.set_many(missed)
+        return results
 
     def validate_workout_date(self, value):
         """Ensure workout date is not in the future"""
@@ -79,6 +124,13 @@ class WorkoutUpdateSerializer(serializers.ModelSerializer):
             'notes', 'workout_date', 'started_at', 'completed_at'
         ]
 
+    def validate_status(self, value):
+        if self.instance is not None and self.instance.is_template and value != 'planned':
+            raise serializers.ValidationError(
+                "Recurrence templates stay planned; start or complete an occurrence."
+            )
+        return value
+
     def update(self, instance, validated_data):
         """Handle status changes and timestamps"""
         new_status = validated_data.get('status', instance.status)
@@ -93,6 +145,191 @@ class WorkoutUpdateSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class WorkoutRecurrenceSerializer(serializers.ModelSerializer):
+    """Serializer for recurrence rules attached to a template workout"""
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        allow_empty=False
+    )
+
+    class Meta:
+        model = WorkoutRecurrence
+        fields = [
+            'id', 'template', 'weekdays', 'interval', 'until', 'count',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated:
+            # Templates are looked up on the user's shard
+            fields['template'].queryset = Workout.objects.for_user(request.user)
+        return fields
+
+    def validate_template(self, value):
+        """Templates must belong to the requesting user"""
+        request = self.context.get('request')
+        if request and value.user_id != request.user.pk:
+            raise serializers.ValidationError("Workout not found.")
+        if self.instance is None and value.status != 'planned':
+            # Templates are left out of every statistic
+            raise serializers.ValidationError(
+                "Only planned workouts can become recurrence templates."
+            )
+        if self.instance is None and hasattr(value, 'recurrence_rule'):
+            raise serializers.ValidationError(
+                "Workout is already a recurrence template."
+            )
+        if self.instance is not None and value != self.instance.template:
+            raise serializers.ValidationError(
+                "The template of a recurrence cannot be changed."
+            )
+        return value
+
+    def validate_interval(self, value):
+        if value < 1:
+            raise serializers.ValidationError(
+                "Interval must be at least 1 week."
+            )
+        return value
+
+    def validate(self, data):
+        template = data.get('template') or getattr(self.instance, 'template', None)
+        until = data.get('until')
+        if until and template and until < template.workout_date:
+            raise serializers.ValidationError({
+                'until': 'Until date cannot be before the template date.'
+            })
+        return data
+
+    def _apply_weekdays(self, validated_data):
+        weekdays = validated_data.pop('weekdays', None)
+        if weekdays is not None:
+            validated_data['weekday_mask'] = sum(
+                1 << day for day in set(weekdays)
+            )
+        return validated_data
+
+    def create(self, validated_data):
+        validated_data = self._apply_weekdays(validated_data)
+        template = validated_data['template']
+        template.is_template = True
+        template.save(update_fields=['is_template', 'updated_at'])
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self._apply_weekdays(validated_data))
+
+
+class WorkoutTrackSerializer(serializers.ModelSerializer):
+    """Figures and simplified polyline of a GPS track"""
+
+    class Meta:
+        model = WorkoutTrack
+        fields = [
+            'source_format', 'point_count', 'distance', 'elevation_gain',
+            'elapsed', 'started_at', 'splits', 'polyline',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class WorkoutStreamSerializer(serializers.ModelSerializer):
+    """Summary of one stored sample channel"""
+
+    class Meta:
+        model = WorkoutStream
+        fields = [
+            'channel', 'interval', 'sample_count', 'minimum', 'maximum',
+            'average', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class WorkoutStreamUploadSerializer(serializers.Serializer):
+    """Sample channels sent by a device, None marking dropouts"""
+    interval = serializers.IntegerField(min_value=1, max_value=60, default=1)
+    channels = serializers.DictField(
+        child=serializers.ListField(allow_empty=False, max_length=streams.MAX_SAMPLES),
+        allow_empty=False
+    )
+
+    def validate_channels(self, value):
+        unknown = set(value) - set(streams.CHANNELS)
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown channels: {', '.join(sorted(unknown))}."
+            )
+        for channel, samples in value.items():
+            # Checked in one loop; a field per sample is far too slow
+            for sample in samples:
+                if sample is not None and (
+                    type(sample) is not int or not 0 <= sample <= streams.MAX_VALUE
+                ):
+                    raise serializers.ValidationError(
+                        f"{channel} samples must be integers between 0 and {streams.MAX_VALUE} or null."
+                    )
+        return value
+
+
+class GoalSerializer(serializers.ModelSerializer):
+    """Serializer for a structured goal"""
+    title = serializers.CharField(max_length=50, required=False)
+    start_date = serializers.DateField(required=False)
+
+    class Meta:
+        model = Goal
+        fields = [
+            'id', 'title', 'metric', 'period', 'workout_type', 'target',
+            'start_date', 'end_date', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+    def validate_target(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Target must be greater than zero.")
+        return value
+
+    def validate(self, data):
+        def value(field):
+            return data[field] if field in data else getattr(self.instance, field, None)
+
+        period = value('period')
+        if period == 'custom' and (value('start_date') is None or value('end_date') is None):
+            raise serializers.ValidationError({
+                'end_date': 'Custom periods need a start and an end date.'
+            })
+        if self.instance is None:
+            # Recurring goals count the period they are set in
+            data.setdefault('start_date', leaderboards.period_start(
+                period, timezone.now().date()
+            ))
+            if not data.get('title'):
+                request = self.context.get('request')
+                # The free-text goal of the profile names the first goals
+                label = dict(Goal.METRIC_CHOICES)[data['metric']]
+                data['title'] = getattr(request.user, 'fitness_goal', None) or (
+                    label if period == 'custom' else f"{label} per {period}"
+                )
+        if value('end_date') and value('end_date') < value('start_date'):
+            raise serializers.ValidationError({
+                'end_date': 'End date cannot be before the start date.'
+            })
+        return data
+
+
+class GoalProgressSerializer(serializers.Serializer):
+    """Progress of a goal in its current period"""
+    goal = GoalSerializer()
+    period_start = serializers.DateField()
+    period_end = serializers.DateField()
+    value = serializers.DecimalField(max_digits=12, decimal_places=2)
+    percent = serializers.DecimalField(max_digits=5, decimal_places=1)
+    achieved = serializers.BooleanField()
+
+
 class WorkoutSummarySerializer(serializers.Serializer):
     """Serializer for workout statistics and summaries"""
     total_workouts = serializers.IntegerField()
@@ -101,3 +338,37 @@ class WorkoutSummarySerializer(serializers.Serializer):
     total_distance = serializers.DecimalField(max_digits=10, decimal_places=2)
     completed_workouts = serializers.IntegerField()
     workout_types = serializers.DictField()
+
+
+class TeamSerializer(serializers.ModelSerializer):
+    """Serializer for a coach's team"""
+    athlete_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Team
+        fields = ['id', 'name', 'join_code', 'athlete_count', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'join_code', 'created_at', 'updated_at']
+
+
+class TeamTotalsSerializer(serializers.Serializer):
+    """Workout totals of one athlete, or of one workout type"""
+    total_workouts = serializers.IntegerField()
+    completed_workouts = serializers.IntegerField()
+    total_duration = serializers.IntegerField()
+    total_distance = serializers.DecimalField(max_digits=10, decimal_places=2)
+    total_calories = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class TeamAthleteSummarySerializer(TeamTotalsSerializer):
+    """Serializer for one athlete's row of a team summary"""
+    athlete_id = serializers.IntegerField()
+    name = serializers.CharField()
+    workout_types = serializers.DictField(child=TeamTotalsSerializer())
+
+
+class LeaderboardEntrySerializer(serializers.Serializer):
+    """Serializer for one ranked leaderboard row"""
+    rank = serializers.IntegerField()
+    user_id = serializers.IntegerField()
+    display_name = serializers.CharField()
+    score = serializers.DecimalField(max_digits=10, decimal_places=2)
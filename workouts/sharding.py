@@ -0,0 +1,391 @@
+"""
+Placement of workout data on shard databases keyed by user id.
+
+``WORKOUT_SHARDS`` lists the shard database aliases. Each user's
+workouts, recurrence rules and goals live on one shard, recorded in the
+UserShard directory on the default database; users without an entry
+live on the default database, where all data was kept before sharding.
+Shards hold a copy of their users' rows so foreign keys and joins on
+user columns keep working there.
+"""
+import logging
+import threading
+import time
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.functional import cached_property
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from FitnessTrackerApp_backend import caching
+from FitnessTrackerApp_backend.paginators import EstimatedCountPaginator
+from .models import (
+    Goal, GoalProgress, ShardSequence, UserShard, Workout, WorkoutRecurrence,
+    WorkoutStream, WorkoutTrack
+)
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+
+# Sharded models in copy order, with the lookup of their owning user
+SHARDED_MODELS = {
+    Workout: 'user_id',
+    WorkoutRecurrence: 'template__user_id',
+    WorkoutTrack: 'workout__user_id',
+    WorkoutStream: 'workout__user_id',
+    Goal: 'user_id',
+    GoalProgress: 'goal__user_id',
+}
+
+# Seconds a user's placement is cached. Moves update the cached entry
+# directly; the timeout only bounds edits made to the directory by hand.
+PLACEMENT_TIMEOUT = 5 * 60
+
+# Ids reserved per process at a time from the shared sequence
+ID_BLOCK_SIZE = getattr(settings, 'WORKOUT_SHARD_ID_BLOCK_SIZE', 100)
+
+_id_blocks = {}
+_id_lock = threading.Lock()
+
+
+class ShardMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Your workouts are being moved. Try again in a moment.'
+    default_code = 'shard_moving'
+    # Sent as Retry-After by the exception handler
+    wait = 1
+
+
+def shard_aliases():
+    return list(getattr(settings, 'WORKOUT_SHARDS', None) or [PRIMARY])
+
+
+def is_sharded():
+    return len(shard_aliases()) > 1
+
+
+def _placement_key(user_id):
+    return f"workout-shard:{user_id}"
+
+
+def placement(user_id):
+    """Return (alias, moving) for a user"""
+    key = _placement_key(user_id)
+    cached = cache.get(key)
+    if cached is None:
+        row = UserShard.objects.using(PRIMARY).filter(
+            user_id=user_id
+        ).values_list('alias', 'moving').first()
+        cached = tuple(row) if row else (PRIMARY, False)
+        # add() never overwrites, so a row read just before a move
+        # cannot replace the placement the move stored meanwhile
+        cache.add(key, cached, PLACEMENT_TIMEOUT)
+    return cached
+
+
+def set_placement(user_id, alias, moving=False):
+    UserShard.objects.using(PRIMARY).update_or_create(
+        user_id=user_id, defaults={'alias': alias, 'moving': moving}
+    )
+    cache.set(_placement_key(user_id), (alias, moving), PLACEMENT_TIMEOUT)
+
+
+def shard_for(user_id):
+    """Database alias holding the user's workouts"""
+    if not is_sharded():
+        return PRIMARY
+    return placement(user_id)[0]
+
+
+def check_writable(user_id):
+    if is_sharded() and placement(user_id)[1]:
+        raise ShardMoving()
+
+
+def copy_user(user_id, alias):
+    """Copy the user's row to a shard so foreign keys resolve there"""
+    if alias == PRIMARY:
+        return
+    user = get_user_model().objects.using(PRIMARY).get(pk=user_id)
+    # Shards never authenticate anyone
+    user.password = make_password(None)
+    user.save(using=alias)
+
+
+def place_new_user(user):
+    """Spread new users over the shards by id"""
+    aliases = shard_aliases()
+    alias = aliases[user.pk % len(aliases)]
+    copy_user(user.pk, alias)
+    set_placement(user.pk, alias)
+
+
+def assign_id(instance):
+    """Give a new row of a sharded model an id unique across all shards"""
+    if instance.pk is not None or not is_sharded():
+        return
+    instance.pk = next_id(type(instance))
+
+
+def next_id(model):
+    table = model._meta.db_table
+    with _id_lock:
+        start, end = _id_blocks.get(table, (0, 0))
+        if start >= end:
+            start, end = _reserve_ids(model, ID_BLOCK_SIZE)
+        _id_blocks[table] = (start + 1, end)
+    return start
+
+
+def _reserve_ids(model, size):
+    """Take the next block of ids from the sequence on the default database"""
+    table = model._meta.db_table
+    with transaction.atomic(using=PRIMARY):
+        sequences = ShardSequence.objects.using(PRIMARY).select_for_update()
+        sequence = sequences.filter(name=table).first()
+        if sequence is None:
+            highest = max(
+                model._base_manager.using(alias).aggregate(highest=Max('pk'))['highest'] or 0
+                for alias in shard_aliases()
+            )
+            ShardSequence.objects.using(PRIMARY).get_or_create(
+                name=table, defaults={'next_value': highest + 1}
+            )
+            sequence = sequences.get(name=table)
+        start = sequence.next_value
+        sequence.next_value = start + size
+        sequence.save(update_fields=['next_value'])
+    return start, start + size
+
+
+def _owner_id(instance):
+    """Id of the user owning an instance, if known without a query"""
+    if isinstance(instance, (Workout, Goal)):
+        return instance.user_id
+    if isinstance(instance, WorkoutRecurrence):
+        template = instance._state.fields_cache.get('template')
+        return template.user_id if template is not None else None
+    if isinstance(instance, (WorkoutTrack, WorkoutStream)):
+        workout = instance._state.fields_cache.get('workout')
+        return workout.user_id if workout is not None else None
+    if isinstance(instance, GoalProgress):
+        goal = instance._state.fields_cache.get('goal')
+        return goal.user_id if goal is not None else None
+    if isinstance(instance, get_user_model()):
+        return instance.pk
+    return None
+
+
+class ShardRouter:
+    """
+    Route sharded models to their user's shard.
+
+    Queries are placed by the ``user_id`` hint set by ``for_user()``, or
+    by the instance being saved or followed. Anything else falls through
+    to the next router, so the default shard keeps replica routing.
+    """
+
+    def _route(self, model, hints):
+        """Return (alias, user_id) for a sharded model, else (None, None)"""
+        if model not in SHARDED_MODELS or not is_sharded():
+            return None, None
+        instance = hints.get('instance')
+        user_id = hints.get('user_id') if instance is None else _owner_id(instance)
+        if isinstance(instance, tuple(SHARDED_MODELS)) and instance._state.db in shard_aliases():
+            return instance._state.db, user_id
+        if user_id is None:
+            return None, None
+        return shard_for(user_id), user_id
+
+    def db_for_read(self, model, **hints):
+        alias, _ = self._route(model, hints)
+        return None if alias == PRIMARY else alias
+
+    def db_for_write(self, model, **hints):
+        alias, user_id = self._route(model, hints)
+        if user_id is not None:
+            check_writable(user_id)
+        return alias
+
+
+def fan_out(queryset):
+    """The queryset once per shard"""
+    return [queryset.using(alias) for alias in shard_aliases()]
+
+
+def get_from_shards(queryset, **lookup):
+    """Find a single row on whichever shard holds it"""
+    for shard_queryset in fan_out(queryset):
+        obj = shard_queryset.filter(**lookup).first()
+        if obj is not None:
+            return obj
+    return None
+
+
+def _sort_value(obj, path):
+    for part in path.split('__'):
+        if obj is None:
+            break
+        obj = getattr(obj, part, None)
+    return obj
+
+
+def merge_ordered(rows, ordering):
+    """Sort rows from several shards as the database would have"""
+    rows = list(rows)
+    for field in reversed(ordering):
+        if not isinstance(field, str) or field == '?':
+            continue
+        descending = field.startswith('-')
+        path = field.lstrip('-')
+        # NULLs sort last ascending and first descending, as in PostgreSQL
+        rows.sort(
+            key=lambda row: (_sort_value(row, path) is None, _sort_value(row, path)),
+            reverse=descending
+        )
+    return rows
+
+
+class ShardedPaginator(EstimatedCountPaginator):
+    """
+    Paginate a queryset over every shard.
+
+    Each shard returns its first rows up to the end of the page; the
+    rows are merged in the queryset's order and the page cut from them.
+    """
+
+    @cached_property
+    def count(self):
+        if not is_sharded():
+            return super().count
+        return sum(
+            EstimatedCountPaginator(queryset, self.per_page).count
+            for queryset in fan_out(self.object_list)
+        )
+
+    def page(self, number):
+        if not is_sharded():
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        ordering = self.object_list.query.order_by or self.object_list.model._meta.ordering
+        rows = merge_ordered(
+            chain.from_iterable(queryset[:top] for queryset in fan_out(self.object_list)),
+            ordering
+        )
+        return self._get_page(rows[bottom:top], number, self)
+
+
+def _owned_rows(model, user_id, alias):
+    return model._base_manager.using(alias).filter(
+        **{SHARDED_MODELS[model]: user_id}
+    ).order_by('pk')
+
+
+def _copy_rows(user_id, source, target, batch_size, since=None):
+    """Upsert the user's rows from source into target; return the count"""
+    copied = 0
+    with transaction.atomic(using=target):
+        for model in SHARDED_MODELS:
+            fields = [
+                field.attname for field in model._meta.concrete_fields
+                if not field.primary_key
+            ]
+            rows = _owned_rows(model, user_id, source)
+            if since is not None:
+                rows = rows.filter(updated_at__gte=since)
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    copied += _upsert(model, batch, fields, target)
+                    batch = []
+            if batch:
+                copied += _upsert(model, batch, fields, target)
+    return copied
+
+
+def _upsert(model, rows, fields, alias):
+    model._base_manager.using(alias).bulk_create(
+        rows, update_conflicts=True, unique_fields=[model._meta.pk.name], update_fields=fields
+    )
+    return len(rows)
+
+
+def _remove_rows(user_id, alias, keep_from=None):
+    """
+    Delete the user's rows on a shard without signals.
+
+    Moving a row leaves derived data unchanged. With ``keep_from`` only
+    rows missing from that shard are removed.
+    """
+    with transaction.atomic(using=alias):
+        for model in reversed(list(SHARDED_MODELS)):
+            rows = _owned_rows(model, user_id, alias)
+            if keep_from is not None:
+                kept = _owned_rows(model, user_id, keep_from).values_list('pk', flat=True)
+                rows = rows.exclude(pk__in=list(kept))
+            # Foreign keys are checked at commit, so the order of the
+            # mutually referencing tables does not matter
+            model._base_manager.using(alias).filter(
+                pk__in=list(rows.values_list('pk', flat=True))
+            )._raw_delete(alias)
+
+
+def move_user(user_id, target, batch_size=1000, grace=2.0):
+    """
+    Move a user's workouts to another shard while they keep using the app.
+
+    Rows are copied in bulk first. Writes are then refused for ``grace``
+    seconds plus the time needed to copy what changed meanwhile, after
+    which the user is switched over and the old rows removed.
+    Returns the number of rows copied.
+
+    Web processes learn of the move from the cached placement, so the
+    default cache must be shared with them; with a per-process cache
+    they would keep writing to the source shard and those writes would
+    be lost.
+    """
+    if not caching.is_shared():
+        raise ImproperlyConfigured(
+            "Moving users needs a default cache shared by every process, "
+            "e.g. Redis or memcached set through CACHE_BACKEND."
+        )
+    if target not in shard_aliases():
+        raise ValueError(f"Unknown shard {target!r}")
+    source = shard_for(user_id)
+    if source == target:
+        return 0
+
+    copy_user(user_id, target)
+    started = timezone.now()
+    copied = _copy_rows(user_id, source, target, batch_size)
+
+    set_placement(user_id, source, moving=True)
+    try:
+        # Let writes that passed the check before the flag finish
+        time.sleep(grace)
+        copied += _copy_rows(user_id, source, target, batch_size, since=started)
+        _remove_rows(user_id, target, keep_from=source)
+        set_placement(user_id, target)
+    except Exception:
+        set_placement(user_id, source)
+        raise
+
+    _remove_rows(user_id, source)
+    if source != PRIMARY:
+        get_user_model()._base_manager.using(source).filter(pk=user_id)._raw_delete(source)
+    logger.info("Moved user %s from %s to %s (%s rows)", user_id, source, target, copied)
+    return copied
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import (
+    goals, heatmap, leaderboards, live, sharding, suggestions, training_load, weekly_reports,
+)
+from .models import Workout
+
+
+@receiver(post_save, sender=Workout)
+def workout_saved(sender, instance, created, using, **kwargs):
+    """Keep derived data in step with the saved workout"""
+    previous = None if created else instance.previous_values
+    current = instance.snapshot()
+    goals.record_change(previous, current)
+    leaderboards.record_change(instance, previous, current)
+    heatmap.record_change(previous, current, using)
+    _invalidate_training_load(previous, current)
+    weekly_reports.record_change(previous, current)
+    suggestions.record_change(previous, current, using)
+    live.workout_changed(instance, previous, current, using)
+
+
+@receiver(post_delete, sender=Workout)
+def workout_deleted(sender, instance, using, origin=None, **kwargs):
+    """Remove the deleted workout from derived data"""
+    # Cascades from a deleted user clean up their derived rows themselves
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Workout:
+        return
+    goals.record_change(instance.previous_values, None)
+    leaderboards.record_change(instance, instance.previous_values, None)
+    heatmap.record_change(instance.previous_values, None, using)
+    _invalidate_training_load(instance.previous_values, None)
+    weekly_reports.record_change(instance.previous_values, None)
+    suggestions.record_change(instance.previous_values, None, using)
+    live.workout_changed(instance, instance.previous_values, None, using)
+
+
+def _invalidate_training_load(previous, current):
+    if previous == current:
+        return
+    for values in (previous, current):
+        if training_load.affects_load(values):
+            training_load.invalidate(values['user_id'])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, using, **kwargs):
+    """Place new users on a shard and keep shard copies of users current"""
+    if using != sharding.PRIMARY or not sharding.is_sharded():
+        return
+    if created:
+        sharding.place_new_user(instance)
+    else:
+        sharding.copy_user(instance.pk, sharding.shard_for(instance.pk))
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleting(sender, instance, using, **kwargs):
+    """Delete the user's shard copy, and with it their workouts there"""
+    if using != sharding.PRIMARY or not sharding.is_sharded():
+        return
+    alias = sharding.shard_for(instance.pk)
+    if alias != sharding.PRIMARY:
+        sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+def refresh_derived(user_ids, years=()):
+    """
+    Recompute derived data after set-based updates that bypass signals.
+
+    Used by bulk admin actions; ``years`` lists the workout years touched.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    leaderboards.rebuild(user_ids=user_ids)
+    for user_id in user_ids:
+        training_load.invalidate(user_id)
+    weekly_reports.drop(user_ids)
+    suggestions.drop(user_ids)
+    goals.recount_users(user_ids)
+    cache.delete_many([
+        heatmap.cache_key(user_id, year)
+        for user_id in user_ids for year in years
+    ])
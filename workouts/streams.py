@@ -0,0 +1,210 @@
+"""
+Per-second sample streams (heart rate, cadence, power) of a workout.
+
+Each channel is stored as one binary blob: a small header, a table of
+block lengths and the samples in independently zlib-compressed blocks
+of int32 deltas. A time range is read by decompressing only the blocks
+that overlap it. Series are downsampled for display with
+Largest-Triangle-Three-Buckets or min/max per bucket.
+"""
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+
+from django.db import transaction
+
+from .models import WorkoutStream
+from .sharding import shard_for
+
+CHANNELS = [choice for choice, _ in WorkoutStream.CHANNEL_CHOICES]
+
+# Stored in place of samples the device did not record
+MISSING = 0xFFFF
+
+# Largest value a sample may have
+MAX_VALUE = MISSING - 1
+
+# A day at 1 Hz
+MAX_SAMPLES = 24 * 60 * 60
+
+BLOCK_SIZE = 1024
+
+# version, block size, sample count, block count
+HEADER = struct.Struct('<BHII')
+BLOCK_LENGTH = struct.Struct('<I')
+FORMAT_VERSION = 1
+
+DOWNSAMPLE_METHODS = ['lttb', 'minmax']
+
+# Upper edges of heart rate zones 1-4 as fractions of the maximum heart
+# rate; zone 5 is everything above
+HEART_RATE_ZONES = [0.6, 0.7, 0.8, 0.9]
+
+# Upper edges of power zones 1-6 as fractions of functional threshold
+# power (Coggan); zone 7 is everything above
+POWER_ZONES = [0.55, 0.75, 0.9, 1.05, 1.2, 1.5]
+
+
+def _pack_block(values):
+    deltas = array('i')
+    previous = 0
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+    return zlib.compress(deltas.tobytes())
+
+
+def _unpack_block(data):
+    deltas = array('i', zlib.decompress(data))
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+    return array('H', accumulate(deltas))
+
+
+def pack(samples):
+    """Pack a list of samples, None for missing ones, into a blob"""
+    values = [MISSING if sample is None else sample for sample in samples]
+    blocks = [
+        _pack_block(values[start:start + BLOCK_SIZE])
+        for start in range(0, len(values), BLOCK_SIZE)
+    ]
+    return b''.join(
+        [HEADER.pack(FORMAT_VERSION, BLOCK_SIZE, len(values), len(blocks))]
+        + [BLOCK_LENGTH.pack(len(block)) for block in blocks]
+        + blocks
+    )
+
+
+def unpack(data, start=0, stop=None):
+    """
+    Return the samples in [start, stop) as an array, MISSING for gaps.
+
+    Only the blocks overlapping the range are decompressed.
+    """
+    data = memoryview(data)
+    version, block_size, count, block_count = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unknown stream format version {version}")
+    stop = count if stop is None else min(stop, count)
+    start = max(start, 0)
+    values = array('H')
+    if start >= stop:
+        return values
+
+    offset = HEADER.size + BLOCK_LENGTH.size * block_count
+    first, last = start // block_size, (stop - 1) // block_size
+    for index in range(last + 1):
+        length, = BLOCK_LENGTH.unpack_from(data, HEADER.size + BLOCK_LENGTH.size * index)
+        if index >= first:
+            values.extend(_unpack_block(data[offset:offset + length]))
+        offset += length
+    skip = start - first * block_size
+    return values[skip:skip + stop - start]
+
+
+def summarize(samples):
+    """Count, minimum, maximum and mean of the recorded samples"""
+    present = [sample for sample in samples if sample is not None and sample != MISSING]
+    if not present:
+        return {'sample_count': len(samples), 'minimum': None, 'maximum': None, 'average': None}
+    return {
+        'sample_count': len(samples),
+        'minimum': min(present),
+        'maximum': max(present),
+        'average': round(sum(present) / len(present), 1),
+    }
+
+
+def lttb(times, values, threshold):
+    """Indexes kept by Largest-Triangle-Three-Buckets downsampling"""
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    every = (count - 2) / (threshold - 2)
+    kept = [0]
+    previous = 0
+    for bucket in range(threshold - 2):
+        # The average of the next bucket is the third triangle corner
+        following = int((bucket + 1) * every) + 1
+        following_end = min(int((bucket + 2) * every) + 1, count)
+        size = following_end - following
+        average_time = sum(times[following:following_end]) / size
+        average_value = sum(values[following:following_end]) / size
+
+        time_a, value_a = times[previous], values[previous]
+        best, best_area = None, -1.0
+        for index in range(int(bucket * every) + 1, following):
+            area = abs(
+                (time_a - average_time) * (values[index] - value_a)
+                - (time_a - times[index]) * (average_value - value_a)
+            )
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
+
+def minmax(values, points):
+    """Indexes of the minimum and maximum of each of points / 2 buckets"""
+    count = len(values)
+    if points >= count:
+        return list(range(count))
+    size = -(-count // max(points // 2, 1))
+    kept = []
+    for start in range(0, count, size):
+        bucket = range(start, min(start + size, count))
+        low = min(bucket, key=values.__getitem__)
+        high = max(bucket, key=values.__getitem__)
+        kept.extend(sorted({low, high}))
+    return kept
+
+
+def downsample(values, interval, offset, points, method='lttb'):
+    """
+    Return (times, values) of at most ``points`` recorded samples.
+
+    ``values`` start ``offset`` samples into the stream; times are
+    seconds from its start.
+    """
+    times = [
+        (offset + index) * interval
+        for index, value in enumerate(values) if value != MISSING
+    ]
+    present = [value for value in values if value != MISSING]
+    if method == 'minmax':
+        kept = minmax(present, points)
+    else:
+        kept = lttb(times, present, points)
+    return [times[index] for index in kept], [present[index] for index in kept]
+
+
+def zone_times(values, interval, threshold, edges):
+    """Seconds spent in each zone, given zone edges as fractions of threshold"""
+    bounds = [edge * threshold for edge in edges]
+    seconds = [0] * (len(bounds) + 1)
+    for value in values:
+        if value != MISSING:
+            seconds[bisect_right(bounds, value)] += interval
+    return seconds
+
+
+def save(workout, interval, channels):
+    """Store channels (name -> samples) on the workout, replacing them"""
+    streams = []
+    with transaction.atomic(using=shard_for(workout.user_id)):
+        for channel, samples in channels.items():
+            stream, _ = WorkoutStream.objects.for_user(workout.user_id).update_or_create(
+                workout=workout,
+                channel=channel,
+                defaults=dict(summarize(samples), interval=interval, data=pack(samples))
+            )
+            streams.append(stream)
+    return streams
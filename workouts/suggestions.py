@@ -0,0 +1,123 @@
+"""
+Title suggestions from per-user prefix indexes held in memory.
+
+A user's index keeps their distinct workout titles in case-folded order
+with usage counts, so a prefix lookup is a bisect and a short scan.
+Indexes are built with one GROUP BY on first use and kept in an LRU of
+at most MAX_USERS users per process. Workout writes in this process
+patch a loaded index once they commit; writes made by other processes
+show up when the index is rebuilt after MAX_AGE seconds.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Workout
+
+MAX_USERS = getattr(settings, 'TITLE_SUGGEST_MAX_USERS', 10000)
+
+# Seconds an index is served before it is rebuilt
+MAX_AGE = getattr(settings, 'TITLE_SUGGEST_MAX_AGE', 300)
+
+MAX_LIMIT = 20
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+class TitleIndex:
+    """Distinct titles of one user with how often each was used"""
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self.keys = sorted((title.casefold(), title) for title in self.counts)
+        self.built_at = time.monotonic()
+
+    def add(self, title, change):
+        count = self.counts.get(title, 0) + change
+        if count > 0:
+            if title not in self.counts:
+                insort(self.keys, (title.casefold(), title))
+            self.counts[title] = count
+        elif title in self.counts:
+            del self.counts[title]
+            self.keys.pop(bisect_left(self.keys, (title.casefold(), title)))
+
+    def suggest(self, prefix, limit):
+        """The most used titles starting with prefix, ignoring case"""
+        prefix = prefix.casefold()
+        matches = []
+        position = bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and self.keys[position][0].startswith(prefix):
+            matches.append(self.keys[position][1])
+            position += 1
+        return [
+            (title, self.counts[title])
+            for title in heapq.nsmallest(
+                limit, matches, key=lambda title: -self.counts[title]
+            )
+        ]
+
+
+def build(user_id):
+    rows = Workout.objects.for_user(user_id).values_list('title').annotate(
+        count=Count('id')
+    ).order_by()
+    return TitleIndex(rows)
+
+
+def get_index(user_id):
+    """The user's index, built on a miss or once it is too old"""
+    with _lock:
+        index = _indexes.get(user_id)
+        if index is not None and time.monotonic() - index.built_at < MAX_AGE:
+            _indexes.move_to_end(user_id)
+            return index
+
+    index = build(user_id)
+    with _lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > MAX_USERS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def suggest(user_id, prefix, limit=10):
+    """(title, count) pairs of the user's titles starting with prefix"""
+    index = get_index(user_id)
+    with _lock:
+        return index.suggest(prefix, limit)
+
+
+def record_change(previous, current, using):
+    """Move a changed workout's title between counts once it commits"""
+    changes = {}
+    for values, sign in ((previous, -1), (current, 1)):
+        if values and values.get('title'):
+            key = (values['user_id'], values['title'])
+            changes[key] = changes.get(key, 0) + sign
+    changes = {key: change for key, change in changes.items() if change}
+    if changes:
+        transaction.on_commit(lambda: _apply(changes), using=using)
+
+
+def _apply(changes):
+    with _lock:
+        for (user_id, title), change in changes.items():
+            index = _indexes.get(user_id)
+            if index is not None:
+                index.add(title, change)
+
+
+def drop(user_ids):
+    """Forget the users' indexes, after changes that skip signals"""
+    with _lock:
+        for user_id in user_ids:
+            _indexes.pop(user_id, None)
@@ -0,0 +1,22 @@
+from jobs.registry import task
+
+from . import idempotency, leaderboards
+from .signals import refresh_derived
+
+
+@task(name='workouts.rebuild_user_leaderboards')
+def rebuild_user_leaderboards(user_id):
+    """Score a user's existing completed workouts after opting in"""
+    leaderboards.rebuild(user_ids=[user_id])
+
+
+@task(name='workouts.refresh_derived')
+def refresh_derived_data(user_ids, years):
+    """Recompute derived data after a set-based update"""
+    refresh_derived(user_ids, years)
+
+
+@task(name='workouts.prune_idempotency_keys')
+def prune_idempotency_keys(batch_size=1000):
+    """Delete idempotency keys past their TTL"""
+    return idempotency.prune_expired(batch_size=batch_size)
@@ -0,0 +1,89 @@
+"""
+Team summaries: workout totals of a coach's athletes in one query.
+
+The members' workouts are grouped by athlete and workout type in a
+single GROUP BY per shard, filtered on the member ids and a date range
+so it reads the (user, workout_date) index. Athlete totals are folded
+from the type rows, then sorted and paged in Python; a team is at most
+a few hundred rows.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from . import sharding
+
+METRICS = [
+    'total_workouts', 'completed_workouts', 'total_duration',
+    'total_distance', 'total_calories',
+]
+
+# Days summarized when no start date is given, today included
+DEFAULT_DAYS = 28
+
+ORDERINGS = METRICS + ['name']
+
+
+def _zero():
+    return {
+        'total_workouts': 0,
+        'completed_workouts': 0,
+        'total_duration': 0,
+        'total_distance': Decimal(0),
+        'total_calories': Decimal(0),
+    }
+
+
+def display_name(athlete):
+    return athlete.get_full_name() or athlete.email
+
+
+def summarize(athletes, workouts):
+    """
+    One row per athlete with totals and a breakdown by workout type.
+
+    ``workouts`` is an unfiltered or filtered Workout queryset; athletes
+    without matching workouts get zero totals.
+    """
+    rows = {
+        athlete.pk: {
+            'athlete_id': athlete.pk,
+            'name': display_name(athlete),
+            **_zero(),
+            'workout_types': {},
+        }
+        for athlete in athletes
+    }
+    if not rows:
+        return []
+
+    grouped = workouts.filter(user_id__in=list(rows)).values_list(
+        'user_id', 'workout_type'
+    ).annotate(
+        total_workouts=Count('id'),
+        completed_workouts=Count('id', filter=Q(status='completed')),
+        total_duration=Sum('duration'),
+        total_distance=Sum('distance'),
+        total_calories=Sum('calories_burned'),
+    ).order_by()
+    for shard_rows in sharding.fan_out(grouped):
+        for user_id, workout_type, *totals in shard_rows:
+            row = rows[user_id]
+            by_type = row['workout_types'].setdefault(workout_type, _zero())
+            for metric, value in zip(METRICS, totals):
+                by_type[metric] += value or 0
+                row[metric] += value or 0
+    return list(rows.values())
+
+
+def sort(rows, ordering):
+    """Sort by a metric or the name, '-' first for descending, ids breaking ties"""
+    field = ordering.lstrip('-')
+    if field == 'name':
+        def key(row):
+            return row['name'].lower()
+    else:
+        def key(row):
+            return row[field]
+    rows = sorted(rows, key=lambda row: row['athlete_id'])
+    return sorted(rows, key=key, reverse=ordering.startswith('-'))
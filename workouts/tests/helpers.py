@@ -0,0 +1,56 @@
+from datetime import date, datetime
+
+
+class MinimalUser:
+    """Minimal in-memory user for testing"""
+
+    def __init__(self):
+        self.id = 1
+        self.pk = 1
+        self.email = "test@example.com"
+        self.username = "testuser"
+        self.weight = None
+
+    @property
+    def is_authenticated(self):
+        return True
+
+
+class MinimalWorkout:
+    """Minimal in-memory workout object"""
+
+    def __init__(self, **kwargs):
+        self.id = kwargs.get('id', 1)
+        self.pk = self.id
+        self.user_id = kwargs.get('user_id', 1)
+        self.workout_type = kwargs.get('workout_type', 'running')
+        self.title = kwargs.get('title', 'Morning Run')
+        self.description = kwargs.get('description', 'Easy run')
+        self.duration = kwargs.get('duration', 30)
+        self.calories_burned = kwargs.get('calories_burned', 250.0)
+        self.distance = kwargs.get('distance', 5.0)
+        self.intensity = kwargs.get('intensity', 'medium')
+        self.status = kwargs.get('status', 'planned')
+        self.notes = kwargs.get('notes', '')
+        self.workout_date = kwargs.get('workout_date', date.today())
+        self.started_at = kwargs.get('started_at', None)
+        self.completed_at = kwargs.get('completed_at', None)
+        self.created_at = kwargs.get('created_at', datetime.now())
+        self.updated_at = kwargs.get('updated_at', datetime.now())
+
+        # Mock user relationship
+        self.user = MinimalUser()
+
+    @property
+    def duration_display(self):
+        if self.duration:
+            hours = self.duration // 60
+            minutes = self.duration % 60
+            if hours > 0:
+                return f"{hours}h {minutes}m"
+            return f"{minutes}m"
+        return "N/A"
+
+    def save(self):
+        """Mock save method"""
+        pass
@@ -0,0 +1,50 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.contrib.admin.sites import site
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from FitnessTrackerApp_backend.paginators import EstimatedCountPaginator
+from authentication.models import User
+from jobs.worker import Worker
+
+from .. import leaderboards
+from ..models import LeaderboardScore, Workout
+
+
+class WorkoutAdminTests(TestCase):
+    def setUp(self):
+        self.admin = site._registry[Workout]
+        self.request = APIRequestFactory().get('/admin/workouts/workout/')
+        self.user = User.objects.create_user(
+            email='admin-test@example.com', password='x', leaderboard_opt_in=True
+        )
+        self.workout = Workout.objects.create(
+            user=self.user, title='Tempo Run', workout_type='running',
+            distance=6, duration=35, workout_date=date.today()
+        )
+
+    def test_search_uses_single_indexed_lookup(self):
+        queryset = Workout.objects.all()
+        for term in [str(self.workout.pk), 'admin-test@example.com', 'Tempo']:
+            results, may_have_duplicates = self.admin.get_search_results(self.request, queryset, term)
+            self.assertEqual(list(results), [self.workout])
+            self.assertFalse(may_have_duplicates)
+        self.assertFalse(self.admin.get_search_results(self.request, queryset, 'Run')[0].exists())
+
+    def test_mark_completed_is_set_based_and_refreshes_scores(self):
+        with patch.object(self.admin, 'message_user'):
+            self.admin.mark_completed(self.request, Workout.objects.filter(pk=self.workout.pk))
+        self.assertFalse(LeaderboardScore.objects.exists())
+        Worker().run_pending()
+
+        self.workout.refresh_from_db()
+        self.assertEqual(self.workout.status, 'completed')
+        self.assertIsNotNone(self.workout.completed_at)
+        self.assertEqual(LeaderboardScore.objects.get(user=self.user, period='week').distance, 6)
+        start = leaderboards.period_start('week', date.today())
+        self.assertEqual(leaderboards.rank(self.user, 'week', start, 'running', 'distance')[0], 1)
+
+    def test_paginator_counts_exactly_without_planner_estimates(self):
+        self.assertEqual(EstimatedCountPaginator(Workout.objects.order_by('pk'), 10).count, 1)
@@ -0,0 +1,54 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+
+from authentication.models import User
+
+from ..calories import INTENSITIES, WORKOUT_TYPES, backfill, estimate, estimate_batch
+from ..models import Workout
+
+
+class CalorieEstimateTests(SimpleTestCase):
+    def test_estimate_uses_met_weight_and_duration(self):
+        # 9.8 MET x 3.5 x 80 kg / 200 x 60 min
+        self.assertEqual(estimate('running', 'medium', 60, Decimal('80')), Decimal('823.20'))
+        self.assertEqual(estimate('yoga', 'low', 60), Decimal('147.00'))
+        self.assertIsNone(estimate('running', 'medium', None))
+
+    def test_batch_matches_single_estimates(self):
+        cases = [('running', 'high', 45, 62.5), ('swimming', 'low', 30, 70), ('other', 'medium', 600, 150)]
+        batch = estimate_batch(
+            [WORKOUT_TYPES.index(case[0]) for case in cases],
+            [INTENSITIES.index(case[1]) for case in cases],
+            [case[2] for case in cases],
+            [case[3] for case in cases]
+        )
+        self.assertEqual(
+            [Decimal(str(value)).quantize(Decimal('0.01')) for value in batch],
+            [estimate(*case) for case in cases]
+        )
+
+
+class CalorieBackfillTests(TestCase):
+    def test_backfill_fills_only_missing_calories(self):
+        user = User.objects.create_user(email='burn@example.com', password='x', weight=Decimal('80'))
+        missing = Workout.objects.create(
+            user=user, title='Run', workout_type='running', duration=60,
+            status='completed', workout_date=date(2024, 1, 1)
+        )
+        kept = Workout.objects.create(
+            user=user, title='Ride', duration=60, calories_burned=Decimal('100'),
+            workout_date=date(2024, 1, 2)
+        )
+        no_duration = Workout.objects.create(user=user, title='Plan', workout_date=date(2024, 1, 3))
+
+        batches = list(backfill('default', batch_size=1))
+
+        self.assertEqual(batches, [(1, {user.pk})])
+        missing.refresh_from_db()
+        kept.refresh_from_db()
+        no_duration.refresh_from_db()
+        self.assertEqual(missing.calories_burned, Decimal('823.20'))
+        self.assertEqual(kept.calories_burned, Decimal('100'))
+        self.assertIsNone(no_duration.calories_burned)
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import Workout, WorkoutRecurrence
+from ..views import WorkoutViewSet
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='dashboard@example.com', password='x')
+        self.today = date.today()
+        week_start = self.today - timedelta(days=self.today.weekday())
+        for title, workout_date, workout_status in [
+            ('Today run', self.today, 'completed'),
+            ('Week start swim', week_start, 'planned'),
+            ('Old ride', week_start - timedelta(days=3), 'completed'),
+        ]:
+            Workout.objects.create(
+                user=self.user, title=title, workout_type='running', duration=30,
+                distance=Decimal('5.00'), workout_date=workout_date, status=workout_status
+            )
+        template = Workout.objects.create(
+            user=self.user, title='Daily Stretch', workout_type='yoga',
+            workout_date=week_start - timedelta(days=14), is_template=True
+        )
+        WorkoutRecurrence.objects.create(template=template, weekday_mask=0b1111111)
+
+    def _get(self, action, **params):
+        request = self.factory.get('/api/workouts/', params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': action})(request)
+
+    def test_dashboard_matches_the_separate_endpoints(self):
+        with CaptureQueriesContext(connection) as queries:
+            dashboard = self._get('dashboard').data
+        workout_reads = [query for query in queries if 'FROM "workouts"' in query['sql']]
+        # This week's rows, the recurrence templates and the summary
+        self.assertEqual(len(workout_reads), 3)
+
+        for action in ('today', 'this_week', 'summary'):
+            with self.subTest(action):
+                self.assertEqual(dashboard[action], self._get(action).data)
+        self.assertIn('Daily Stretch', [workout['title'] for workout in dashboard['today']])
+        self.assertEqual(dashboard['summary']['total_workouts'], 3)
+        self.assertEqual(dashboard['summary']['total_distance'], '15.00')
+
+    def test_dashboard_applies_the_list_filters(self):
+        dashboard = self._get('dashboard', status='completed').data
+        self.assertEqual([workout['title'] for workout in dashboard['today']], ['Today run'])
+        self.assertEqual(dashboard['summary']['completed_workouts'], 2)
+        self.assertEqual(self._get('dashboard', status='done').status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,76 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..filters import WorkoutFilter
+from ..models import Workout, WorkoutRecurrence
+from ..views import WorkoutViewSet
+
+
+class WorkoutFilterTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='filter@example.com', password='x')
+        for day, workout_type, duration, workout_status in [
+            (1, 'running', 30, 'completed'),
+            (2, 'cycling', 90, 'completed'),
+            (3, 'swimming', 45, 'planned'),
+            (4, 'running', 60, 'skipped'),
+        ]:
+            Workout.objects.create(
+                user=self.user, title=f'{workout_type} {day}', workout_type=workout_type,
+                duration=duration, status=workout_status, workout_date=date(2024, 1, day)
+            )
+        template = Workout.objects.create(
+            user=self.user, title='Daily Run', workout_type='running', duration=20,
+            workout_date=date(2024, 1, 1), is_template=True
+        )
+        WorkoutRecurrence.objects.create(template=template, weekday_mask=0b1111111)
+
+    def _get(self, action, **params):
+        request = self.factory.get('/api/workouts/', params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': action})(request)
+
+    def test_multi_value_and_range_filters(self):
+        response = self._get(
+            'list', start_date='2024-01-01', end_date='2024-01-04',
+            workout_type__in='running,cycling', duration__gte='40'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The daily occurrences are shorter than the range allows
+        self.assertEqual([item['title'] for item in response.data], ['running 4', 'cycling 2'])
+
+        response = self._get('list', start_date='2024-01-01', end_date='2024-01-02', status__in='planned')
+        self.assertEqual(
+            [item['title'] for item in response.data], ['Daily Run', 'Daily Run']
+        )
+
+    def test_summary_applies_filters_once(self):
+        response = self._get('summary', status='completed', duration__lte='60')
+        self.assertEqual(response.data['total_workouts'], 1)
+        self.assertEqual(response.data['workout_types'], {'running': 1})
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in [
+            {'start_date': 'yesterday'},
+            {'workout_type__in': 'running,flying'},
+            {'status': 'done'},
+            {'duration__gte': '-5'},
+            {'calories__lte': 'lots'},
+        ]:
+            with self.subTest(params):
+                self.assertEqual(self._get('list', **params).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get('summary', end_date='2024-13-01').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookups_follow_index_order(self):
+        queryset = Workout.objects.for_user(self.user)
+        first = WorkoutFilter({'end_date': '2024-01-04', 'status': 'completed'}, queryset=queryset).qs
+        second = WorkoutFilter({'status': 'completed', 'end_date': '2024-01-04'}, queryset=queryset).qs
+        sql = str(first.query)
+        self.assertEqual(sql, str(second.query))
+        self.assertLess(sql.index('"status" ='), sql.index('"workout_date" <='))
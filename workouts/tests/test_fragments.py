@@ -0,0 +1,94 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from .. import fragments
+from ..models import Workout, WorkoutRecurrence
+from ..serializers import WorkoutSerializer
+from ..views import WorkoutRecurrenceViewSet, WorkoutViewSet
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        fragments.get_cache().clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='fragments@example.com', password='x')
+        self.workouts = [
+            Workout.objects.create(
+                user=self.user, title=f'Run {day}', workout_type='running', duration=30,
+                status='completed', workout_date=date(2024, 1, day)
+            )
+            for day in range(1, 5)
+        ]
+        template = Workout.objects.create(
+            user=self.user, title='Daily Stretch', workout_type='yoga',
+            workout_date=date(2024, 1, 1), is_template=True
+        )
+        self.rule = WorkoutRecurrence.objects.create(template=template, weekday_mask=0b1111111)
+
+    def _call(self, method, action, data=None, **kwargs):
+        request = getattr(self.factory, method)('/api/workouts/', data, format='json')
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({method: action})(request, **kwargs)
+
+    def _list(self):
+        fresh = WorkoutSerializer.to_fresh_representation
+        with patch.object(
+            WorkoutSerializer, 'to_fresh_representation', autospec=True, side_effect=fresh
+        ) as serialized:
+            response = self._call('get', 'list', {'start_date': '2024-01-01', 'end_date': '2024-01-04'})
+        titles = [call.args[1].title for call in serialized.call_args_list]
+        return response.data, titles
+
+    def test_lists_serialize_only_changed_workouts(self):
+        first, first_titles = self._list()
+        self.assertEqual(len(first_titles), 8)
+
+        again, titles = self._list()
+        self.assertEqual(again, first)
+        # Virtual occurrences are always serialized
+        self.assertEqual(titles, ['Daily Stretch'] * 4)
+
+        self._call('patch', 'partial_update', {'title': 'Long run'}, pk=self.workouts[1].pk)
+        changed, titles = self._list()
+        self.assertEqual(titles.count('Long run'), 1)
+        self.assertEqual(len(titles), 5)
+        self.assertIn('Long run', [item['title'] for item in changed])
+
+    def test_deleted_rule_is_not_served_from_fragments(self):
+        occurrence = Workout.objects.create(
+            user=self.user, title='Daily Stretch', workout_type='yoga',
+            workout_date=date(2024, 1, 2), recurrence=self.rule
+        )
+        listed, _ = self._list()
+        self.assertIn(self.rule.pk, [item['recurrence'] for item in listed])
+
+        request = self.factory.delete('/api/recurrences/')
+        force_authenticate(request, user=self.user)
+        response = WorkoutRecurrenceViewSet.as_view({'delete': 'destroy'})(request, pk=self.rule.pk)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        listed, titles = self._list()
+        self.assertNotIn(occurrence.title, titles)
+        kept = [item for item in listed if item['id'] == occurrence.pk]
+        self.assertEqual(kept[0]['recurrence'], None)
+
+    def test_fragments_stay_out_of_the_default_cache(self):
+        self._list()
+        key = fragments.cache_key(self.workouts[0])
+        self.assertIsNotNone(fragments.get_cache().get(key))
+        self.assertIsNone(cache.get(key))
+
+    def test_owner_email_is_read_from_the_row(self):
+        self._list()
+        self.user.email = 'renamed@example.com'
+        self.user.save()
+        response = self._call('get', 'retrieve', pk=self.workouts[0].pk)
+        self.assertEqual(response.data['user'], 'renamed@example.com')
+        self.assertEqual(response.data['title'], 'Run 1')
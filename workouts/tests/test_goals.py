@@ -0,0 +1,97 @@
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db import transaction
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import Workout
+from ..views import GoalViewSet
+
+
+class GoalTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            email='goals@example.com', password='x', fitness_goal='Run a marathon'
+        )
+        self.today = date.today()
+        self.run = Workout.objects.create(
+            user=self.user, title='Run', workout_type='running', duration=40,
+            distance=Decimal('8.00'), status='completed', workout_date=self.today
+        )
+
+    def _call(self, method, action, data=None, **kwargs):
+        request = getattr(self.factory, method)('/api/goals/', data, format='json')
+        force_authenticate(request, user=self.user)
+        return GoalViewSet.as_view({method: action})(request, **kwargs)
+
+    def _progress(self):
+        return {item['goal']['id']: item for item in self._call('get', 'progress').data}
+
+    def test_counters_follow_workout_changes(self):
+        response = self._call('post', 'create', {'metric': 'distance', 'period': 'month', 'target': 20})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['title'], 'Run a marathon')
+        distance = response.data['id']
+        runs = self._call('post', 'create', {
+            'metric': 'workouts', 'period': 'week', 'workout_type': 'running', 'target': 2
+        }).data['id']
+        # Existing workouts are counted when a goal is set
+        self.assertEqual(self._progress()[distance]['value'], '8.00')
+
+        ride = Workout.objects.create(
+            user=self.user, title='Ride', workout_type='cycling', distance=Decimal('12.00'),
+            workout_date=self.today
+        )
+        self.assertEqual(self._progress()[distance]['value'], '8.00')
+        ride.status = 'completed'
+        ride.save()
+        second_run = Workout.objects.create(
+            user=self.user, title='Run', workout_type='running', status='completed',
+            workout_date=self.today
+        )
+        with self.assertNumQueries(2):
+            progress = self._progress()
+        self.assertEqual(progress[distance]['value'], '20.00')
+        self.assertTrue(progress[distance]['achieved'])
+        self.assertEqual(progress[runs]['value'], '2.00')
+        self.assertEqual(progress[runs]['percent'], '100.0')
+
+        second_run.delete()
+        self.run.distance = Decimal('3.00')
+        self.run.save()
+        progress = self._progress()
+        self.assertEqual(progress[distance]['value'], '15.00')
+        self.assertEqual(progress[runs]['value'], '1.00')
+
+    def test_redefining_a_goal_recounts_it(self):
+        goal = self._call('post', 'create', {'metric': 'workouts', 'period': 'week', 'target': 3}).data
+        self.assertEqual(self._progress()[goal['id']]['value'], '1.00')
+        response = self._call('patch', 'partial_update', {'metric': 'duration'}, pk=goal['id'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._progress()[goal['id']]['value'], '40.00')
+
+    def test_counter_failures_roll_back_the_workout(self):
+        self._call('post', 'create', {'metric': 'workouts', 'period': 'week', 'target': 3})
+        self.run.status = 'skipped'
+        with patch('workouts.goals._apply_delta', side_effect=RuntimeError):
+            # Stands in for autocommit, where the save's own block is outermost
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.run.save()
+        self.assertEqual(Workout.objects.get(pk=self.run.pk).status, 'completed')
+
+    def test_invalid_goals_are_rejected(self):
+        for data in [
+            {'metric': 'workouts', 'period': 'week', 'target': 0},
+            {'metric': 'distance', 'period': 'custom', 'target': 10},
+            {'metric': 'distance', 'period': 'custom', 'target': 10,
+             'start_date': '2024-02-01', 'end_date': '2024-01-01'},
+            {'metric': 'steps', 'period': 'week', 'target': 10},
+        ]:
+            with self.subTest(data):
+                self.assertEqual(self._call('post', 'create', data).status_code, status.HTTP_400_BAD_REQUEST)
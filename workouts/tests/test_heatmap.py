@@ -0,0 +1,71 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import Workout
+from ..views import WorkoutViewSet
+
+
+class HeatmapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='heat@example.com', password='x')
+
+    def _heatmap(self, **params):
+        request = self.factory.get('/api/workouts/heatmap/', params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': 'heatmap'})(request)
+
+    def test_days_are_packed_counts_and_levels(self):
+        Workout.objects.create(
+            user=self.user, title='Run', status='completed', duration=45,
+            workout_date=date(2024, 1, 2)
+        )
+        Workout.objects.create(
+            user=self.user, title='Plan', status='planned', workout_date=date(2024, 1, 3)
+        )
+        response = self._heatmap(year=2024)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['days']), 366)
+        self.assertEqual(response.data['days'][1], (1 << 3) | 2)
+        self.assertEqual(response.data['days'][2], 0)
+        self.assertEqual(self._heatmap(year='abc').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cached_year_is_dropped_on_committed_writes(self):
+        self._heatmap(year=2024)
+        with self.captureOnCommitCallbacks(execute=True):
+            workout = Workout.objects.create(
+                user=self.user, title='Ride', status='completed', duration=100,
+                workout_date=date(2024, 3, 1)
+            )
+        response = self._heatmap(year=2024)
+        self.assertEqual(response.data['days'][60], (1 << 3) | 4)
+        with self.assertNumQueries(0):
+            self._heatmap(year=2024)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            workout.delete()
+        self.assertEqual(self._heatmap(year=2024).data['total_workouts'], 0)
+
+    def test_rolled_back_writes_leave_the_cached_year(self):
+        self._heatmap(year=2024)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Workout.objects.create(
+                        user=self.user, title='Ride', status='completed', duration=100,
+                        workout_date=date(2024, 3, 1)
+                    )
+                    raise ValueError
+            except ValueError:
+                pass
+        with self.assertNumQueries(0):
+            self.assertEqual(self._heatmap(year=2024).data['total_workouts'], 0)
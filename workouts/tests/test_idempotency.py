@@ -0,0 +1,87 @@
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..idempotency import fingerprint, prune_expired
+from ..models import IdempotencyKey, Workout
+from ..views import WorkoutViewSet
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='retry@example.com', password='x')
+
+    def _post(self, action, data, key, **kwargs):
+        path = f"/api/workouts/{kwargs.get('pk', '')}"
+        request = self.factory.post(path, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'post': action})(request, **kwargs)
+
+    def _fingerprint(self, data):
+        request = self.factory.post('/api/workouts/', data, format='json')
+        return fingerprint(Request(request, parsers=[JSONParser()]))
+
+    def test_retried_create_replays_first_response(self):
+        data = {'workout_type': 'running', 'title': 'Run', 'workout_date': '2024-05-01'}
+        first = self._post('create', data, 'abc')
+        with self.assertNumQueries(1):
+            replay = self._post('create', data, 'abc')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.data['id'], first.data['id'])
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Workout.objects.filter(user=self.user).count(), 1)
+
+        changed = self._post('create', dict(data, title='Other'), 'abc')
+        self.assertEqual(changed.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_duplicate_waits_for_unfinished_key(self):
+        IdempotencyKey.objects.create(
+            user=self.user, key='busy', fingerprint='x',
+            expires_at=datetime(2100, 1, 1, tzinfo=timezone.utc)
+        )
+        with patch('workouts.idempotency.WAIT_TIMEOUT', 0):
+            response = self._post('create', {}, 'busy')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        IdempotencyKey.objects.filter(key='busy').update(
+            fingerprint=self._fingerprint({})
+        )
+        with patch('workouts.idempotency.WAIT_TIMEOUT', 0):
+            response = self._post('create', {}, 'busy')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_replayed_complete_does_not_touch_workouts(self):
+        workout = Workout.objects.create(
+            user=self.user, title='Swim', workout_type='swimming', workout_date=date(2024, 5, 2)
+        )
+        first = self._post('complete', {'duration': 30}, 'done-1', pk=workout.pk)
+        with patch.object(Workout.objects, 'get_queryset') as mock_queryset:
+            replay = self._post('complete', {'duration': 30}, 'done-1', pk=workout.pk)
+
+        mock_queryset.assert_not_called()
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(replay.status_code, status.HTTP_200_OK)
+        self.assertEqual(replay.data['status'], 'completed')
+
+    def test_prune_expired_deletes_in_batches(self):
+        for index in range(5):
+            IdempotencyKey.objects.create(
+                user=self.user, key=f"old-{index}", fingerprint='x',
+                expires_at=datetime(2000, 1, 1, tzinfo=timezone.utc)
+            )
+        IdempotencyKey.objects.create(
+            user=self.user, key='fresh', fingerprint='x',
+            expires_at=datetime(2100, 1, 1, tzinfo=timezone.utc)
+        )
+        self.assertEqual(prune_expired(batch_size=2), 5)
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['fresh'])
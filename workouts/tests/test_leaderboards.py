@@ -0,0 +1,99 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from .. import leaderboards
+from ..models import LeaderboardBucket, LeaderboardScore, Workout
+from ..views import LeaderboardViewSet
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.day = date.today()
+        self.alice = User.objects.create_user(
+            email='alice@example.com', password='x', first_name='Alice', leaderboard_opt_in=True
+        )
+        self.bob = User.objects.create_user(
+            email='bob@example.com', password='x', first_name='Bob', leaderboard_opt_in=True
+        )
+        self.carol = User.objects.create_user(email='carol@example.com', password='x')
+
+    def _run(self, user, distance, status='completed'):
+        return Workout.objects.create(
+            user=user, title='Run', workout_type='running', status=status,
+            workout_date=self.day, duration=30, distance=distance
+        )
+
+    def _board(self, user, **params):
+        request = self.factory.get('/api/leaderboards/', params)
+        force_authenticate(request, user=user)
+        return LeaderboardViewSet.as_view({'get': 'list'})(request)
+
+    def test_scores_follow_completed_workouts_incrementally(self):
+        self._run(self.alice, 5)
+        workout = self._run(self.bob, 3, status='in_progress')
+        self._run(self.carol, 50)
+        self.assertEqual(LeaderboardScore.objects.filter(period='week').count(), 1)
+
+        workout.status = 'completed'
+        workout.distance = 8
+        workout.save()
+        start = leaderboards.period_start('week', self.day)
+        self.assertEqual(leaderboards.rank(self.bob, 'week', start, 'running', 'distance')[0], 1)
+        self.assertEqual(leaderboards.rank(self.alice, 'week', start, 'running', 'distance')[0], 2)
+        self.assertEqual(leaderboards.rank(self.carol, 'week', start, 'running', 'distance'), (None, None))
+
+        workout.delete()
+        score = LeaderboardScore.objects.get(user=self.bob, period='month')
+        self.assertEqual(score.distance, 0)
+
+    def test_rebuild_matches_incremental_scores(self):
+        self._run(self.alice, 5)
+        self._run(self.alice, 2)
+        self._run(self.bob, 4)
+        incremental = sorted(LeaderboardScore.objects.values_list(
+            'user_id', 'period', 'period_start', 'distance', 'duration'
+        ))
+        leaderboards.rebuild()
+        self.assertEqual(sorted(LeaderboardScore.objects.values_list(
+            'user_id', 'period', 'period_start', 'distance', 'duration'
+        )), incremental)
+
+    def test_list_returns_top_and_my_rank(self):
+        self._run(self.alice, 5)
+        self._run(self.bob, 9)
+
+        response = self._board(self.alice, metric='distance', workout_type='running')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([entry['display_name'] for entry in response.data['top']], ['Bob', 'Alice'])
+        self.assertEqual(response.data['me']['rank'], 2)
+
+        invalid = self._board(self.alice, metric='steps')
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rejects_limits_out_of_range(self):
+        self.assertEqual(self._board(self.alice, limit=100).status_code, status.HTTP_200_OK)
+        for limit in ['-1', '0', '101', 'ten']:
+            response = self._board(self.alice, limit=limit)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, {'limit': 'Must be between 1 and 100.'})
+
+    def test_rank_uses_bucket_counts(self):
+        start = leaderboards.period_start('week', self.day)
+        board = {'period': 'week', 'period_start': start, 'workout_type': 'running'}
+        LeaderboardScore.objects.bulk_create([
+            LeaderboardScore(user=user, distance=distance, **board)
+            for user, distance in [(self.alice, 12), (self.bob, 12), (self.carol, 400)]
+        ])
+        leaderboards.rebuild_buckets('week', start, 'running')
+        self.assertEqual(
+            LeaderboardBucket.objects.filter(metric='distance', **board).count(), 2
+        )
+        self.assertEqual(leaderboards.rank(self.carol, 'week', start, 'running', 'distance')[0], 1)
+        self.assertEqual(leaderboards.rank(self.alice, 'week', start, 'running', 'distance')[0], 2)
+        self.assertEqual(leaderboards.rank(self.bob, 'week', start, 'running', 'distance')[0], 3)
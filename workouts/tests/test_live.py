@@ -0,0 +1,90 @@
+import asyncio
+import json
+import threading
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+
+from .. import live
+from ..live import event_type, get_broker, live_events
+from ..models import Workout
+
+
+class LiveBrokerTests(SimpleTestCase):
+    def test_events_reach_subscribers_from_other_threads(self):
+        async def scenario():
+            broker = live.Broker()
+            subscription = broker.subscribe(['user:1'])
+            other = broker.subscribe(['user:2'])
+            thread = threading.Thread(target=broker.publish, args=('user:1', {'type': 'start'}))
+            thread.start()
+            event = await asyncio.wait_for(subscription.queue.get(), 1)
+            thread.join()
+            self.assertEqual(event, {'type': 'start'})
+            self.assertTrue(other.queue.empty())
+
+            broker.unsubscribe(subscription)
+            self.assertEqual(broker.subscriber_count(), 1)
+            for index in range(live.QUEUE_SIZE + 1):
+                broker.publish('user:2', {'index': index})
+            await asyncio.sleep(0)
+            self.assertTrue(other.overflowed)
+
+        asyncio.run(scenario())
+
+    def test_event_types_follow_status_changes(self):
+        self.assertEqual(event_type(None, {'status': 'planned'}), 'create')
+        self.assertEqual(event_type({'status': 'planned'}, {'status': 'in_progress'}), 'start')
+        self.assertEqual(event_type({'status': 'completed'}, {'status': 'completed'}), 'update')
+        self.assertEqual(event_type({'status': 'planned'}, None), 'delete')
+
+
+class LiveEventsViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='live@example.com', password='x')
+
+    async def test_subscribers_receive_workout_changes(self):
+        token = str(AccessToken.for_user(self.user))
+        factory = AsyncRequestFactory()
+        self.assertEqual((await live_events(factory.get('/api/live/'))).status_code, 401)
+        self.assertEqual(
+            (await live_events(factory.get('/api/live/', {'token': token, 'workout': 999}))).status_code,
+            404
+        )
+        self.assertEqual((await live_events(RequestFactory().get('/api/live/'))).status_code, 501)
+
+        response = await live_events(factory.get('/api/live/', {'token': token}))
+        stream = response.streaming_content
+        self.assertEqual(await stream.__anext__(), b'retry: 3000\n\n')
+
+        def start_workout():
+            with self.captureOnCommitCallbacks(execute=True):
+                workout = Workout.objects.create(
+                    user=self.user, title='Run', workout_date=date(2024, 1, 1)
+                )
+                workout.status = 'in_progress'
+                workout.save()
+
+        # The subscription is registered when the stream starts waiting
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        await sync_to_async(start_workout)()
+
+        created = (await asyncio.wait_for(pending, 1)).decode()
+        started = (await asyncio.wait_for(stream.__anext__(), 1)).decode()
+        self.assertIn('event: create', created)
+        self.assertIn('event: start', started)
+        payload = json.loads(started.split('data: ')[1])
+        self.assertEqual(payload['workout']['status'], 'in_progress')
+
+        # A client disconnecting cancels the task serving the stream
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(get_broker().subscriber_count(), 0)
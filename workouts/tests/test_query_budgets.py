@@ -0,0 +1,98 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from FitnessTrackerApp_backend.query_inspection import (
+    QueryInspectionMiddleware, RepeatedQueryError, load_budgets, query_shape,
+)
+from authentication.models import User
+
+from ..models import Team, Workout
+
+
+class QueryShapeTests(SimpleTestCase):
+    def test_in_lists_collapse_to_one_shape(self):
+        self.assertEqual(
+            query_shape('SELECT * FROM workouts WHERE id IN (%s, %s,%s) AND user_id = %s'),
+            'SELECT * FROM workouts WHERE id IN (...) AND user_id = %s'
+        )
+        self.assertEqual(query_shape('SELECT * FROM w WHERE id IN (%s)'), 'SELECT * FROM w WHERE id IN (%s)')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class QueryBudgetTests(TestCase):
+    """Every endpoint in query_budgets.json, through the full middleware stack"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='budget@example.com', password='long-enough-pw-1')
+        self.workouts = [
+            Workout.objects.create(
+                user=self.user, title=f'Run {day}', workout_type='running',
+                duration=30, workout_date=date(2024, 1, day)
+            )
+            for day in range(1, 7)
+        ]
+        self.team = Team.objects.create(coach=self.user, name='Budget club')
+        coach = User.objects.create_user(email='budget-coach@example.com', password='x')
+        self.other_team = Team.objects.create(coach=coach, name='Other club')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_endpoints_stay_within_budget(self):
+        first, second, third, fourth = (workout.pk for workout in self.workouts[:4])
+        calls = {
+            'GET workout-list': ('get', '/api/workouts/', None),
+            'POST workout-list': ('post', '/api/workouts/', {'title': 'New', 'workout_date': '2024-02-01'}),
+            'GET workout-detail': ('get', f'/api/workouts/{first}/', None),
+            'PATCH workout-detail': ('patch', f'/api/workouts/{first}/', {'title': 'Renamed'}),
+            'DELETE workout-detail': ('delete', f'/api/workouts/{second}/', None),
+            'POST workout-start': ('post', f'/api/workouts/{third}/start/', None),
+            'POST workout-complete': ('post', f'/api/workouts/{third}/complete/', None),
+            'POST workout-skip': ('post', f'/api/workouts/{fourth}/skip/', None),
+            'GET workout-summary': ('get', '/api/workouts/summary/', None),
+            'GET workout-dashboard': ('get', '/api/workouts/dashboard/', None),
+            'GET workout-today': ('get', '/api/workouts/today/', None),
+            'GET workout-this-week': ('get', '/api/workouts/this_week/', None),
+            'GET workout-heatmap': ('get', '/api/workouts/heatmap/', None),
+            'GET workout-training-load': ('get', '/api/workouts/training_load/', None),
+            'GET workout-weekly-report': ('get', '/api/workouts/weekly_report/?week=2024-01-03', None),
+            'GET workout-suggest': ('get', '/api/workouts/suggest/?prefix=Ru', None),
+            'GET recurrence-list': ('get', '/api/recurrences/', None),
+            'GET leaderboard-list': ('get', '/api/leaderboards/?workout_type=running', None),
+            'GET goal-list': ('get', '/api/goals/', None),
+            'POST goal-list': ('post', '/api/goals/', {'metric': 'workouts', 'period': 'week', 'target': 3}),
+            'GET goal-progress': ('get', '/api/goals/progress/', None),
+            'GET team-list': ('get', '/api/teams/', None),
+            'POST team-list': ('post', '/api/teams/', {'name': 'New club'}),
+            'GET team-summary': ('get', f'/api/teams/{self.team.pk}/summary/', None),
+            'POST team-join': ('post', '/api/teams/join/', {'join_code': self.other_team.join_code}),
+            'POST register': ('post', '/api/auth/register/', {
+                'email': 'new@example.com', 'username': 'new', 'first_name': 'New',
+                'last_name': 'User', 'password': 'long-enough-pw-1', 'password2': 'long-enough-pw-1',
+            }),
+            'POST login': ('post', '/api/auth/login/', {
+                'email': 'budget@example.com', 'password': 'long-enough-pw-1'
+            }),
+        }
+        budgets = load_budgets()
+        self.assertEqual(set(calls), set(budgets))
+        for endpoint, (method, url, data) in calls.items():
+            with self.subTest(endpoint):
+                # Requests over budget raise QueryBudgetExceeded
+                response = getattr(self.client, method)(url, data, format='json')
+                self.assertLess(response.status_code, 400, response.content)
+                self.assertLessEqual(int(response['X-Query-Count']), budgets[endpoint])
+
+    def test_repeated_queries_raise_with_their_origin(self):
+        def naive_view(request):
+            workouts = Workout.objects.filter(user=self.user)
+            return JsonResponse({'users': [workout.user.email for workout in workouts]})
+
+        middleware = QueryInspectionMiddleware(naive_view)
+        with self.assertRaisesRegex(RepeatedQueryError, 'naive_view'):
+            middleware(RequestFactory().get('/'))
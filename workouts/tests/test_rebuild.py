@@ -0,0 +1,103 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from authentication.models import User
+
+from .. import goals, leaderboards
+from ..models import (
+    Goal, GoalProgress, LeaderboardBucket, LeaderboardScore, RebuildCheckpoint,
+    Workout,
+)
+from ..rebuild import Stat, STATS
+
+
+class RebuildStatsTests(TestCase):
+    def setUp(self):
+        self.runner = User.objects.create_user(
+            email='runner@example.com', password='x', leaderboard_opt_in=True
+        )
+        self.rider = User.objects.create_user(email='rider@example.com', password='x')
+        for user, workout_type, distance in [
+            (self.runner, 'running', Decimal('10.00')),
+            (self.runner, 'running', Decimal('5.50')),
+            (self.rider, 'cycling', Decimal('40.00')),
+        ]:
+            Workout.objects.create(
+                user=user, title=workout_type, workout_type=workout_type, status='completed',
+                workout_date=date(2024, 1, 10), duration=30, distance=distance
+            )
+        for user in (self.runner, self.rider):
+            goal = Goal.objects.create(
+                user=user, title='Distance', metric='distance', period='month',
+                target=50, start_date=date(2024, 1, 1)
+            )
+            goals.recount(goal)
+
+    def _call(self, *args, **options):
+        out = StringIO()
+        call_command('rebuild_stats', *args, processes=1, chunk_size=1, stdout=out, **options)
+        return out.getvalue()
+
+    def test_verify_reports_drift_that_a_rebuild_repairs(self):
+        self._call(verify=True)
+
+        LeaderboardScore.objects.filter(period='week').update(distance=Decimal('1.00'))
+        LeaderboardBucket.objects.all().delete()
+        GoalProgress.objects.filter(goal__user=self.rider).delete()
+        # One score, the four deleted non-empty buckets and one goal counter
+        with self.assertRaises(CommandError) as raised:
+            self._call(verify=True)
+        self.assertIn('6 stored rows differ', str(raised.exception))
+
+        output = self._call()
+        self.assertIn('leaderboards: wrote 2 rows for 2 ranges', output)
+        self.assertIn('goals: wrote 2 rows for 2 ranges', output)
+        self._call(verify=True)
+        self.assertEqual(
+            LeaderboardScore.objects.get(period='week').distance, Decimal('15.50')
+        )
+        self.assertEqual(
+            GoalProgress.objects.get(goal__user=self.rider).value, Decimal('40.00')
+        )
+
+    def test_resume_skips_checkpointed_ranges(self):
+        GoalProgress.objects.all().delete()
+        RebuildCheckpoint.objects.create(
+            stat='goals', first_id=self.runner.pk, last_id=self.runner.pk,
+            chunk_size=1, rows=1
+        )
+        output = self._call('goals', resume=True)
+        self.assertIn('goals: resuming, 1 ranges already done', output)
+        self.assertEqual(list(GoalProgress.objects.values_list('goal__user', flat=True)), [self.rider.pk])
+        self.assertFalse(RebuildCheckpoint.objects.exists())
+
+        RebuildCheckpoint.objects.create(
+            stat='goals', first_id=self.runner.pk, last_id=self.rider.pk,
+            chunk_size=2, rows=2
+        )
+        with self.assertRaises(CommandError):
+            self._call('goals', resume=True)
+        self._call('goals')
+        self.assertEqual(GoalProgress.objects.count(), 2)
+
+    def test_leaderboard_stat_expects_what_a_leaderboard_rebuild_writes(self):
+        stat = STATS['leaderboards']
+        leaderboards.rebuild()
+        self.assertEqual(
+            stat.expected(self.runner.pk, self.rider.pk, 100),
+            stat.stored(self.runner.pk, self.rider.pk, 100)
+        )
+
+    def test_stats_must_implement_every_step(self):
+        class Partial(Stat):
+            name = 'partial'
+
+            def expected(self, first_id, last_id, batch_size):
+                return {}
+
+        with self.assertRaises(TypeError):
+            Partial()
@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from .. import heatmap, leaderboards, training_load
+from ..goals import recount
+from ..models import Goal, GoalProgress, LeaderboardScore, Workout, WorkoutRecurrence
+from ..recurrence import HORIZON_DAYS, occurrence_dates, parse_virtual_id, virtual_id
+from ..views import WorkoutRecurrenceViewSet, WorkoutViewSet
+from .helpers import MinimalWorkout
+
+
+class MinimalRule:
+    """Minimal in-memory recurrence rule"""
+
+    def __init__(self, start, weekdays, interval=1, until=None, count=None):
+        self.pk = 1
+        self.template = MinimalWorkout(workout_date=start)
+        self.weekday_mask = sum(1 << day for day in weekdays)
+        self.interval = interval
+        self.until = until
+        self.count = count
+
+
+class RecurrenceExpansionTests(SimpleTestCase):
+    def test_weekly_pattern_within_window(self):
+        # 2024-01-01 is a Monday; repeat Mondays and Wednesdays
+        rule = MinimalRule(date(2024, 1, 1), weekdays=[0, 2])
+        days = list(occurrence_dates(rule, date(2024, 1, 8), date(2024, 1, 14)))
+        self.assertEqual(days, [date(2024, 1, 8), date(2024, 1, 10)])
+
+    def test_interval_skips_weeks(self):
+        rule = MinimalRule(date(2024, 1, 1), weekdays=[0], interval=2)
+        days = list(occurrence_dates(rule, date(2024, 1, 1), date(2024, 1, 31)))
+        self.assertEqual(days, [date(2024, 1, 1), date(2024, 1, 15), date(2024, 1, 29)])
+
+    def test_count_and_until_limit_occurrences(self):
+        counted = MinimalRule(date(2024, 1, 3), weekdays=[0, 2], count=3)
+        self.assertEqual(
+            list(occurrence_dates(counted, date(2024, 1, 1), date(2024, 3, 1))),
+            [date(2024, 1, 3), date(2024, 1, 8), date(2024, 1, 10)]
+        )
+        bounded = MinimalRule(date(2024, 1, 1), weekdays=[0], until=date(2024, 1, 10))
+        self.assertEqual(
+            list(occurrence_dates(bounded, date(2024, 1, 1), date(2024, 3, 1))),
+            [date(2024, 1, 1), date(2024, 1, 8)]
+        )
+
+    def test_virtual_id_round_trip(self):
+        self.assertEqual(parse_virtual_id(virtual_id(7, date(2024, 2, 29))), (7, date(2024, 2, 29)))
+        self.assertIsNone(parse_virtual_id('42'))
+        self.assertIsNone(parse_virtual_id('r1-2024-02-30'))
+
+
+class RecurrenceViewTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='rec@example.com', password='x')
+        self.today = date.today()
+        template = Workout.objects.create(
+            user=self.user, title='Daily Run', workout_type='running',
+            workout_date=self.today - timedelta(days=13), is_template=True
+        )
+        self.rule = WorkoutRecurrence.objects.create(template=template, weekday_mask=0b1111111)
+
+    def _get(self, action, path, **params):
+        request = self.factory.get(path, params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': action})(request)
+
+    def test_list_expands_occurrences_without_rows(self):
+        response = self._get('list', '/api/workouts/', end_date=self.today.isoformat())
+        self.assertEqual(len(response.data), 14)
+        self.assertEqual(response.data[0]['id'], virtual_id(self.rule.pk, self.today))
+        self.assertEqual(Workout.objects.count(), 1)
+
+        today = self._get('today', '/api/workouts/today/')
+        self.assertEqual([item['workout_date'] for item in today.data], [self.today.isoformat()])
+
+    def test_start_materializes_occurrence(self):
+        pk = virtual_id(self.rule.pk, self.today)
+        request = self.factory.post(f'/api/workouts/{pk}/start/')
+        force_authenticate(request, user=self.user)
+        response = WorkoutViewSet.as_view({'post': 'start'})(request, pk=pk)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workout = Workout.objects.get(recurrence=self.rule)
+        self.assertEqual(workout.status, 'in_progress')
+        self.assertEqual(response.data['id'], workout.pk)
+
+        listed = self._get('list', '/api/workouts/', end_date=self.today.isoformat())
+        self.assertEqual(len(listed.data), 14)
+        self.assertEqual(listed.data[0]['id'], workout.pk)
+
+    def test_list_shows_upcoming_occurrences_without_end_date(self):
+        response = self._get('list', '/api/workouts/')
+        self.assertEqual(len(response.data), 14 + HORIZON_DAYS)
+        last_planned = self.today + timedelta(days=HORIZON_DAYS)
+        self.assertEqual(response.data[0]['id'], virtual_id(self.rule.pk, last_planned))
+
+    def test_requested_ordering_covers_occurrences(self):
+        done = Workout.objects.create(
+            user=self.user, title='Swim', workout_type='swimming', status='completed',
+            duration=45, workout_date=self.today - timedelta(days=5)
+        )
+        params = {'start_date': (self.today - timedelta(days=30)).isoformat(),
+                  'end_date': self.today.isoformat()}
+
+        oldest_first = self._get('list', '/api/workouts/', ordering='workout_date', **params).data
+        days = [item['workout_date'] for item in oldest_first]
+        self.assertEqual(days, sorted(days))
+        # After the eight earlier occurrences, next to the one on its day
+        self.assertIn(done.pk, [item['id'] for item in oldest_first[8:10]])
+
+        # Occurrences without a duration sort like NULLs, first descending
+        longest_first = self._get('list', '/api/workouts/', ordering='-duration', **params).data
+        self.assertEqual(longest_first[-1]['id'], done.pk)
+        self.assertEqual(len(longest_first), 15)
+
+
+    def test_paged_lists_include_occurrences(self):
+        class FivePerPage(PageNumberPagination):
+            page_size = 5
+
+        with patch.object(WorkoutViewSet, 'pagination_class', FivePerPage):
+            first = self._get('list', '/api/workouts/')
+            last = self._get('list', '/api/workouts/', page=(14 + HORIZON_DAYS + 4) // 5)
+        self.assertEqual(first.data['count'], 14 + HORIZON_DAYS)
+        self.assertEqual(
+            first.data['results'][0]['id'],
+            virtual_id(self.rule.pk, self.today + timedelta(days=HORIZON_DAYS))
+        )
+        self.assertEqual(
+            last.data['results'][-1]['id'],
+            virtual_id(self.rule.pk, self.today - timedelta(days=13))
+        )
+
+    def test_only_planned_workouts_become_templates(self):
+        done = Workout.objects.create(
+            user=self.user, title='Swim', status='completed', duration=30,
+            workout_date=self.today
+        )
+        request = self.factory.post(
+            '/api/recurrences/', {'template': done.pk, 'weekdays': [0]}, format='json'
+        )
+        force_authenticate(request, user=self.user)
+        response = WorkoutRecurrenceViewSet.as_view({'post': 'create'})(request)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('template', response.data)
+
+        template = self.rule.template
+        request = self.factory.patch(
+            f'/api/workouts/{template.pk}/', {'status': 'completed', 'duration': 30}, format='json'
+        )
+        force_authenticate(request, user=self.user)
+        response = WorkoutViewSet.as_view({'patch': 'partial_update'})(request, pk=template.pk)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_templates_are_left_out_of_statistics(self):
+        self.user.leaderboard_opt_in = True
+        self.user.save()
+        goal = Goal.objects.create(
+            user=self.user, title='Runs', metric='workouts', period='custom', target=3,
+            start_date=self.today - timedelta(days=30)
+        )
+        # A completed template kept from before templates had to be planned
+        Workout.objects.create(
+            user=self.user, title='Old template', workout_type='running', status='completed',
+            duration=60, distance=5, workout_date=self.today, is_template=True
+        )
+
+        self.assertFalse(LeaderboardScore.objects.exists())
+        self.assertFalse(GoalProgress.objects.exists())
+        leaderboards.rebuild(user_ids=[self.user.pk])
+        recount(goal)
+        self.assertFalse(LeaderboardScore.objects.exists())
+        self.assertFalse(GoalProgress.objects.exists())
+        counts, _ = heatmap.build(self.user.pk, self.today.year)
+        self.assertEqual(sum(counts), 0)
+        self.assertEqual(training_load.daily_loads(self.user.pk, self.today, self.today), [0])
@@ -0,0 +1,51 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+
+from ..models import Workout
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # The replica mirrors the primary's test database. Its connection
+    # stays out of test transactions, so rows must be committed to show.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(email='lag@example.com', password='x')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def test_safe_requests_read_from_replica_until_user_writes(self):
+        Workout.objects.create(user=self.user, title='Old', workout_date=date(2024, 1, 1))
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/api/workouts/')
+        self.assertEqual(response['X-Database-Route'], 'replica; reason=safe-method')
+        self.assertEqual(len(response.data), 1)
+        self.assertTrue(replica.captured_queries)
+
+        response = self.client.post(
+            '/api/workouts/', {'title': 'New', 'workout_date': '2024-01-02'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response['X-Database-Route'], 'default; reason=unsafe-method')
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/api/workouts/')
+        self.assertEqual(response['X-Database-Route'], 'default; reason=recent-write')
+        self.assertEqual(len(response.data), 2)
+        self.assertFalse(replica.captured_queries)
+
+    def test_reads_outside_requests_use_primary(self):
+        Workout.objects.create(user=self.user, title='Run', workout_date=date(2024, 1, 1))
+        self.assertEqual(Workout.objects.count(), 1)
+        self.assertEqual(Workout.objects.all().db, 'default')
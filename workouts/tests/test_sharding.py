@@ -0,0 +1,207 @@
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+from jobs.retention import get_policy
+
+from .. import sharding
+from ..goals import progress, recount
+from ..models import Goal, GoalProgress, Workout, WorkoutRecurrence, WorkoutTrack
+from ..sharding import ShardedPaginator, ShardMoving, move_user, set_placement, shard_for
+from ..views import WorkoutViewSet
+
+
+@override_settings(WORKOUT_SHARDS=['default', 'shard_2'])
+class ShardingTests(TestCase):
+    databases = {'default', 'shard_2'}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        # Users are spread over the shards by id
+        first = User.objects.create_user(email='one@example.com', password='x')
+        second = User.objects.create_user(email='two@example.com', password='x')
+        self.users = {user.pk % 2: user for user in (first, second)}
+
+    def _list(self, user):
+        request = self.factory.get('/api/workouts/')
+        force_authenticate(request, user=user)
+        return WorkoutViewSet.as_view({'get': 'list'})(request)
+
+    def _shared_cache(self):
+        """Use a default cache shared between processes, as moves require"""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, True)
+        return override_settings(CACHES=dict(settings.CACHES, default={
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }))
+
+    def test_workouts_live_on_their_users_shard(self):
+        on_default, on_shard = self.users[0], self.users[1]
+        Workout.objects.create(user=on_default, title='A', workout_date=date(2024, 1, 1))
+        Workout.objects.create(user=on_shard, title='B', workout_date=date(2024, 1, 2))
+
+        self.assertEqual(list(Workout.objects.using('default').values_list('title', flat=True)), ['A'])
+        self.assertEqual(list(Workout.objects.using('shard_2').values_list('title', flat=True)), ['B'])
+        self.assertEqual([row['title'] for row in self._list(on_shard).data], ['B'])
+
+    def test_stale_planned_workouts_are_archived_on_every_shard(self):
+        old = date.today() - timedelta(days=200)
+        for user in self.users.values():
+            for title, workout_status, workout_date in [
+                ('forgotten', 'planned', old),
+                ('done', 'completed', old),
+                ('upcoming', 'planned', date.today()),
+            ]:
+                Workout.objects.create(
+                    user=user, title=title, status=workout_status, workout_date=workout_date
+                )
+
+        self.assertEqual(get_policy('stale_planned_workouts').apply(pause=0)['rows'], 2)
+        for alias in ('default', 'shard_2'):
+            statuses = dict(Workout.objects.using(alias).values_list('title', 'status'))
+            self.assertEqual(
+                statuses, {'forgotten': 'skipped', 'done': 'completed', 'upcoming': 'planned'}
+            )
+
+    def test_goal_counters_live_with_the_workouts(self):
+        user = self.users[1]
+        goal = Goal.objects.for_user(user).create(
+            user=user, title='Runs', metric='workouts', period='month', target=4,
+            start_date=date(2024, 1, 1)
+        )
+        recount(goal)
+        Workout.objects.create(
+            user=user, title='Run', status='completed', workout_date=date(2024, 1, 3)
+        )
+        self.assertEqual(GoalProgress.objects.using('shard_2').get().value, 1)
+        self.assertFalse(GoalProgress.objects.using('default').exists())
+        self.assertEqual(progress([goal], date(2024, 1, 20))[0]['value'], 1)
+
+    def test_ids_are_unique_across_shards(self):
+        ids = [
+            Workout.objects.create(user=user, title='Run', workout_date=date(2024, 1, day)).pk
+            for day in range(1, 4) for user in self.users.values()
+        ]
+        self.assertEqual(len(set(ids)), 6)
+
+    def test_move_user_copies_rows_and_switches_shard(self):
+        user = self.users[1]
+        template = Workout.objects.create(
+            user=user, title='Weekly', workout_date=date(2024, 1, 1), is_template=True
+        )
+        rule = WorkoutRecurrence.objects.create(template=template, weekday_mask=1)
+        occurrence = Workout.objects.create(
+            user=user, title='Weekly', workout_date=date(2024, 1, 8), recurrence=rule
+        )
+        WorkoutTrack.objects.create(
+            workout=occurrence, source_format='gpx', point_count=2,
+            points=b'', polyline='', distance=1000.0
+        )
+
+        with self._shared_cache():
+            move_user(user.pk, 'default', grace=0)
+            self.assertEqual(shard_for(user.pk), 'default')
+            self.assertTrue(WorkoutTrack.objects.for_user(user).filter(workout=occurrence).exists())
+            # The rule still expands from its moved template
+            ids = [row['id'] for row in self._list(user).data]
+
+        self.assertFalse(Workout.objects.using('shard_2').exists())
+        moved = Workout.objects.using('default').get(pk=occurrence.pk)
+        self.assertEqual(moved.recurrence_id, rule.pk)
+        self.assertIn(occurrence.pk, ids)
+        self.assertTrue(any(str(row_id).startswith(f"r{rule.pk}-") for row_id in ids))
+
+    def test_no_write_is_lost_while_another_process_moves_the_user(self):
+        user = self.users[1]
+        titles = []
+
+        def write(title):
+            Workout.objects.create(user=user, title=title, workout_date=date(2024, 1, 1))
+            titles.append(title)
+
+        copy_rows = sharding._copy_rows
+
+        def copy_then_write(*args, **kwargs):
+            copied = copy_rows(*args, **kwargs)
+            if 'since' not in kwargs:
+                # Lands after the bulk copy, before writes are refused
+                write('during copy')
+            return copied
+
+        def write_during_grace(seconds):
+            with self.assertRaises(sharding.ShardMoving):
+                write('during grace')
+
+        with self._shared_cache():
+            write('before')
+            # A web process cached the placement before the move started
+            self.assertEqual(sharding.placement(user.pk), ('shard_2', False))
+            with patch.object(sharding, '_copy_rows', side_effect=copy_then_write), \
+                    patch.object(sharding.time, 'sleep', side_effect=write_during_grace):
+                sharding.move_user(user.pk, 'default')
+            # The same web process writes to the new shard straight away
+            write('after')
+
+        self.assertEqual(titles, ['before', 'during copy', 'after'])
+        self.assertCountEqual(
+            Workout.objects.using('default').values_list('title', flat=True), titles
+        )
+        self.assertFalse(Workout.objects.using('shard_2').exists())
+
+    def test_goal_counters_changed_during_a_move_are_caught_up(self):
+        user = self.users[1]
+        goal = Goal.objects.for_user(user).create(
+            user=user, title='Runs', metric='workouts', period='month', target=4,
+            start_date=date(2024, 1, 1)
+        )
+        Workout.objects.create(
+            user=user, title='Run', status='completed', workout_date=date(2024, 1, 2)
+        )
+        recount(goal)
+        copy_rows = sharding._copy_rows
+
+        def copy_then_complete(*args, **kwargs):
+            copied = copy_rows(*args, **kwargs)
+            if 'since' not in kwargs:
+                Workout.objects.create(
+                    user=user, title='Run', status='completed', workout_date=date(2024, 1, 3)
+                )
+            return copied
+
+        with self._shared_cache(), \
+                patch.object(sharding, '_copy_rows', side_effect=copy_then_complete):
+            sharding.move_user(user.pk, 'default', grace=0)
+
+        self.assertEqual(GoalProgress.objects.using('default').get(goal=goal).value, 2)
+
+    def test_moves_need_a_shared_cache(self):
+        user = self.users[1]
+        with self.assertRaises(ImproperlyConfigured):
+            move_user(user.pk, 'default', grace=0)
+        self.assertEqual(shard_for(user.pk), 'shard_2')
+
+    def test_writes_are_refused_while_moving(self):
+        user = self.users[1]
+        set_placement(user.pk, 'shard_2', moving=True)
+        with self.assertRaises(ShardMoving):
+            Workout.objects.create(user=user, title='Run', workout_date=date(2024, 1, 1))
+
+    def test_paginator_merges_pages_from_every_shard(self):
+        for day in range(1, 6):
+            for user in self.users.values():
+                Workout.objects.create(user=user, title='Run', workout_date=date(2024, 1, day))
+
+        paginator = ShardedPaginator(Workout.objects.order_by('-workout_date', '-pk'), 4)
+        self.assertEqual(paginator.count, 10)
+        dates = [workout.workout_date.day for workout in paginator.page(2)]
+        self.assertEqual(dates, [3, 3, 2, 2])
@@ -0,0 +1,92 @@
+from array import array
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from .. import streams
+from ..models import Workout
+from ..streams import MISSING, downsample, zone_times
+from ..views import WorkoutViewSet
+
+
+class SampleStreamTests(SimpleTestCase):
+    def test_ranges_decode_only_overlapping_blocks(self):
+        samples = [index % 200 for index in range(3000)]
+        samples[1500] = None
+        data = streams.pack(samples)
+
+        self.assertEqual(streams.unpack(data).tolist()[:3], [0, 1, 2])
+        with mock.patch.object(streams, '_unpack_block', wraps=streams._unpack_block) as unpack_block:
+            values = streams.unpack(data, 1499, 1502)
+        self.assertEqual(values.tolist(), [99, streams.MISSING, 101])
+        self.assertEqual(unpack_block.call_count, 1)
+        self.assertEqual(streams.summarize(samples)['maximum'], 199)
+
+    def test_downsampling_keeps_peaks(self):
+        values = array('H', [100] * 1000)
+        values[400] = 180
+        values[10] = MISSING
+
+        for method in ('lttb', 'minmax'):
+            times, series = downsample(values, 1, 0, 20, method)
+            self.assertLessEqual(len(series), 20)
+            self.assertIn(180, series)
+            self.assertIn(400, times)
+            self.assertNotIn(10, times)
+        # 100 and 180 bpm against a maximum of 190
+        self.assertEqual(zone_times(values, 1, 190, [0.6, 0.7, 0.8, 0.9]), [998, 0, 0, 0, 1])
+
+
+class SampleStreamViewTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(
+            email='hr@example.com', password='x', date_of_birth=date(1990, 1, 1)
+        )
+        self.workout = Workout.objects.create(
+            user=self.user, title='Ride', workout_type='cycling', workout_date=date(2024, 1, 1)
+        )
+
+    def _streams(self, method='get', data=None, **params):
+        path = f'/api/workouts/{self.workout.pk}/streams/'
+        if method == 'put':
+            request = self.factory.put(path, data, format='json')
+        else:
+            request = self.factory.get(path, params)
+        force_authenticate(request, user=self.user)
+        view = WorkoutViewSet.as_view({'get': 'streams', 'put': 'streams'})
+        return view(request, pk=str(self.workout.pk))
+
+    def test_upload_then_read_downsampled_with_zones(self):
+        heart_rate = [120 + index % 40 for index in range(7200)]
+        power = [200] * 7200
+
+        response = self._streams('put', {'channels': {'heart_rate': heart_rate, 'power': power}})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['maximum'], 159)
+
+        response = self._streams(points=100, start=3600, ftp=250, max_heart_rate=200)
+
+        channels = response.data['channels']
+        self.assertEqual(len(channels['heart_rate']['value']), 100)
+        self.assertEqual(channels['heart_rate']['time'][0], 3600)
+        self.assertEqual(sum(channels['heart_rate']['zones']), 3600)
+        # 200 W is 80% of FTP, zone 3
+        self.assertEqual(channels['power']['zones'][2], 3600)
+
+        # Zones from the age-predicted maximum without a parameter
+        response = self._streams(channels='heart_rate')
+        self.assertEqual(list(response.data['channels']), ['heart_rate'])
+        self.assertIn('zones', response.data['channels']['heart_rate'])
+
+    def test_rejects_unknown_channels_and_values(self):
+        response = self._streams('put', {'channels': {'speed': [1, 2]}})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._streams('put', {'channels': {'power': [1, -5]}})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._streams(points=1).status_code, status.HTTP_400_BAD_REQUEST)
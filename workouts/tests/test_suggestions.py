@@ -0,0 +1,73 @@
+from datetime import date
+from unittest.mock import patch
+
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from .. import suggestions
+from ..models import Workout
+from ..views import WorkoutViewSet
+
+
+class TitleSuggestTests(TestCase):
+    def setUp(self):
+        suggestions._indexes.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='suggest@example.com', password='x')
+        self.other = User.objects.create_user(email='suggest-other@example.com', password='x')
+        for title in ['Morning Run', 'Morning Run', 'morning ride', 'Rowing', 'Morning Run']:
+            Workout.objects.create(
+                user=self.user, title=title, workout_type='running', workout_date=date(2024, 1, 1)
+            )
+        Workout.objects.create(
+            user=self.other, title='Morning Swim', workout_type='swimming',
+            workout_date=date(2024, 1, 1)
+        )
+
+    def _suggest(self, **params):
+        request = self.factory.get('/api/workouts/suggest/', params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': 'suggest'})(request)
+
+    def test_suggests_most_used_titles_ignoring_case(self):
+        response = self._suggest(prefix='MOR')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['suggestions'], [
+            {'title': 'Morning Run', 'count': 3},
+            {'title': 'morning ride', 'count': 1},
+        ])
+        self.assertEqual(len(self._suggest(limit=1).data['suggestions']), 1)
+        self.assertEqual(self._suggest(prefix='x').data['suggestions'], [])
+
+    def test_rejects_bad_limits(self):
+        for limit in ['0', '21', 'many']:
+            self.assertEqual(self._suggest(limit=limit).status_code, 400)
+
+    def test_index_follows_committed_writes_without_queries(self):
+        self._suggest(prefix='r')
+        workout = Workout.objects.for_user(self.user).get(title='Rowing')
+        with self.captureOnCommitCallbacks(execute=True):
+            workout.title = 'Recovery Row'
+            workout.save()
+            Workout.objects.create(
+                user=self.user, title='Morning Run', workout_type='running',
+                workout_date=date(2024, 1, 2)
+            )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(suggestions.suggest(self.user.pk, 'r'), [('Recovery Row', 1)])
+            self.assertEqual(suggestions.suggest(self.user.pk, 'morning r'), [
+                ('Morning Run', 4), ('morning ride', 1),
+            ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            workout.delete()
+        self.assertEqual(self._suggest(prefix='r').data['suggestions'], [])
+
+    def test_least_recently_used_users_are_evicted(self):
+        with patch.object(suggestions, 'MAX_USERS', 1):
+            suggestions.suggest(self.user.pk, 'm')
+            suggestions.suggest(self.other.pk, 'm')
+        self.assertEqual(list(suggestions._indexes), [self.other.pk])
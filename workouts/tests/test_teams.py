@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import Team, Workout
+from ..views import TeamViewSet
+
+
+class TeamTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.coach = User.objects.create_user(email='coach@example.com', password='x')
+        self.team = Team.objects.create(coach=self.coach, name='Harriers')
+        self.athletes = [
+            User.objects.create_user(
+                email=f'athlete{index}@example.com', password='x', first_name=name
+            )
+            for index, name in enumerate(['Ada', 'Bo', 'Cy'])
+        ]
+        for athlete in self.athletes:
+            response = self._call(athlete, 'post', 'join', {'join_code': self.team.join_code})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.outsider = User.objects.create_user(email='outsider@example.com', password='x')
+
+        today = date.today()
+        for user, workout_type, distance, workout_status, days_ago in [
+            (self.athletes[0], 'running', '10.00', 'completed', 1),
+            (self.athletes[0], 'cycling', '30.00', 'completed', 2),
+            (self.athletes[0], 'running', '8.00', 'planned', 0),
+            (self.athletes[1], 'running', '21.10', 'completed', 3),
+            (self.athletes[1], 'running', '50.00', 'completed', 60),
+            (self.outsider, 'running', '99.00', 'completed', 1),
+        ]:
+            Workout.objects.create(
+                user=user, title=workout_type, workout_type=workout_type, duration=60,
+                distance=Decimal(distance), status=workout_status,
+                workout_date=today - timedelta(days=days_ago)
+            )
+
+    def _call(self, user, method, action, data=None, **kwargs):
+        request = getattr(self.factory, method)('/api/teams/', data, format='json')
+        force_authenticate(request, user=user)
+        return TeamViewSet.as_view({method: action})(request, **kwargs)
+
+    def _summary(self, user=None, **params):
+        request = self.factory.get(f'/api/teams/{self.team.pk}/summary/', params)
+        force_authenticate(request, user=user or self.coach)
+        return TeamViewSet.as_view({'get': 'summary'})(request, pk=self.team.pk)
+
+    def test_summary_groups_every_athlete_in_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self._summary(ordering='-total_distance')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        workout_queries = [query for query in queries if 'FROM "workouts"' in query['sql']]
+        self.assertEqual(len(workout_queries), 1)
+        self.assertIn('GROUP BY', workout_queries[0]['sql'])
+
+        rows = response.data['results']
+        self.assertEqual([row['name'] for row in rows], ['Ada', 'Bo', 'Cy'])
+        self.assertEqual(rows[0]['total_distance'], '48.00')
+        self.assertEqual(rows[0]['total_workouts'], 3)
+        self.assertEqual(rows[0]['completed_workouts'], 2)
+        self.assertEqual(rows[0]['workout_types']['cycling']['total_distance'], '30.00')
+        # The 60 day old run is outside the default window
+        self.assertEqual(rows[1]['total_distance'], '21.10')
+        self.assertEqual(rows[2]['total_workouts'], 0)
+        self.assertEqual(response.data['count'], 3)
+
+    def test_summary_filters_sorts_and_pages(self):
+        response = self._summary(
+            ordering='total_distance', status='completed', page_size=2,
+            start_date=(date.today() - timedelta(days=90)).isoformat()
+        )
+        rows = response.data['results']
+        self.assertEqual([row['name'] for row in rows], ['Cy', 'Ada'])
+        self.assertEqual(rows[1]['total_workouts'], 2)
+        self.assertIsNotNone(response.data['next'])
+
+        second = self._summary(
+            ordering='total_distance', status='completed', page_size=2, page=2,
+            start_date=(date.today() - timedelta(days=90)).isoformat()
+        )
+        self.assertEqual(second.data['results'][0]['total_distance'], '71.10')
+
+        self.assertEqual(self._summary(ordering='-email').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._summary(status='done').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_the_coach_sees_the_summary_and_athletes_can_leave(self):
+        self.assertEqual(self._summary(user=self.athletes[0]).status_code, status.HTTP_404_NOT_FOUND)
+        response = self._call(self.coach, 'get', 'list')
+        self.assertEqual(response.data[0]['athlete_count'], 3)
+
+        response = self._call(self.athletes[2], 'post', 'leave', pk=self.team.pk)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._summary().data['count'], 2)
+        response = self._call(self.athletes[2], 'post', 'leave', pk=self.team.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        for user, code in [(self.coach, self.team.join_code), (self.outsider, 'nope')]:
+            response = self._call(user, 'post', 'join', {'join_code': code})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
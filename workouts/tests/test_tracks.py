@@ -0,0 +1,137 @@
+from datetime import date
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import Workout, WorkoutTrack
+from ..tracks import (
+    Track, TrackError, decode_points, encode_points, encode_polyline, parse,
+    simplify, summarize,
+)
+from ..views import WorkoutViewSet
+
+
+def _gpx(points):
+    """GPX document with (lat, lon, elevation, ISO time) points"""
+    rows = ''.join(
+        f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele><time>{time}</time></trkpt>'
+        for lat, lon, ele, time in points
+    )
+    return (
+        '<?xml version="1.0"?><gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+        f'<metadata><time>2024-01-01T00:00:00Z</time></metadata><trk><trkseg>{rows}</trkseg></trk></gpx>'
+    ).encode()
+
+
+class TrackTests(SimpleTestCase):
+    def test_gpx_track_figures(self):
+        track = parse(BytesIO(_gpx([
+            (50.0, 8.0, 100, '2024-01-01T08:00:00Z'),
+            (50.01, 8.0, 105, '2024-01-01T08:05:00Z'),
+            (50.02, 8.0, 104, '2024-01-01T08:10:00Z'),
+        ])))
+        summary = summarize(track)
+
+        self.assertEqual(track.source_format, 'gpx')
+        self.assertEqual(len(track), 3)
+        self.assertAlmostEqual(summary['distance'], 2223.9, places=1)
+        self.assertEqual(summary['elevation_gain'], 5.0)
+        self.assertEqual(summary['elapsed'], 600)
+        self.assertEqual(summary['splits'], [269.8, 269.8])
+
+    def test_tcx_points_without_position_are_skipped(self):
+        point = (
+            '<Trackpoint><Time>2024-01-01T08:00:0{}Z</Time>{}</Trackpoint>'
+        )
+        position = '<Position><LatitudeDegrees>50.0{}</LatitudeDegrees><LongitudeDegrees>8.0</LongitudeDegrees></Position>'
+        document = (
+            '<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">'
+            '<Activities><Activity><Lap><Track>'
+            + point.format(0, position.format(0)) + point.format(1, '') + point.format(2, position.format(1))
+            + '</Track></Lap></Activity></Activities></TrainingCenterDatabase>'
+        )
+        track = parse(BytesIO(document.encode()))
+
+        self.assertEqual(track.source_format, 'tcx')
+        self.assertEqual(list(track.lats), [50.0, 50.01])
+        self.assertFalse(track.has_elevation)
+
+    def test_entity_declarations_are_rejected(self):
+        document = b'<?xml version="1.0"?><!DOCTYPE gpx [<!ENTITY a "aaaa">]><gpx>&a;</gpx>'
+        with self.assertRaises(TrackError):
+            parse(BytesIO(document))
+
+    def test_encodings_and_simplification(self):
+        # Example from the polyline format documentation
+        self.assertEqual(
+            encode_polyline([(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]),
+            '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+        )
+
+        track = Track('gpx')
+        for index in range(50):
+            track.add(50 + index * 0.001, 8.0, 100.5, 1704096000 + index * 3)
+        track.add(50.05, 8.01, 99.0, 1704096200)
+        decoded = decode_points(encode_points(track))
+
+        self.assertEqual(list(decoded.lats), list(track.lats))
+        self.assertEqual(list(decoded.elevations), list(track.elevations))
+        self.assertEqual(list(decoded.times), list(track.times))
+        # Points along the straight stretch are dropped
+        self.assertEqual(simplify(track), [0, 49, 50])
+
+
+class TrackUploadTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='gps@example.com', password='x')
+
+    def _track(self, workout, method='get', **data):
+        request = getattr(self.factory, method)(
+            f'/api/workouts/{workout.pk}/track/', data, format='multipart'
+        )
+        force_authenticate(request, user=self.user)
+        view = WorkoutViewSet.as_view({'get': 'track', 'put': 'track', 'delete': 'track'})
+        return view(request, pk=str(workout.pk))
+
+    def test_upload_fills_distance_and_duration(self):
+        workout = Workout.objects.create(
+            user=self.user, title='Run', workout_type='running', workout_date=date(2024, 1, 1)
+        )
+        upload = SimpleUploadedFile('run.gpx', _gpx([
+            (50.0, 8.0, 100, '2024-01-01T08:00:00Z'),
+            (50.01, 8.0, 100, '2024-01-01T08:05:00Z'),
+            (50.02, 8.0, 100, '2024-01-01T08:10:00Z'),
+        ]))
+
+        response = self._track(workout, 'put', file=upload)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['point_count'], 3)
+        workout.refresh_from_db()
+        self.assertEqual(workout.distance, Decimal('2.22'))
+        self.assertEqual(workout.duration, 10)
+        self.assertEqual(self._track(workout).data['polyline'], response.data['polyline'])
+
+        self.assertEqual(self._track(workout, 'delete').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(WorkoutTrack.objects.exists())
+
+    def test_rejects_untracked_types_and_bad_files(self):
+        yoga = Workout.objects.create(
+            user=self.user, title='Yoga', workout_type='yoga', workout_date=date(2024, 1, 1)
+        )
+        ride = Workout.objects.create(
+            user=self.user, title='Ride', workout_type='cycling', workout_date=date(2024, 1, 1)
+        )
+
+        response = self._track(yoga, 'put', file=SimpleUploadedFile('a.gpx', _gpx([])))
+        self.assertIn('workout_type', response.data)
+        response = self._track(ride, 'put', file=SimpleUploadedFile('a.gpx', b'<gpx><trk>'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', response.data)
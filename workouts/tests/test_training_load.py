@@ -0,0 +1,90 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import Workout
+from ..training_load import compute
+from ..views import WorkoutViewSet
+
+
+class TrainingLoadComputeTests(SimpleTestCase):
+    def test_windows_over_daily_loads(self):
+        # 27 lead days of 100, then a week of alternating 300 and rest
+        loads = [100] * 27 + [300, 0, 300, 0, 300, 0, 300]
+        result = compute(loads, 7)
+
+        self.assertEqual(result['load'], [300, 0, 300, 0, 300, 0, 300])
+        self.assertEqual(result['acute'][-1], 1200)
+        # 21 days of 100 and the week above, per week
+        self.assertEqual(result['chronic'][-1], 825.0)
+        self.assertEqual(result['acwr'][-1], 1.45)
+        # Mean 171.43 over a standard deviation of 148.46
+        self.assertEqual(result['monotony'][-1], 1.15)
+        self.assertEqual(result['strain'][-1], 1380.0)
+
+    def test_ratios_are_empty_without_variation(self):
+        result = compute([0] * 28, 1)
+
+        self.assertEqual(result['acute'], [0])
+        self.assertIsNone(result['acwr'][0])
+        self.assertIsNone(result['monotony'][0])
+        self.assertIsNone(result['strain'][0])
+
+
+class TrainingLoadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='load@example.com', password='x')
+
+    def _training_load(self, **params):
+        request = self.factory.get('/api/workouts/training_load/', params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': 'training_load'})(request)
+
+    def test_completed_sessions_are_weighted_by_intensity(self):
+        Workout.objects.create(
+            user=self.user, title='Run', status='completed', duration=40,
+            intensity='high', workout_date=date(2024, 1, 10)
+        )
+        Workout.objects.create(
+            user=self.user, title='Walk', status='completed', duration=30,
+            intensity='low', workout_date=date(2024, 1, 10)
+        )
+        Workout.objects.create(
+            user=self.user, title='Plan', status='planned', duration=60,
+            workout_date=date(2024, 1, 10)
+        )
+
+        response = self._training_load(days=7, end='2024-01-12')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['start'], date(2024, 1, 6))
+        self.assertEqual(response.data['load'], [0, 0, 0, 0, 410, 0, 0])
+        self.assertEqual(response.data['acute'][-1], 410)
+        self.assertEqual(self._training_load(days=0).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._training_load(end='2024-02-30').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cache_is_invalidated_by_completed_workouts(self):
+        self._training_load(days=7, end='2024-01-12')
+        with self.assertNumQueries(0):
+            self._training_load(days=7, end='2024-01-12')
+
+        workout = Workout.objects.create(
+            user=self.user, title='Ride', status='in_progress', duration=60,
+            workout_date=date(2024, 1, 12)
+        )
+        with self.assertNumQueries(0):
+            self._training_load(days=7, end='2024-01-12')
+
+        workout.status = 'completed'
+        workout.save()
+        self.assertEqual(self._training_load(days=7, end='2024-01-12').data['load'][-1], 300)
+
+        workout.delete()
+        self.assertEqual(self._training_load(days=7, end='2024-01-12').data['load'][-1], 0)
@@ -1,63 +1,14 @@
-from django.test import SimpleTestCase
-from unittest.mock import patch, MagicMock, PropertyMock
-from rest_framework.test import APIRequestFactory, force_authenticate
-from rest_framework import status
 from datetime import date, datetime
-from .views import WorkoutViewSet
-
-
-class MinimalUser:
-    """Minimal in-memory user for testing"""
-
-    def __init__(self):
-        self.id = 1
-        self.pk = 1
-        self.email = "test@example.com"
-        self.username = "testuser"
-
-    @property
-    def is_authenticated(self):
-        return True
-
-
-class MinimalWorkout:
-    """Minimal in-memory workout object"""
-
-    def __init__(self, **kwargs):
-        self.id = kwargs.get('id', 1)
-        self.pk = self.id
-        self.user_id = kwargs.get('user_id', 1)
-        self.workout_type = kwargs.get('workout_type', 'running')
-        self.title = kwargs.get('title', 'Morning Run')
-        self.description = kwargs.get('description', 'Easy run')
-        self.duration = kwargs.get('duration', 30)
-        self.calories_burned = kwargs.get('calories_burned', 250.0)
-        self.distance = kwargs.get('distance', 5.0)
-        self.intensity = kwargs.get('intensity', 'medium')
-        self.status = kwargs.get('status', 'planned')
-        self.notes = kwargs.get('notes', '')
-        self.workout_date = kwargs.get('workout_date', date.today())
-        self.started_at = kwargs.get('started_at', None)
-        self.completed_at = kwargs.get('completed_at', None)
-        self.created_at = kwargs.get('created_at', datetime.now())
-        self.updated_at = kwargs.get('updated_at', datetime.now())
-
-        # Mock user relationship
-        self.user = MinimalUser()
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
 
-    @property
-    def duration_display(self):
-        if self.duration:
-            hours = self.duration // 60
-            minutes = self.duration % 60
-            if hours > 0:
-                return f"{hours}h {minutes}m"
-            return f"{minutes}m"
-        return "N/A"
+from django.test import SimpleTestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
 
-    def save(self):
-        """Mock save method"""
-        pass
+from ..models import Workout
+from ..views import WorkoutViewSet
+from .helpers import MinimalUser, MinimalWorkout
 
 
 class WorkoutViewSetNoDBTests(SimpleTestCase):
@@ -66,19 +17,24 @@ class WorkoutViewSetNoDBTests(SimpleTestCase):
         self.user = MinimalUser()
         self.viewset = WorkoutViewSet
 
+    @patch('workouts.views.expand_occurrences', return_value=[])
     @patch('workouts.views.Workout.objects')
-    def test_list_workouts_without_db(self, mock_workout_objects):
+    def test_list_workouts_without_db(self, mock_workout_objects, mock_expand):
         """Test listing workouts without DB"""
         # Mock queryset
         mock_workout1 = MinimalWorkout(id=1, title='Morning Run')
         mock_workout2 = MinimalWorkout(id=2, title='Evening Cycle')
 
         mock_queryset = MagicMock()
+        mock_queryset.model = Workout
+        mock_queryset.all.return_value = mock_queryset
         mock_queryset.filter.return_value = mock_queryset
+        mock_queryset.select_related.return_value = mock_queryset
         mock_queryset.__iter__.return_value = [mock_workout1, mock_workout2]
         mock_queryset.count.return_value = 2
 
         mock_workout_objects.filter.return_value = mock_queryset
+        mock_workout_objects.for_user.return_value = mock_queryset
 
         request = self.factory.get('/api/workouts/')
         force_authenticate(request, user=self.user)
@@ -166,7 +122,10 @@ class WorkoutViewSetNoDBTests(SimpleTestCase):
         self.assertIn('request', call_kwargs['context'])
         self.assertEqual(call_kwargs['context']['request'].user, self.user)
         mock_create_serializer.is_valid.assert_called_once_with(raise_exception=True)
-        mock_create_serializer.save.assert_called_once_with(user=self.user)
+        # Calories were left empty, so they are estimated (70 kg default)
+        mock_create_serializer.save.assert_called_once_with(
+            user=self.user, calories_burned=Decimal('360.15')
+        )
 
     @patch('workouts.views.WorkoutViewSet.get_object')
     def test_start_workout_without_db(self, mock_get_object):
@@ -203,8 +162,3 @@ class WorkoutViewSetNoDBTests(SimpleTestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(mock_workout.status, 'completed')
         self.assertEqual(mock_workout.duration, 45)
-
-
-from django.test import TestCase
-
-# Create your tests here.
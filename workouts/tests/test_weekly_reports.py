@@ -0,0 +1,81 @@
+import json
+from datetime import date
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from authentication.models import User
+
+from ..models import WeeklyReport, Workout
+from ..views import WorkoutViewSet
+
+
+class WeeklyReportTests(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.user = User.objects.create_user(email='weekly@example.com', password='x')
+        idle = User.objects.create_user(email='idle@example.com', password='x')
+        Workout.objects.create(
+            user=idle, title='Old', workout_date=date(2023, 6, 1), status='completed'
+        )
+        # Week of Monday 2024-01-08 and the week before
+        for day, workout_type, duration, workout_status in [
+            (3, 'running', 30, 'completed'),
+            (8, 'running', 45, 'completed'),
+            (10, 'cycling', 90, 'completed'),
+            (12, 'swimming', 60, 'planned'),
+        ]:
+            Workout.objects.create(
+                user=self.user, title=f'{workout_type} {day}', workout_type=workout_type,
+                duration=duration, status=workout_status, workout_date=date(2024, 1, day)
+            )
+
+    def _get(self, **params):
+        request = self.factory.get('/api/workouts/weekly_report/', params)
+        force_authenticate(request, user=self.user)
+        return WorkoutViewSet.as_view({'get': 'weekly_report'})(request)
+
+    def test_command_stores_reports_served_by_primary_key(self):
+        out = StringIO()
+        call_command(
+            'build_weekly_reports', week='2024-01-10', processes=1, chunk_size=1, stdout=out
+        )
+        self.assertIn('Wrote 1 reports for the week of 2024-01-08', out.getvalue())
+        stored = WeeklyReport.objects.get(pk=(self.user.pk, date(2024, 1, 8)))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get(week='2024-01-14')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.content.decode(), stored.data)
+
+        report = json.loads(stored.data)
+        self.assertEqual(report['totals'], {
+            'workouts': 3, 'completed': 2, 'duration': 135, 'distance': 0.0, 'calories': 0.0,
+        })
+        self.assertEqual(report['change']['duration'], 105)
+        self.assertEqual(report['types']['swimming'], {'workouts': 1, 'duration': 0})
+        self.assertEqual(report['best_workout']['title'], 'cycling 10')
+
+    def test_changes_to_a_reported_week_drop_its_reports(self):
+        self.assertEqual(json.loads(self._get(week='2024-01-08').content)['totals']['completed'], 2)
+        self.assertEqual(json.loads(self._get(week='2024-01-15').content)['previous']['completed'], 2)
+        self.assertEqual(WeeklyReport.objects.count(), 2)
+
+        swim = Workout.objects.get(title='swimming 12')
+        swim.status = 'completed'
+        swim.save()
+        self.assertEqual(WeeklyReport.objects.count(), 0)
+        self.assertEqual(json.loads(self._get(week='2024-01-08').content)['totals']['completed'], 3)
+
+    def test_unfinished_and_invalid_weeks_are_rejected(self):
+        today = timezone.now().date().isoformat()
+        self.assertEqual(self._get(week=today).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get(week='last-week').status_code, status.HTTP_400_BAD_REQUEST)
+        with self.assertRaises(CommandError):
+            call_command('build_weekly_reports', week=today, processes=1)
@@ -0,0 +1,407 @@
+"""
+GPS tracks from GPX and TCX files.
+
+Files are parsed as a stream of XML events, so documents are never held
+in memory whole; only the point columns are kept. Distance, ascent and
+kilometer splits are computed from the full track, which is stored as
+compressed binary deltas, while maps draw a Douglas-Peucker simplified
+copy stored as an encoded polyline.
+"""
+import math
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from xml.parsers import expat
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import WorkoutTrack
+from .sharding import shard_for
+
+# Workout types a track can be attached to
+TRACK_TYPES = ['running', 'cycling', 'walking']
+
+MAX_BYTES = getattr(settings, 'WORKOUT_TRACK_MAX_BYTES', 20 * 1024 * 1024)
+MAX_POINTS = getattr(settings, 'WORKOUT_TRACK_MAX_POINTS', 200000)
+
+# Meters the simplified track may stray from the full one
+SIMPLIFY_TOLERANCE = getattr(settings, 'WORKOUT_TRACK_SIMPLIFY_TOLERANCE', 5.0)
+
+# Points simplified at a time
+SIMPLIFY_WINDOW = 1000
+
+# Meters of climb or descent ignored as GPS noise
+ELEVATION_THRESHOLD = 3.0
+
+# Mean earth radius in meters
+EARTH_RADIUS = 6371008.8
+
+SPLIT_METERS = 1000
+
+# Largest value Workout.distance can hold
+MAX_DISTANCE_KM = 9999.99
+
+CHUNK_SIZE = 64 * 1024
+
+# Binary layout: version, flags, point count and first timestamp, then
+# one column of int32 deltas each for latitude and longitude in
+# microdegrees, elevation in decimeters and time in seconds
+HEADER = struct.Struct('<BBIq')
+FORMAT_VERSION = 1
+HAS_ELEVATION = 1
+HAS_TIME = 2
+
+
+class TrackError(ValueError):
+    """The file is not a usable track"""
+
+
+class Track:
+    """Parsed track points as parallel columns"""
+
+    def __init__(self, source_format):
+        self.source_format = source_format
+        self.lats = array('d')
+        self.lons = array('d')
+        self.elevations = array('d')
+        self.times = array('d')
+        self.has_elevation = False
+        self.has_time = False
+
+    def __len__(self):
+        return len(self.lats)
+
+    def add(self, lat, lon, elevation=None, time=None):
+        if len(self) >= MAX_POINTS:
+            raise TrackError(f"Tracks may have at most {MAX_POINTS} points")
+        self.lats.append(lat)
+        self.lons.append(lon)
+        self.elevations.append(math.nan if elevation is None else elevation)
+        self.times.append(math.nan if time is None else time)
+        self.has_elevation |= elevation is not None
+        self.has_time |= time is not None
+
+    def finish(self):
+        """Fill points missing an elevation or time from their neighbours"""
+        for column, present in ((self.elevations, self.has_elevation), (self.times, self.has_time)):
+            if not present:
+                continue
+            first = next(value for value in column if not math.isnan(value))
+            previous = first
+            for index, value in enumerate(column):
+                if math.isnan(value):
+                    column[index] = previous
+                else:
+                    previous = value
+
+
+class _TrackParser:
+    """expat handlers collecting the points of a GPX or TCX document"""
+
+    ROOTS = {'gpx': 'gpx', 'TrainingCenterDatabase': 'tcx'}
+    POINTS = {'gpx': 'trkpt', 'tcx': 'Trackpoint'}
+    # Point values held in child elements, by local name
+    FIELDS = {
+        'gpx': {'ele': 'elevation', 'time': 'time'},
+        'tcx': {
+            'LatitudeDegrees': 'lat', 'LongitudeDegrees': 'lon',
+            'AltitudeMeters': 'elevation', 'Time': 'time',
+        },
+    }
+
+    def __init__(self):
+        self.track = None
+        self.point = None
+        self.field = None
+        self.text = []
+
+    def start(self, name, attributes):
+        local = name.rpartition(' ')[2]
+        if self.track is None:
+            if local not in self.ROOTS:
+                raise TrackError("Not a GPX or TCX file")
+            self.track = Track(self.ROOTS[local])
+            return
+        source_format = self.track.source_format
+        if local == self.POINTS[source_format]:
+            self.point = {key: attributes[key] for key in ('lat', 'lon') if key in attributes}
+        elif self.point is not None and local in self.FIELDS[source_format]:
+            self.field = self.FIELDS[source_format][local]
+            self.text = []
+
+    def end(self, name):
+        local = name.rpartition(' ')[2]
+        if self.field is not None:
+            self.point[self.field] = ''.join(self.text).strip()
+            self.field = None
+        elif self.point is not None and local == self.POINTS[self.track.source_format]:
+            self._add(self.point)
+            self.point = None
+
+    def characters(self, data):
+        if self.field is not None:
+            self.text.append(data)
+
+    def _add(self, point):
+        # Indoor sessions record points without a position
+        if not point.get('lat') or not point.get('lon'):
+            return
+        try:
+            lat, lon = float(point['lat']), float(point['lon'])
+            elevation = float(point['elevation']) if point.get('elevation') else None
+        except ValueError:
+            raise TrackError("Track point with a non-numeric value")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise TrackError("Track point outside valid coordinates")
+        self.track.add(lat, lon, elevation, _timestamp(point.get('time')))
+
+
+def _timestamp(value):
+    try:
+        moment = parse_datetime(value) if value else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=dt_timezone.utc)
+    return moment.timestamp()
+
+
+def _reject_doctype(*args):
+    # Entity expansion is how XML bombs work; track files never need it
+    raise TrackError("Document type declarations are not allowed")
+
+
+def parse(fileobj):
+    """Parse a GPX or TCX file object in chunks; return a Track"""
+    handler = _TrackParser()
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_NEVER)
+    parser.StartDoctypeDeclHandler = _reject_doctype
+    parser.StartElementHandler = handler.start
+    parser.EndElementHandler = handler.end
+    parser.CharacterDataHandler = handler.characters
+    parser.buffer_text = True
+    try:
+        while True:
+            chunk = fileobj.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            parser.Parse(chunk, False)
+        parser.Parse(b'', True)
+    except expat.ExpatError as error:
+        raise TrackError(f"Invalid XML: {expat.ErrorString(error.code)}") from error
+
+    track = handler.track
+    if track is None or len(track) < 2:
+        raise TrackError("The file has fewer than two track points")
+    track.finish()
+    return track
+
+
+def cumulative_distances(track):
+    """Meters from the start to each point, by the haversine formula"""
+    lats = np.radians(np.frombuffer(track.lats, dtype=float))
+    lons = np.radians(np.frombuffer(track.lons, dtype=float))
+    a = (
+        np.sin(np.diff(lats) / 2) ** 2
+        + np.cos(lats[:-1]) * np.cos(lats[1:]) * np.sin(np.diff(lons) / 2) ** 2
+    )
+    segments = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return np.concatenate(([0.0], np.cumsum(segments)))
+
+
+def elevation_gain(elevations):
+    """Total ascent, ignoring changes smaller than ELEVATION_THRESHOLD"""
+    gain = 0.0
+    reference = elevations[0]
+    for elevation in elevations:
+        if elevation - reference >= ELEVATION_THRESHOLD:
+            gain += elevation - reference
+            reference = elevation
+        elif reference - elevation >= ELEVATION_THRESHOLD:
+            reference = elevation
+    return gain
+
+
+def split_times(distances, times):
+    """Seconds taken for each full SPLIT_METERS, interpolated between points"""
+    marks = np.arange(1, int(distances[-1] // SPLIT_METERS) + 1) * float(SPLIT_METERS)
+    if not len(marks):
+        return []
+    times = np.frombuffer(times, dtype=float)
+    after = np.searchsorted(distances, marks, side='left')
+    before = after - 1
+    span = distances[after] - distances[before]
+    fraction = np.where(span > 0, (marks - distances[before]) / np.where(span > 0, span, 1), 1.0)
+    reached = times[before] + fraction * (times[after] - times[before])
+    return np.round(np.diff(reached, prepend=times[0]), 1).tolist()
+
+
+def summarize(track):
+    """Figures computed from the full track, named as WorkoutTrack fields"""
+    distances = cumulative_distances(track)
+    summary = {
+        'distance': round(float(distances[-1]), 1),
+        'elevation_gain': None,
+        'elapsed': None,
+        'started_at': None,
+        'splits': [],
+    }
+    if track.has_elevation:
+        summary['elevation_gain'] = round(elevation_gain(track.elevations), 1)
+    if track.has_time:
+        summary['elapsed'] = max(int(round(track.times[-1] - track.times[0])), 0)
+        summary['started_at'] = datetime.fromtimestamp(track.times[0], tz=dt_timezone.utc)
+        summary['splits'] = split_times(distances, track.times)
+    return summary
+
+
+def _projected(track):
+    """Points in meters on a plane tangent to the middle of the track"""
+    scale = math.cos(math.radians((min(track.lats) + max(track.lats)) / 2))
+    xs = np.radians(np.frombuffer(track.lons, dtype=float)) * EARTH_RADIUS * scale
+    ys = np.radians(np.frombuffer(track.lats, dtype=float)) * EARTH_RADIUS
+    return xs, ys
+
+
+def _farthest(xs, ys, first, last):
+    """Index and distance of the point farthest from the segment first-last"""
+    ax, ay = xs[first], ys[first]
+    dx, dy = xs[last] - ax, ys[last] - ay
+    length = dx * dx + dy * dy
+    px, py = xs[first + 1:last] - ax, ys[first + 1:last] - ay
+    t = np.clip((px * dx + py * dy) / length, 0, 1) if length else 0
+    distances = np.hypot(px - t * dx, py - t * dy)
+    index = int(np.argmax(distances))
+    return first + 1 + index, float(distances[index])
+
+
+def simplify(track, tolerance=SIMPLIFY_TOLERANCE):
+    """Indexes of the points kept by Douglas-Peucker simplification"""
+    xs, ys = _projected(track)
+    final = len(track) - 1
+    keep = bytearray(len(track))
+    # Simplifying fixed windows bounds the work on tracks where every
+    # split only peels off a point next to the ends, such as laps of a
+    # track; the window ends are kept as well
+    stack = [
+        (first, min(first + SIMPLIFY_WINDOW, final))
+        for first in range(0, final, SIMPLIFY_WINDOW)
+    ]
+    for first, end in stack:
+        keep[first] = keep[end] = 1
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        index, distance = _farthest(xs, ys, first, last)
+        if distance > tolerance:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return [index for index, kept in enumerate(keep) if kept]
+
+
+def encode_polyline(coordinates):
+    """Encode (lat, lon) pairs in the Google polyline format"""
+    characters = []
+    previous_lat = previous_lon = 0
+    for lat, lon in coordinates:
+        lat, lon = int(round(lat * 1e5)), int(round(lon * 1e5))
+        for value in (lat - previous_lat, lon - previous_lon):
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                characters.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            characters.append(chr(value + 63))
+        previous_lat, previous_lon = lat, lon
+    return ''.join(characters)
+
+
+def _deltas(column, scale, start=0):
+    """Scale a column to integers and difference it, starting from start"""
+    values = np.round(np.frombuffer(column, dtype=float) * scale).astype(np.int64)
+    return np.diff(values, prepend=start).astype('<i4').tobytes()
+
+
+def encode_points(track):
+    """Pack the full track into compressed binary"""
+    flags = (HAS_ELEVATION if track.has_elevation else 0) | (HAS_TIME if track.has_time else 0)
+    start = int(round(track.times[0])) if track.has_time else 0
+    columns = [_deltas(track.lats, 1e6), _deltas(track.lons, 1e6)]
+    if track.has_elevation:
+        columns.append(_deltas(track.elevations, 10))
+    if track.has_time:
+        columns.append(_deltas(track.times, 1, start))
+    header = HEADER.pack(FORMAT_VERSION, flags, len(track), start)
+    return zlib.compress(header + b''.join(columns), 9)
+
+
+def decode_points(data, source_format=''):
+    """Unpack binary from encode_points into a Track"""
+    data = zlib.decompress(bytes(data))
+    version, flags, count, start = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise TrackError(f"Unknown track format version {version}")
+    deltas = array('i', data[HEADER.size:])
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+
+    def column(position, scale, first=0):
+        values = array('d')
+        total = first
+        for delta in deltas[position * count:(position + 1) * count]:
+            total += delta
+            values.append(total / scale)
+        return values
+
+    track = Track(source_format)
+    track.lats, track.lons = column(0, 1e6), column(1, 1e6)
+    position = 2
+    if flags & HAS_ELEVATION:
+        track.elevations, track.has_elevation = column(position, 10), True
+        position += 1
+    else:
+        track.elevations = array('d', [0.0]) * count
+    if flags & HAS_TIME:
+        track.times, track.has_time = column(position, 1, start), True
+    else:
+        track.times = array('d', [0.0]) * count
+    return track
+
+
+def fill_workout(workout, summary):
+    """Set the workout's distance, and duration if timed, from a summary"""
+    kilometers = min(round(summary['distance'] / 1000, 2), MAX_DISTANCE_KM)
+    workout.distance = Decimal(str(kilometers)).quantize(Decimal('0.01'))
+    if summary['elapsed']:
+        workout.duration = max(int(round(summary['elapsed'] / 60)), 1)
+
+
+def attach(workout, fileobj):
+    """Parse a track file and store it on the workout, replacing any track"""
+    track = parse(fileobj)
+    summary = summarize(track)
+    record = WorkoutTrack(
+        workout=workout,
+        source_format=track.source_format,
+        point_count=len(track),
+        points=encode_points(track),
+        polyline=encode_polyline(
+            (track.lats[index], track.lons[index]) for index in simplify(track)
+        ),
+        **summary
+    )
+    with transaction.atomic(using=shard_for(workout.user_id)):
+        record.save()
+        fill_workout(workout, summary)
+        workout.save()
+    return record
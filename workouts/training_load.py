@@ -0,0 +1,130 @@
+"""
+Training load from completed workouts.
+
+A session's load is its duration in minutes times a perceived exertion
+(RPE) for its intensity. From the daily totals come the 7-day acute
+load, the chronic load (28-day total per week), their ratio, and Foster's
+monotony (weekly mean over standard deviation) and strain (weekly load
+times monotony).
+"""
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from .models import Workout
+
+CACHE_TIMEOUT = 60 * 60
+
+# Perceived exertion (0-10 scale) of each intensity
+INTENSITY_RPE = {'low': 3, 'medium': 5, 'high': 8}
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+MAX_DAYS = 365
+
+SERIES = ['load', 'acute', 'chronic', 'acwr', 'monotony', 'strain']
+
+
+def _version_key(user_id):
+    return f"training-load-version:{user_id}"
+
+
+def cache_key(user_id, end, days):
+    # Writes bump the user's version, orphaning every cached window
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Start from the clock so a lost counter never reuses an old value
+        cache.add(_version_key(user_id), time.time_ns(), None)
+        version = cache.get(_version_key(user_id))
+    return f"training-load:{user_id}:{version}:{end.isoformat()}:{days}"
+
+
+def invalidate(user_id):
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # Nothing was cached under a version yet
+        pass
+
+
+def daily_loads(user_id, start, end):
+    """Return the load of each day in [start, end] from one GROUP BY"""
+    loads = [0] * ((end - start).days + 1)
+    rpe = Case(
+        *(When(intensity=intensity, then=Value(value)) for intensity, value in INTENSITY_RPE.items()),
+        default=Value(INTENSITY_RPE['medium']),
+        output_field=IntegerField()
+    )
+    rows = Workout.objects.for_user(user_id).filter(
+        status='completed',
+        is_template=False,
+        duration__isnull=False,
+        workout_date__gte=start,
+        workout_date__lte=end
+    ).values('workout_date').annotate(
+        load=Sum(F('duration') * rpe, output_field=IntegerField())
+    ).order_by().values_list('workout_date', 'load')
+    for day, load in rows:
+        loads[(day - start).days] = load or 0
+    return loads
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 2) if denominator else None
+
+
+def compute(loads, days):
+    """
+    Compute every window for the last ``days`` entries of ``loads``.
+
+    ``loads`` starts CHRONIC_DAYS - 1 days early so the first reported day
+    has full windows. Rolling sums come from vectorized prefix sums.
+    """
+    lead = len(loads) - days
+    values = np.asarray(loads, dtype=np.int64)
+    sums = np.concatenate(([0], np.cumsum(values)))
+    squares = np.concatenate(([0], np.cumsum(values * values)))
+    index = np.arange(lead + 1, len(loads) + 1)
+    acute = sums[index] - sums[np.maximum(index - ACUTE_DAYS, 0)]
+    chronic = sums[index] - sums[np.maximum(index - CHRONIC_DAYS, 0)]
+    acute_squares = squares[index] - squares[np.maximum(index - ACUTE_DAYS, 0)]
+    columns = zip(values[lead:].tolist(), acute.tolist(), chronic.tolist(), acute_squares.tolist())
+
+    result = {name: [] for name in SERIES}
+    for load, acute, chronic, acute_squares in columns:
+        weekly_chronic = chronic * ACUTE_DAYS / CHRONIC_DAYS
+        mean = acute / ACUTE_DAYS
+        deviation = math.sqrt(max(acute_squares / ACUTE_DAYS - mean * mean, 0))
+        monotony = _ratio(mean, deviation)
+        result['load'].append(load)
+        result['acute'].append(acute)
+        result['chronic'].append(round(weekly_chronic, 2))
+        result['acwr'].append(_ratio(acute, weekly_chronic))
+        result['monotony'].append(monotony)
+        result['strain'].append(None if monotony is None else round(acute * monotony, 2))
+    return result
+
+
+def build(user_id, end, days):
+    start = end - timedelta(days=days - 1)
+    loads = daily_loads(user_id, start - timedelta(days=CHRONIC_DAYS - 1), end)
+    return dict(compute(loads, days), start=start, end=end)
+
+
+def load(user_id, end, days):
+    """Return the cached training load for ``days`` days ending at ``end``"""
+    key = cache_key(user_id, end, days)
+    result = cache.get(key)
+    if result is None:
+        result = build(user_id, end, days)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def affects_load(values):
+    return bool(values) and values.get('status') == 'completed' and not values.get('is_template')
@@ -1,10 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import WorkoutViewSet
+from .live import live_events
+from .views import (
+    GoalViewSet, LeaderboardViewSet, TeamViewSet, WorkoutViewSet, WorkoutRecurrenceViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'workouts', WorkoutViewSet, basename='workout')
+router.register(r'recurrences', WorkoutRecurrenceViewSet, basename='recurrence')
+router.register(r'leaderboards', LeaderboardViewSet, basename='leaderboard')
+router.register(r'goals', GoalViewSet, basename='goal')
+router.register(r'teams', TeamViewSet, basename='team')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('live/', live_events, name='live-events'),
 ]
@@ -1,54 +1,196 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.contrib.auth import get_user_model
 from django.db.models import Sum, Count, Q
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django_filters import utils as filter_utils
+from django_filters.rest_framework import DjangoFilterBackend
 from datetime import timedelta
-from .models import Workout
+from .filters import WorkoutFilter
+from .models import (
+    Goal, Team, TeamMembership, Workout, WorkoutRecurrence, WorkoutStream, WorkoutTrack,
+    LeaderboardScore,
+)
+from . import calories as calorie_estimates, heatmap as activity_heatmap, leaderboards, tracks, training_load
+from . import goals as goal_progress, streams as sample_streams, teams, weekly_reports
+from . import sharding, suggestions as title_suggestions
+from .idempotency import idempotent
+from .tasks import rebuild_user_leaderboards
+from .recurrence import (
+    expand as expand_occurrences,
+    default_window,
+    materialize,
+    occurs_on,
+    build_occurrence,
+    parse_virtual_id,
+)
+from FitnessTrackerApp_backend.throttling import (
+    PreAuthenticationThrottleMixin,
+    UserTokenBucketThrottle
+)
 from .serializers import (
+    GoalSerializer,
+    GoalProgressSerializer,
     WorkoutSerializer,
     WorkoutCreateSerializer,
     WorkoutUpdateSerializer,
-    WorkoutSummarySerializer
+    WorkoutSummarySerializer,
+    WorkoutRecurrenceSerializer,
+    WorkoutStreamSerializer,
+    WorkoutStreamUploadSerializer,
+    WorkoutTrackSerializer,
+    LeaderboardEntrySerializer,
+    TeamAthleteSummarySerializer,
+    TeamSerializer,
 )
 
 
-class WorkoutViewSet(viewsets.ModelViewSet):
+class WorkoutViewSet(PreAuthenticationThrottleMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing workouts.
     Provides CRUD operations and additional actions for workout tracking.
     """
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_class = WorkoutFilter
     search_fields = ['title', 'description', 'notes']
     ordering_fields = ['workout_date', 'created_at', 'duration', 'calories_burned']
     ordering = ['-workout_date', '-created_at']
 
-    def get_queryset(self):
-        """Return workouts for the authenticated user only"""
-        queryset = Workout.objects.filter(user=self.request.user)
+    # Aggregating actions rate limited per IP, per user and overall
+    throttled_actions = ['summary', 'dashboard']
 
-        # Filter by date range
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
+    # Actions that may address a recurrence template directly
+    template_actions = ['retrieve', 'update', 'partial_update', 'destroy']
 
-        if start_date:
-            queryset = queryset.filter(workout_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(workout_date__lte=end_date)
+    # Actions that turn a virtual occurrence into a real row
+    materializing_actions = [
+        'update', 'partial_update', 'start', 'complete', 'skip'
+    ]
 
-        # Filter by workout type
-        workout_type = self.request.query_params.get('workout_type')
-        if workout_type:
-            queryset = queryset.filter(workout_type=workout_type)
+    def get_queryset(self):
+        """Return workouts for the authenticated user only"""
+        # The serializer shows the owner's email
+        queryset = Workout.objects.for_user(self.request.user).select_related('user')
+        if self.action not in self.template_actions:
+            queryset = queryset.filter(is_template=False)
+        return queryset
 
-        # Filter by status
-        workout_status = self.request.query_params.get('status')
-        if workout_status:
-            queryset = queryset.filter(status=workout_status)
+    @property
+    def throttle_scope(self):
+        return self.action
+
+    def get_pre_auth_throttles(self):
+        if self.action not in self.throttled_actions:
+            return []
+        return super().get_pre_auth_throttles()
+
+    def get_throttles(self):
+        if self.action not in self.throttled_actions:
+            return super().get_throttles()
+        return super().get_throttles() + [UserTokenBucketThrottle()]
+
+    def get_object(self):
+        """Resolve virtual recurrence occurrences as well as real rows"""
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        virtual = parse_virtual_id(lookup)
+        if virtual is None:
+            return super().get_object()
+
+        rule_id, day = virtual
+        rule = get_object_or_404(
+            WorkoutRecurrence.objects.for_user(self.request.user).select_related(
+                'template', 'template__user'
+            ),
+            pk=rule_id
+        )
+        if not occurs_on(rule, day):
+            raise Http404
+
+        existing = Workout.objects.for_user(self.request.user).filter(
+            recurrence=rule, workout_date=day
+        ).first()
+        if existing is not None:
+            return existing
+        if self.action in self.materializing_actions:
+            return materialize(rule, day)
+        if self.action == 'retrieve':
+            return build_occurrence(rule, day)
+        raise Http404
+
+    def _date_param(self, name):
+        """Parse an optional date query parameter, ignoring bad values"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return parse_date(value)
+        except ValueError:
+            return None
+
+    def _with_occurrences(self, workouts, start, end):
+        """Merge virtual recurrence occurrences in [start, end] into workouts"""
+        workout_filter = WorkoutFilter(self.request.query_params, request=self.request)
+        if not workout_filter.is_valid():
+            # filter_queryset has rejected the parameters already
+            return workouts
+        occurrences = [
+            occurrence for occurrence in expand_occurrences(
+                self.request.user, start, end,
+                workout_type=workout_filter.form.cleaned_data['workout_type'],
+                workout_status=workout_filter.form.cleaned_data['status']
+            )
+            if workout_filter.matches(occurrence)
+        ]
+        if not occurrences:
+            return workouts
+
+        search = self.request.query_params.get('search')
+        if search:
+            term = search.lower()
+            occurrences = [
+                occurrence for occurrence in occurrences
+                if any(
+                    term in (getattr(occurrence, field) or '').lower()
+                    for field in self.search_fields
+                )
+            ]
+
+        merged = list(workouts) + occurrences
+        if self.request.query_params.get('ordering'):
+            # Occurrences have no created_at and sort as NULLs would
+            ordering = filters.OrderingFilter().get_ordering(self.request, workouts, self)
+            return sharding.merge_ordered(merged, ordering)
+        # Stable sort keeps the created_at order of real rows per day
+        merged.sort(key=lambda workout: workout.workout_date, reverse=True)
+        return merged
+
+    def list(self, request, *args, **kwargs):
+        """List workouts, including recurrence occurrences in the window"""
+        queryset = self.filter_queryset(self.get_queryset())
+        start, end = default_window(
+            self._date_param('start_date'),
+            self._date_param('end_date'),
+            timezone.now().date()
+        )
+        # Occurrences are merged before paging; without any the queryset
+        # is still paged by the database
+        workouts = self._with_occurrences(queryset, start, end)
 
-        return queryset
+        page = self.paginate_queryset(workouts)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(workouts, many=True)
+        return Response(serializer.data)
 
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -60,8 +202,19 @@ class WorkoutViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Associate workout with the authenticated user"""
-        serializer.save(user=self.request.user)
+        data = serializer.validated_data
+        extra = {}
+        if data.get('calories_burned') is None and data.get('duration'):
+            # Estimate from the MET tables when calories were left empty
+            extra['calories_burned'] = calorie_estimates.estimate(
+                data.get('workout_type', 'other'),
+                data.get('intensity', 'medium'),
+                data['duration'],
+                self.request.user.weight
+            )
+        serializer.save(user=self.request.user, **extra)
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Create a new workout"""
         serializer = self.get_serializer(data=request.data)
@@ -89,7 +242,8 @@ class WorkoutViewSet(viewsets.ModelViewSet):
     def today(self, request):
         """Get today's workouts"""
         today = timezone.now().date()
-        workouts = self.get_queryset().filter(workout_date=today)
+        workouts = self.filter_queryset(self.get_queryset()).filter(workout_date=today)
+        workouts = self._with_occurrences(workouts, today, today)
         serializer = self.get_serializer(workouts, many=True)
         return Response(serializer.data)
 
@@ -98,58 +252,254 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         """Get this week's workouts"""
         today = timezone.now().date()
         start_of_week = today - timedelta(days=today.weekday())
-        workouts = self.get_queryset().filter(
+        workouts = self.filter_queryset(self.get_queryset()).filter(
             workout_date__gte=start_of_week,
             workout_date__lte=today
         )
+        workouts = self._with_occurrences(workouts, start_of_week, today)
         serializer = self.get_serializer(workouts, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
         """Get workout summary statistics"""
-        # Get date range from query params
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-
-        queryset = self.get_queryset()
-
-        if start_date:
-            queryset = queryset.filter(workout_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(workout_date__lte=end_date)
-
-        # Calculate statistics
-        stats = queryset.aggregate(
-            total_workouts=Count('id'),
-            total_duration=Sum('duration'),
-            total_calories=Sum('calories_burned'),
-            total_distance=Sum('distance'),
-            completed_workouts=Count('id', filter=Q(status='completed'))
-        )
+        # Filtered like the list, without its ordering and search
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        serializer = WorkoutSummarySerializer(self._summary_data(queryset))
+        return Response(serializer.data)
 
-        # Get workout type breakdown
-        workout_types = queryset.values('workout_type').annotate(
-            count=Count('id')
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """
+        Get today's and this week's workouts and the summary at once.
+
+        This week's rows are read once and today's picked from them; the
+        summary is a single aggregate over every matching workout.
+        """
+        today = timezone.now().date()
+        start_of_week = today - timedelta(days=today.weekday())
+        workouts = self.filter_queryset(self.get_queryset()).filter(
+            workout_date__gte=start_of_week,
+            workout_date__lte=today
         )
-        workout_types_dict = {
-            item['workout_type']: item['count']
-            for item in workout_types
-        }
+        workouts = self._with_occurrences(workouts, start_of_week, today)
+        this_week = self.get_serializer(workouts, many=True).data
+
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        return Response({
+            'today': [
+                workout for workout in this_week
+                if workout['workout_date'] == today.isoformat()
+            ],
+            'this_week': this_week,
+            'summary': WorkoutSummarySerializer(self._summary_data(queryset)).data,
+        })
+
+    @staticmethod
+    def _summary_data(queryset):
+        """Totals and the workout type breakdown from one GROUP BY"""
+        rows = queryset.values('workout_type').annotate(
+            count=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+            duration=Sum('duration'),
+            calories=Sum('calories_burned'),
+            distance=Sum('distance'),
+        ).order_by()
 
         summary_data = {
-            'total_workouts': stats['total_workouts'] or 0,
-            'total_duration': stats['total_duration'] or 0,
-            'total_calories': stats['total_calories'] or 0,
-            'total_distance': stats['total_distance'] or 0,
-            'completed_workouts': stats['completed_workouts'] or 0,
-            'workout_types': workout_types_dict
+            'total_workouts': 0,
+            'total_duration': 0,
+            'total_calories': 0,
+            'total_distance': 0,
+            'completed_workouts': 0,
+            'workout_types': {},
         }
+        for row in rows:
+            summary_data['total_workouts'] += row['count']
+            summary_data['total_duration'] += row['duration'] or 0
+            summary_data['total_calories'] += row['calories'] or 0
+            summary_data['total_distance'] += row['distance'] or 0
+            summary_data['completed_workouts'] += row['completed']
+            summary_data['workout_types'][row['workout_type']] = row['count']
+        return summary_data
 
-        serializer = WorkoutSummarySerializer(summary_data)
-        return Response(serializer.data)
+    @action(detail=False, methods=['get'])
+    def heatmap(self, request):
+        """Get a year of daily activity as one packed array"""
+        try:
+            year = int(request.query_params.get('year', timezone.now().year))
+        except ValueError:
+            year = None
+        if year is None or not 1970 <= year <= 9999:
+            return Response(
+                {'year': 'Must be a year between 1970 and 9999.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        counts, minutes = activity_heatmap.load(request.user.pk, year)
+        return Response({
+            'year': year,
+            'encoding': f'count << {activity_heatmap.LEVEL_BITS} | level',
+            'days': activity_heatmap.encode(counts, minutes),
+            'total_workouts': sum(counts),
+            'active_days': sum(1 for count in counts if count),
+        })
+
+    @action(detail=False, methods=['get'])
+    def training_load(self, request):
+        """Get daily training load with acute/chronic windows"""
+        try:
+            days = int(request.query_params.get('days', 90))
+        except ValueError:
+            days = None
+        if days is None or not 1 <= days <= training_load.MAX_DAYS:
+            return Response(
+                {'days': f'Must be between 1 and {training_load.MAX_DAYS}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        end = self._date_param('end')
+        if end is None and request.query_params.get('end'):
+            return Response(
+                {'end': 'Must be a date in YYYY-MM-DD format.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        end = end or timezone.now().date()
+
+        result = training_load.load(request.user.pk, end, days)
+        return Response(dict(result, units='RPE x minutes'))
+
+    @action(detail=False, methods=['get'])
+    def weekly_report(self, request):
+        """Get the precomputed recap of a finished week (default: last week)"""
+        day = self._date_param('week')
+        if day is None and request.query_params.get('week'):
+            return Response(
+                {'week': 'Must be a date in YYYY-MM-DD format.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        week = weekly_reports.week_start(day) if day else weekly_reports.last_finished_week()
+        if week >= weekly_reports.week_start(timezone.now().date()):
+            return Response(
+                {'week': 'Only finished weeks have a report.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Stored as JSON already; skip decoding and re-rendering it
+        return HttpResponse(
+            weekly_reports.load(request.user.pk, week), content_type='application/json'
+        )
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Get the user's most used titles starting with `prefix`"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = None
+        if limit is None or not 1 <= limit <= title_suggestions.MAX_LIMIT:
+            return Response(
+                {'limit': f'Must be between 1 and {title_suggestions.MAX_LIMIT}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        prefix = request.query_params.get('prefix', '')
+        matches = title_suggestions.suggest(request.user.pk, prefix, limit)
+        return Response({
+            'prefix': prefix,
+            'suggestions': [{'title': title, 'count': count} for title, count in matches],
+        })
+
+    @action(detail=True, methods=['get', 'put', 'delete'], parser_classes=[MultiPartParser])
+    def track(self, request, pk=None):
+        """Get, upload (GPX or TCX as `file`) or remove a GPS track"""
+        workout = self.get_object()
+        existing = WorkoutTrack.objects.for_user(request.user).filter(workout=workout)
+
+        if request.method == 'GET':
+            track = get_object_or_404(existing)
+            return Response(WorkoutTrackSerializer(track).data)
+        if request.method == 'DELETE':
+            existing.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        upload = request.FILES.get('file')
+        if workout.workout_type not in tracks.TRACK_TYPES:
+            return Response(
+                {'workout_type': f"Tracks can only be added to {', '.join(tracks.TRACK_TYPES)} workouts."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if upload is None:
+            return Response({'file': 'No file was submitted.'}, status=status.HTTP_400_BAD_REQUEST)
+        if upload.size > tracks.MAX_BYTES:
+            return Response(
+                {'file': f'Files may be at most {tracks.MAX_BYTES // (1024 * 1024)} MB.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            track = tracks.attach(workout, upload)
+        except tracks.TrackError as error:
+            return Response({'file': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(WorkoutTrackSerializer(track).data)
+
+    @action(detail=True, methods=['get', 'put'])
+    def streams(self, request, pk=None):
+        """Get downsampled sample streams with zone times, or store them"""
+        workout = self.get_object()
+        if request.method == 'PUT':
+            serializer = WorkoutStreamUploadSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            saved = sample_streams.save(workout, **serializer.validated_data)
+            return Response(WorkoutStreamSerializer(saved, many=True).data)
+
+        params = request.query_params
+        errors = {}
+        values = {}
+        for name, default in (('points', 500), ('start', 0), ('end', None), ('max_heart_rate', None), ('ftp', None)):
+            try:
+                values[name] = int(params[name]) if params.get(name) else default
+            except ValueError:
+                errors[name] = 'Must be an integer.'
+        method = params.get('method', 'lttb')
+        if method not in sample_streams.DOWNSAMPLE_METHODS:
+            errors['method'] = f"Must be one of {', '.join(sample_streams.DOWNSAMPLE_METHODS)}."
+        if not errors and not 3 <= values['points'] <= 5000:
+            errors['points'] = 'Must be between 3 and 5000.'
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        thresholds = {
+            'heart_rate': (values['max_heart_rate'] or self._max_heart_rate(), sample_streams.HEART_RATE_ZONES),
+            'power': (values['ftp'], sample_streams.POWER_ZONES),
+        }
+        stored = WorkoutStream.objects.for_user(request.user).filter(workout=workout)
+        if params.get('channels'):
+            stored = stored.filter(channel__in=params['channels'].split(','))
+
+        result = {}
+        for stream in stored.order_by('channel'):
+            # Seconds to samples; only the blocks covering them are decoded
+            first = values['start'] // stream.interval
+            stop = None if values['end'] is None else values['end'] // stream.interval + 1
+            samples = sample_streams.unpack(stream.data, first, stop)
+            times, series = sample_streams.downsample(
+                samples, stream.interval, first, values['points'], method
+            )
+            data = dict(WorkoutStreamSerializer(stream).data, time=times, value=series)
+            threshold, edges = thresholds.get(stream.channel, (None, None))
+            if threshold:
+                data['zones'] = sample_streams.zone_times(samples, stream.interval, threshold, edges)
+            result[stream.channel] = data
+        return Response({'method': method, 'channels': result})
+
+    def _max_heart_rate(self):
+        """Estimate maximum heart rate from age (220 - age), if known"""
+        birth = self.request.user.date_of_birth
+        if birth is None:
+            return None
+        today = timezone.now().date()
+        age = today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
+        return 220 - age
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def start(self, request, pk=None):
         """Mark workout as started"""
         workout = self.get_object()
@@ -168,6 +518,7 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def complete(self, request, pk=None):
         """Mark workout as completed"""
         workout = self.get_object()
@@ -192,6 +543,8 @@ class WorkoutViewSet(viewsets.ModelViewSet):
             workout.calories_burned = calories
         if distance:
             workout.distance = distance
+        if workout.calories_burned is None:
+            calorie_estimates.fill_missing(workout, request.user.weight)
 
         workout.save()
 
@@ -199,6 +552,7 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def skip(self, request, pk=None):
         """Mark workout as skipped"""
         workout = self.get_object()
@@ -216,6 +570,225 @@ class WorkoutViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-from django.shortcuts import render
+class WorkoutRecurrenceViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for managing recurrence rules.
+    Occurrences are expanded lazily by the workout list actions.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = WorkoutRecurrenceSerializer
+
+    def get_queryset(self):
+        """Return recurrence rules for the authenticated user only"""
+        return WorkoutRecurrence.objects.for_user(
+            self.request.user
+        ).select_related('template')
+
+    def perform_destroy(self, instance):
+        """Delete the template with its rule; materialized rows are kept"""
+        instance.template.delete()
+
+
+class GoalViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for managing goals.
+    Progress comes from counters kept up to date as workouts change.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = GoalSerializer
+
+    def get_queryset(self):
+        """Return goals for the authenticated user only"""
+        return Goal.objects.for_user(self.request.user)
+
+    def perform_create(self, serializer):
+        goal = serializer.save(user=self.request.user)
+        goal_progress.recount(goal)
+
+    def perform_update(self, serializer):
+        before = [getattr(serializer.instance, field) for field in goal_progress.DEFINITION_FIELDS]
+        goal = serializer.save()
+        if before != [getattr(goal, field) for field in goal_progress.DEFINITION_FIELDS]:
+            goal_progress.recount(goal)
+
+    @action(detail=False, methods=['get'])
+    def progress(self, request):
+        """Get every goal's progress in its current period"""
+        goals = list(self.get_queryset())
+        results = goal_progress.progress(goals, timezone.now().date())
+        return Response(GoalProgressSerializer(results, many=True).data)
+
+
+class TeamSummaryPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = Team.MAX_ATHLETES
 
-# Create your views here.
+
+class TeamViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet for coaches' teams.
+    Athletes join with a team's code; the coach sees their totals.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TeamSerializer
+
+    def get_queryset(self):
+        """Return the teams coached by the authenticated user only"""
+        return Team.objects.filter(coach=self.request.user).annotate(
+            athlete_count=Count('memberships')
+        )
+
+    def perform_create(self, serializer):
+        team = serializer.save(coach=self.request.user)
+        team.athlete_count = 0
+
+    @action(detail=False, methods=['post'])
+    def join(self, request):
+        """Join a team with the code its coach shared"""
+        team = Team.objects.filter(
+            join_code=request.data.get('join_code') or ''
+        ).annotate(athlete_count=Count('memberships')).first()
+        if team is None:
+            return Response({'join_code': 'Unknown team code.'}, status=status.HTTP_400_BAD_REQUEST)
+        if team.coach_id == request.user.pk:
+            return Response(
+                {'join_code': 'Coaches cannot join their own team.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if team.athlete_count >= Team.MAX_ATHLETES:
+            return Response({'join_code': 'This team is full.'}, status=status.HTTP_400_BAD_REQUEST)
+        TeamMembership.objects.get_or_create(team=team, athlete=request.user)
+        return Response({'id': team.pk, 'name': team.name})
+
+    @action(detail=True, methods=['post'])
+    def leave(self, request, pk=None):
+        """Leave a team the authenticated user has joined"""
+        deleted, _ = TeamMembership.objects.filter(team_id=pk, athlete=request.user).delete()
+        if not deleted:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'])
+    def summary(self, request, pk=None):
+        """
+        Get every athlete's totals and workout type breakdown.
+
+        Takes the workout list filters, summarizing the last 28 days
+        without a start date, and ``ordering`` by any total or the name.
+        """
+        team = self.get_object()
+        ordering = request.query_params.get('ordering', '-total_duration')
+        if ordering.lstrip('-') not in teams.ORDERINGS:
+            return Response(
+                {'ordering': f"Must be one of {', '.join(teams.ORDERINGS)}, optionally prefixed with '-'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        params = request.query_params.copy()
+        if not params.get('start_date'):
+            today = timezone.now().date()
+            params['start_date'] = (today - timedelta(days=teams.DEFAULT_DAYS - 1)).isoformat()
+        workout_filter = WorkoutFilter(params, request=request)
+        if not workout_filter.is_valid():
+            raise filter_utils.translate_validation(workout_filter.errors)
+
+        athletes = get_user_model().objects.filter(team_memberships__team=team).only(
+            'first_name', 'last_name', 'email'
+        )
+        rows = teams.summarize(
+            athletes,
+            workout_filter.filter_queryset(Workout.objects.filter(is_template=False)),
+        )
+        paginator = TeamSummaryPagination()
+        page = paginator.paginate_queryset(teams.sort(rows, ordering), request, view=self)
+        response = paginator.get_paginated_response(
+            TeamAthleteSummarySerializer(page, many=True).data
+        )
+        response.data['start_date'] = workout_filter.form.cleaned_data['start_date']
+        response.data['end_date'] = workout_filter.form.cleaned_data['end_date']
+        return response
+
+
+class LeaderboardViewSet(viewsets.ViewSet):
+    """
+    Opt-in weekly and monthly leaderboards per workout type.
+    Served from the incrementally maintained score table.
+    """
+    permission_classes = [IsAuthenticated]
+    max_limit = 100
+
+    def list(self, request):
+        """Get the top N and the requesting user's rank for one board"""
+        period = request.query_params.get('period', 'week')
+        metric = request.query_params.get('metric', 'distance')
+        workout_type = request.query_params.get('workout_type', 'running')
+        day = parse_date(request.query_params.get('date') or '') or timezone.now().date()
+
+        errors = {}
+        if period not in leaderboards.PERIODS:
+            errors['period'] = f"Must be one of {', '.join(leaderboards.PERIODS)}."
+        if metric not in LeaderboardScore.METRICS:
+            errors['metric'] = f"Must be one of {', '.join(LeaderboardScore.METRICS)}."
+        if workout_type not in dict(Workout.WORKOUT_TYPES):
+            errors['workout_type'] = 'Unknown workout type.'
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = None
+        if limit is None or not 1 <= limit <= self.max_limit:
+            errors['limit'] = f'Must be between 1 and {self.max_limit}.'
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        start = leaderboards.period_start(period, day)
+        rows = leaderboards.top(period, start, workout_type, metric, limit)
+        users = get_user_model().objects.only('first_name').in_bulk(
+            [row.user_id for row in rows]
+        )
+        entries = [
+            {
+                'rank': position,
+                'user_id': row.user_id,
+                'display_name': self._display_name(users.get(row.user_id), row.user_id),
+                'score': getattr(row, metric),
+            }
+            for position, row in enumerate(rows, start=1)
+        ]
+
+        my_rank, my_score = leaderboards.rank(
+            request.user, period, start, workout_type, metric
+        )
+        return Response({
+            'period': period,
+            'period_start': start,
+            'workout_type': workout_type,
+            'metric': metric,
+            'opted_in': request.user.leaderboard_opt_in,
+            'top': LeaderboardEntrySerializer(entries, many=True).data,
+            'me': {'rank': my_rank, 'score': my_score},
+        })
+
+    @staticmethod
+    def _display_name(user, user_id):
+        """Public name of a ranked user; emails are never exposed"""
+        return (user.get_short_name() if user else '') or f"Athlete {user_id}"
+
+    @action(detail=False, methods=['post'])
+    def opt_in(self, request):
+        """Join the leaderboards and score existing completed workouts"""
+        user = request.user
+        if not user.leaderboard_opt_in:
+            user.leaderboard_opt_in = True
+            user.save(update_fields=['leaderboard_opt_in'])
+            rebuild_user_leaderboards.enqueue(user.pk)
+        return Response({'opted_in': True})
+
+    @action(detail=False, methods=['post'])
+    def opt_out(self, request):
+        """Leave the leaderboards and drop the user's score rows"""
+        user = request.user
+        user.leaderboard_opt_in = False
+        user.save(update_fields=['leaderboard_opt_in'])
+        LeaderboardScore.objects.filter(user=user).delete()
+        return Response({'opted_in': False})
@@ -0,0 +1,181 @@
+"""
+Weekly recaps precomputed in batches.
+
+A report covers one Monday-to-Sunday week: totals, a breakdown by
+workout type, the change against the week before and the best workout.
+``manage.py build_weekly_reports`` writes them for every active user in
+user id ranges, one query per shard and one upsert per range. Reading a
+report is a primary key lookup whose stored JSON is sent as is.
+
+Saving or deleting a workout of a finished week drops the reports that
+include it; they are rebuilt on their next read.
+"""
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from . import sharding
+from .models import WeeklyReport, Workout
+from .rebuild import id_ranges
+
+# Range of user ids handled per batch step
+CHUNK_SIZE = 1000
+
+ROW_FIELDS = [
+    'user_id', 'id', 'title', 'workout_type', 'status', 'workout_date',
+    'duration', 'distance', 'calories_burned',
+]
+
+TOTAL_FIELDS = ['workouts', 'completed', 'duration', 'distance', 'calories']
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def last_finished_week(today=None):
+    """Monday of the most recent week that has ended"""
+    return week_start(today or timezone.now().date()) - timedelta(days=7)
+
+
+def _rows(week, workouts):
+    """Rows of the workouts in the week and the one before"""
+    return workouts.filter(
+        is_template=False,
+        user__is_active=True,
+        workout_date__gte=week - timedelta(days=7),
+        workout_date__lt=week + timedelta(days=7),
+    ).values_list(*ROW_FIELDS).order_by()
+
+
+def _totals(rows):
+    """Counts of all workouts; duration, distance and calories of completed ones"""
+    totals = dict.fromkeys(TOTAL_FIELDS, 0)
+    for row in rows:
+        totals['workouts'] += 1
+        if row[4] != 'completed':
+            continue
+        totals['completed'] += 1
+        totals['duration'] += row[6] or 0
+        totals['distance'] += row[7] or 0
+        totals['calories'] += row[8] or 0
+    totals['distance'] = float(totals['distance'])
+    totals['calories'] = float(totals['calories'])
+    return totals
+
+
+def build(week, rows):
+    """Report dict for one user's rows of the week and the week before"""
+    current = [row for row in rows if row[5] >= week]
+    previous = [row for row in rows if row[5] < week]
+    totals = _totals(current)
+    before = _totals(previous)
+
+    types = defaultdict(lambda: {'workouts': 0, 'duration': 0})
+    for row in current:
+        types[row[3]]['workouts'] += 1
+        if row[4] == 'completed':
+            types[row[3]]['duration'] += row[6] or 0
+
+    completed = [row for row in current if row[4] == 'completed']
+    # Longest completed workout, the most calories breaking ties
+    best = max(
+        completed, key=lambda row: (row[6] or 0, row[8] or 0, row[5]), default=None
+    )
+    return {
+        'week_start': week.isoformat(),
+        'week_end': (week + timedelta(days=6)).isoformat(),
+        'totals': totals,
+        'previous': before,
+        'change': {
+            field: round(totals[field] - before[field], 2) for field in TOTAL_FIELDS
+        },
+        'types': dict(sorted(types.items())),
+        'best_workout': best and {
+            'id': best[1],
+            'title': best[2],
+            'workout_type': best[3],
+            'workout_date': best[5].isoformat(),
+            'duration': best[6],
+            'distance': None if best[7] is None else float(best[7]),
+            'calories_burned': None if best[8] is None else float(best[8]),
+        },
+    }
+
+
+def encode(report):
+    return json.dumps(report, separators=(',', ':'))
+
+
+def store(week, reports):
+    """Upsert encoded reports by user id; returns the number written"""
+    WeeklyReport.objects.bulk_create(
+        [
+            WeeklyReport(user_id=user_id, week_start=week, data=data)
+            for user_id, data in reports.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user', 'week_start'],
+        update_fields=['data', 'generated_at'],
+    )
+    return len(reports)
+
+
+def build_range(week, first_id, last_id):
+    """
+    Build and store the reports of users with ids in [first_id, last_id].
+
+    Users without workouts in either week get no row. Runs in pool
+    processes; returns the number of reports written.
+    """
+    workouts = Workout.objects.filter(user_id__gte=first_id, user_id__lte=last_id)
+    by_user = defaultdict(list)
+    for shard_workouts in sharding.fan_out(workouts):
+        for row in _rows(week, shard_workouts):
+            by_user[row[0]].append(row)
+    reports = {
+        user_id: encode(build(week, rows)) for user_id, rows in by_user.items()
+    }
+    return store(week, reports) if reports else 0
+
+
+def user_id_ranges(chunk_size=CHUNK_SIZE):
+    """Inclusive id ranges covering every active user"""
+    return id_ranges(get_user_model().objects.filter(is_active=True), chunk_size)
+
+
+def load(user_id, week):
+    """The stored report JSON of a week, built and stored on a miss"""
+    data = WeeklyReport.objects.filter(pk=(user_id, week)).values_list(
+        'data', flat=True
+    ).first()
+    if data is None:
+        rows = list(_rows(week, Workout.objects.for_user(user_id)))
+        data = encode(build(week, rows))
+        store(week, {user_id: data})
+    return data
+
+
+def record_change(previous, current):
+    """Drop stored reports that include a changed workout of a finished week"""
+    if previous == current:
+        return
+    this_week = week_start(timezone.now().date())
+    weeks = defaultdict(set)
+    for values in (previous, current):
+        if values is None or values['workout_date'] is None:
+            continue
+        week = week_start(values['workout_date'])
+        if week < this_week:
+            # The following week compares itself with this one
+            weeks[values['user_id']].update([week, week + timedelta(days=7)])
+    for user_id, starts in weeks.items():
+        WeeklyReport.objects.filter(user_id=user_id, week_start__in=starts).delete()
+
+
+def drop(user_ids):
+    """Drop every stored report of the users, after changes that skip signals"""
+    WeeklyReport.objects.filter(user_id__in=user_ids).delete()